@@ -0,0 +1,46 @@
+"""create outbox table for Calendar/Sheets sync
+
+Revision ID: 0005
+Revises: 0004_add_phone_to_users
+Create Date: 2026-10-17
+"""
+from __future__ import annotations
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers
+revision = "0005"
+down_revision = "0004_add_phone_to_users"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "outbox",
+        sa.Column("id", sa.BigInteger, primary_key=True, autoincrement=True),
+        # без FK: событие об удалении переживает саму запись
+        sa.Column("appointment_id", sa.BigInteger, nullable=False),
+        sa.Column("kind", sa.String(16), nullable=False),
+        sa.Column("payload", postgresql.JSONB, nullable=False),
+        sa.Column("status", sa.String(16), nullable=False, server_default="pending"),
+        sa.Column("attempts", sa.Integer, nullable=False, server_default="0"),
+        sa.Column("last_error", sa.Text, nullable=True),
+        sa.Column("available_at", sa.DateTime(timezone=True), server_default=sa.text("CURRENT_TIMESTAMP")),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.text("CURRENT_TIMESTAMP")),
+        sa.Column("processed_at", sa.DateTime(timezone=True), nullable=True),
+    )
+    # очередь: только необработанные события
+    op.create_index(
+        "ix_outbox_pending", "outbox", ["id"],
+        postgresql_where=sa.text("status = 'pending'"),
+    )
+    # порядок событий внутри одной записи
+    op.create_index("ix_outbox_appointment", "outbox", ["appointment_id", "id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_outbox_appointment", table_name="outbox")
+    op.drop_index("ix_outbox_pending", table_name="outbox")
+    op.drop_table("outbox")
@@ -0,0 +1,23 @@
+"""composite (status, date) index for reminder lookups
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-17
+"""
+from __future__ import annotations
+from alembic import op
+
+# revision identifiers
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # напоминания выбирают подтверждённые записи в узком окне времени
+    op.create_index("ix_appointments_status_date", "appointments", ["status", "date"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_appointments_status_date", table_name="appointments")
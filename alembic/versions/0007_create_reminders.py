@@ -0,0 +1,46 @@
+"""create reminders queue
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-17
+"""
+from __future__ import annotations
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "reminders",
+        sa.Column("id", sa.BigInteger, primary_key=True, autoincrement=True),
+        sa.Column(
+            "appointment_id", sa.BigInteger,
+            sa.ForeignKey("appointments.id", ondelete="CASCADE"), nullable=False,
+        ),
+        sa.Column("kind", sa.String(8), nullable=False),
+        sa.Column("due_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("status", sa.String(16), nullable=False, server_default="pending"),
+        sa.Column("attempts", sa.Integer, nullable=False, server_default="0"),
+        sa.Column("claimed_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("sent_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.text("CURRENT_TIMESTAMP")),
+        sa.UniqueConstraint("appointment_id", "kind", name="uq_reminders_appointment_kind"),
+    )
+    # голова очереди: ближайшие неотправленные
+    op.create_index(
+        "ix_reminders_due", "reminders", ["due_at"],
+        postgresql_where=sa.text("status IN ('pending', 'sending')"),
+    )
+    # очередь для уже подтверждённых записей заполняется при старте бота
+    # (scheduler.reminders → schedule_missing_reminders)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_reminders_due", table_name="reminders")
+    op.drop_table("reminders")
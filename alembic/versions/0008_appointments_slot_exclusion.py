@@ -0,0 +1,51 @@
+"""appointments.end_at + exclusion constraint against overlapping slots
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-17
+"""
+from __future__ import annotations
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision = "0008"
+down_revision = "0007"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("appointments", sa.Column("end_at", sa.DateTime(timezone=True), nullable=True))
+
+    # timestamptz + interval не IMMUTABLE, поэтому generated column нельзя — держим end_at триггером
+    op.execute("""
+        CREATE FUNCTION appointments_set_end_at() RETURNS trigger AS $$
+        BEGIN
+            NEW.end_at := NEW.date + make_interval(mins => COALESCE(NEW.duration_min, 60));
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE TRIGGER trg_appointments_end_at
+        BEFORE INSERT OR UPDATE OF date, duration_min ON appointments
+        FOR EACH ROW EXECUTE FUNCTION appointments_set_end_at()
+    """)
+    op.execute("UPDATE appointments SET end_at = date + make_interval(mins => COALESCE(duration_min, 60))")
+    op.alter_column("appointments", "end_at", nullable=False)
+
+    # пересекающиеся активные записи уже в БД — миграция упадёт тут; их нужно развести вручную
+    op.execute("""
+        ALTER TABLE appointments
+        ADD CONSTRAINT ex_appointments_no_overlap
+        EXCLUDE USING gist (tstzrange(date, end_at, '[)') WITH &&)
+        WHERE (status <> 'Отменено')
+    """)
+
+
+def downgrade() -> None:
+    op.execute("ALTER TABLE appointments DROP CONSTRAINT ex_appointments_no_overlap")
+    op.execute("DROP TRIGGER trg_appointments_end_at ON appointments")
+    op.execute("DROP FUNCTION appointments_set_end_at()")
+    op.drop_column("appointments", "end_at")
@@ -0,0 +1,23 @@
+"""(date, id) index for keyset pagination of the admin list
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-17
+"""
+from __future__ import annotations
+from alembic import op
+
+# revision identifiers
+revision = "0009"
+down_revision = "0008"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # постраничный список в админке: WHERE (date, id) > (:d, :id) ORDER BY date, id
+    op.create_index("ix_appointments_date_id", "appointments", ["date", "id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_appointments_date_id", table_name="appointments")
@@ -0,0 +1,25 @@
+"""composite (user_id, date) index for «my appointments»
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-17
+"""
+from __future__ import annotations
+from alembic import op
+
+# revision identifiers
+revision = "0010"
+down_revision = "0009"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # 0001 уже создаёт этот индекс, но в части окружений его нет (БД поднимали
+    # через create_all без него) — создаём только если отсутствует
+    op.execute("CREATE INDEX IF NOT EXISTS ix_appointments_user_date ON appointments (user_id, date)")
+
+
+def downgrade() -> None:
+    # индекс принадлежит 0001 (её downgrade его и удалит)
+    pass
@@ -0,0 +1,33 @@
+"""outbox: pending index covers claimed (processing) events
+
+Revision ID: 0011
+Revises: 0010
+Create Date: 2026-10-17
+"""
+from __future__ import annotations
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision = "0011"
+down_revision = "0010"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.drop_index("ix_outbox_pending", table_name="outbox")
+    op.create_index(
+        "ix_outbox_pending", "outbox", ["id"],
+        postgresql_where=sa.text("status IN ('pending', 'processing')"),
+    )
+
+
+def downgrade() -> None:
+    # забранные, но не завершённые события возвращаем в очередь
+    op.execute("UPDATE outbox SET status = 'pending' WHERE status = 'processing'")
+    op.drop_index("ix_outbox_pending", table_name="outbox")
+    op.create_index(
+        "ix_outbox_pending", "outbox", ["id"],
+        postgresql_where=sa.text("status = 'pending'"),
+    )
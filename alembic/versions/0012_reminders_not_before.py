@@ -0,0 +1,23 @@
+"""reminders: not_before for retry backoff
+
+Revision ID: 0012
+Revises: 0011
+Create Date: 2026-10-17
+"""
+from __future__ import annotations
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision = "0012"
+down_revision = "0011"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("reminders", sa.Column("not_before", sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("reminders", "not_before")
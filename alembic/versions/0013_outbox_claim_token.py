@@ -0,0 +1,23 @@
+"""outbox: claim token guards results of an expired lease
+
+Revision ID: 0013
+Revises: 0012
+Create Date: 2026-10-17
+"""
+from __future__ import annotations
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision = "0013"
+down_revision = "0012"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("outbox", sa.Column("claim_token", sa.String(32), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("outbox", "claim_token")
@@ -1,9 +1,11 @@
 from __future__ import annotations
 import asyncio
 
-from scheduler.reminders import setup_scheduler
+from scheduler.reminders import setup_scheduler, stop_scheduler
 from aiogram import Bot, Dispatcher
 from aiogram.client.default import DefaultBotProperties
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
 from aiogram.types import BotCommand
 
 # FSM storages
@@ -12,11 +14,30 @@ from aiogram.fsm.storage.redis import RedisStorage, DefaultKeyBuilder
 import redis.asyncio as aioredis
 
 # наше
-from config import TOKEN, DEBUG, REDIS_HOST, REDIS_PORT, REDIS_DB
+from config import (
+    TOKEN, DEBUG, REDIS_HOST, REDIS_PORT, REDIS_DB,
+    BOT_MODE, ALLOWED_UPDATES, TELEGRAM_API_URL, METRICS_HOST, METRICS_PORT,
+    LOOP_MONITOR_INTERVAL_SEC, LOOP_LAG_WARN_SEC, SLOW_CALLBACK_SEC,
+    HEALTH_MAX_LAG_SEC, HEALTH_CHECK_TIMEOUT_SEC,
+)
 from handlers.client import register_client_handlers
 from handlers.admin import register_admin_handlers
 from middlewares.throttling import ThrottlingMiddleware
+from middlewares.db import DbSessionMiddleware
+from middlewares.fsm_scope import FsmCacheScopeMiddleware
+from middlewares.metrics import HandlerMetricsMiddleware
+from database import AsyncSessionLocal, pool_stats, user_cache, ping as db_ping
+from services.availability import availability
+from services.calendar import calendar_client, google_executor, sheet_index, sheets_writer
+from services.catalog import catalog
+from services.outbox import outbox_worker
 from utils.logging import setup_logging
+from utils.webhook import run_webhook
+from utils.leader import LeaderElection
+from utils.fsm_cache import CachedStorage
+from utils.metrics import metrics, start_metrics_server
+from utils.loopmon import LoopMonitor, threadpool_stats
+from utils.health import Health
 
 log = setup_logging(DEBUG)
 
@@ -49,27 +70,105 @@ async def create_storage():
         log.warning(f"Redis недоступен, используем MemoryStorage. Причина: {e}")
         return MemoryStorage()
 
+def create_bot() -> Bot:
+    # TELEGRAM_API_URL — свой Bot API server или локальная заглушка
+    session = AiohttpSession(api=TelegramAPIServer.from_base(TELEGRAM_API_URL)) if TELEGRAM_API_URL else None
+    return Bot(token=TOKEN, session=session, default=DefaultBotProperties(parse_mode="HTML"))
+
+
 async def main() -> None:
-    bot = Bot(token=TOKEN, default=DefaultBotProperties(parse_mode="HTML"))
+    bot = create_bot()
     storage = await create_storage()
-    dp = Dispatcher(storage=storage)
+    fsm_storage = CachedStorage(storage) if isinstance(storage, RedisStorage) else storage
+    # FSMContextMiddleware регистрируем сами: кеш апдейта должен открыться раньше
+    dp = Dispatcher(storage=fsm_storage, disable_fsm=True)
+    dp.update.outer_middleware.register(FsmCacheScopeMiddleware())
+    dp.update.outer_middleware.register(dp.fsm)
+
+    await catalog.load()
+    if isinstance(storage, RedisStorage):
+        catalog.start(storage.redis)
 
-    setup_scheduler(bot)
+    # периодические задачи — только на одной реплике; без Redis считаем себя единственной
+    leader = None
+    if isinstance(storage, RedisStorage):
+        leader = LeaderElection(
+            storage.redis,
+            on_elected=lambda: setup_scheduler(bot),
+            on_demoted=stop_scheduler,
+        )
+        leader.start()
+    else:
+        setup_scheduler(bot)
+    outbox_worker.start()
 
-    dp.message.middleware.register(ThrottlingMiddleware(rate=0.5))
-    dp.callback_query.middleware.register(ThrottlingMiddleware(rate=0.5))
+    dp.update.middleware.register(DbSessionMiddleware(AsyncSessionLocal))
+    # один экземпляр на оба типа событий: общие бакеты и счётчики
+    throttling = ThrottlingMiddleware(redis=storage.redis if isinstance(storage, RedisStorage) else None)
+    dp.message.middleware.register(throttling)
+    dp.callback_query.middleware.register(throttling)
+    # после троттлинга: меряем только то, что дошло до хендлера
+    dp.message.middleware.register(HandlerMetricsMiddleware())
+    dp.callback_query.middleware.register(HandlerMetricsMiddleware())
 
     register_client_handlers(dp)
     register_admin_handlers(dp)
 
+    # счётчики модулей — gauge в /metrics
+    metrics.register_collector("db_pool", pool_stats)
+    metrics.register_collector("user_cache", user_cache.stats)
+    metrics.register_collector("catalog", catalog.stats)
+    metrics.register_collector("availability", availability.stats)
+    metrics.register_collector("outbox", outbox_worker.stats)
+    metrics.register_collector("sheets_writer", sheets_writer.stats)
+    metrics.register_collector("sheet_index", sheet_index.stats)
+    metrics.register_collector("gcal_client", calendar_client.stats)
+    metrics.register_collector("google_executor", google_executor.stats)
+    metrics.register_collector("throttling", throttling.stats)
+    if isinstance(fsm_storage, CachedStorage):
+        metrics.register_collector("fsm_cache", fsm_storage.stats)
+    if leader:
+        metrics.register_collector("leader", leader.stats)
+    loop_monitor = LoopMonitor(
+        interval=LOOP_MONITOR_INTERVAL_SEC, warn_lag=LOOP_LAG_WARN_SEC, slow_callback=SLOW_CALLBACK_SEC
+    )
+    loop_monitor.start()
+    metrics.register_collector("loop", loop_monitor.stats)
+    metrics.register_collector("threadpool", threadpool_stats)
+
+    health = Health(loop_monitor, max_lag=HEALTH_MAX_LAG_SEC, timeout=HEALTH_CHECK_TIMEOUT_SEC)
+    health.add_check("postgres", db_ping)
+    if isinstance(storage, RedisStorage):
+        health.add_check("redis", storage.redis.ping)
+    metrics_runner = (
+        await start_metrics_server(METRICS_HOST, METRICS_PORT, health.setup_routes) if METRICS_PORT else None
+    )
+
     await set_bot_commands(bot)
-    await bot.delete_webhook(drop_pending_updates=True)
+    allowed_updates = ALLOWED_UPDATES or dp.resolve_used_update_types()
 
-    log.info("✅ Бот запущен. Ожидаю обновления...")
+    log.info(f"✅ Бот запущен ({BOT_MODE}). Ожидаю обновления...")
     try:
-        await dp.start_polling(bot)
+        if BOT_MODE == "webhook":
+            await run_webhook(dp, bot, allowed_updates=allowed_updates)
+        else:
+            await bot.delete_webhook(drop_pending_updates=True)
+            await dp.start_polling(bot, allowed_updates=allowed_updates)
     finally:
+        if leader:
+            await leader.stop()
+        else:
+            stop_scheduler()
+        await outbox_worker.stop()
+        if isinstance(fsm_storage, CachedStorage):
+            log.info(f"FSM cache: {fsm_storage.stats()}")
+        await catalog.stop()
+        if metrics_runner:
+            await metrics_runner.cleanup()
+        await loop_monitor.stop()
         await bot.session.close()
+        calendar_client.close()
+        google_executor.shutdown()
         if isinstance(storage, RedisStorage):
             await storage.redis.aclose()
 
@@ -1,3 +1,4 @@
+import math
 import os
 from dotenv import load_dotenv
 
@@ -21,10 +22,118 @@ GCAL_CALENDAR_ID = os.getenv("GCAL_CALENDAR_ID")
 
 # DB & Redis
 DATABASE_URL = os.getenv("DATABASE_URL")
+# пул соединений Postgres (SQLAlchemy + asyncpg)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))        # сек ожидания свободного соединения
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))        # сек; -1 — не пересоздавать
+DB_POOL_PRE_PING = as_bool(os.getenv("DB_POOL_PRE_PING"), False)   # лишний round trip на каждый checkout
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "100"))  # 0 — для pgbouncer (transaction)
 REDIS_HOST = os.getenv("REDIS_HOST", "localhost")
 REDIS_PORT = int(os.getenv("REDIS_PORT", "6379"))
 REDIS_DB = int(os.getenv("REDIS_DB", "0"))
 
+# Outbox (фоновая синхронизация с Google)
+OUTBOX_POLL_INTERVAL = float(os.getenv("OUTBOX_POLL_INTERVAL", "1.0"))  # сек
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "50"))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "8"))
+OUTBOX_CLAIM_LEASE_SEC = int(os.getenv("OUTBOX_CLAIM_LEASE_SEC", "300"))  # упавшая реплика — событие заберут снова
+
+# Напоминания
+REMINDER_POLL_SEC = int(os.getenv("REMINDER_POLL_SEC", "60"))            # страховочный опрос очереди
+REMINDER_BATCH_SIZE = int(os.getenv("REMINDER_BATCH_SIZE", "100"))
+REMINDER_CATCHUP_SEC = int(os.getenv("REMINDER_CATCHUP_SEC", str(3 * 3600)))  # догоняем пропущенные за простой
+REMINDER_MAX_ATTEMPTS = int(os.getenv("REMINDER_MAX_ATTEMPTS", "3"))
+REMINDER_RETRY_BASE_SEC = float(os.getenv("REMINDER_RETRY_BASE_SEC", "60"))     # задержка повтора: 60, 120, 240…
+REMINDER_RETRY_MAX_SEC = float(os.getenv("REMINDER_RETRY_MAX_SEC", "900"))
+
+# Лимиты Telegram Bot API для массовых рассылок (напоминания и т.п.)
+TG_GLOBAL_RATE = float(os.getenv("TG_GLOBAL_RATE", "25"))               # сообщений/сек на бота
+TG_PER_CHAT_INTERVAL = float(os.getenv("TG_PER_CHAT_INTERVAL", "1.0"))  # сек между сообщениями в один чат
+TG_SEND_CONCURRENCY = int(os.getenv("TG_SEND_CONCURRENCY", "10"))
+
+# Google Sheets: окно склейки изменений в один batchUpdate
+SHEETS_BATCH_WINDOW_SEC = float(os.getenv("SHEETS_BATCH_WINDOW_SEC", "1.0"))
+
+# Отдельный пул потоков для вызовов Google (не делим default executor)
+GOOGLE_EXECUTOR_WORKERS = int(os.getenv("GOOGLE_EXECUTOR_WORKERS", "8"))
+GOOGLE_CALENDAR_CONCURRENCY = int(os.getenv("GOOGLE_CALENDAR_CONCURRENCY", "6"))
+GOOGLE_SHEETS_CONCURRENCY = int(os.getenv("GOOGLE_SHEETS_CONCURRENCY", "2"))
+GOOGLE_MAX_QUEUE = int(os.getenv("GOOGLE_MAX_QUEUE", "50"))   # ждущих вызовов на API; дальше — сразу ошибка
+
+# Расписание салона и выбор слота в календаре
+WORK_DAY_START = os.getenv("WORK_DAY_START", "10:00")                  # ЧЧ:ММ, местное время
+WORK_DAY_END = os.getenv("WORK_DAY_END", "20:00")                      # к этому времени услуга должна закончиться
+SLOT_STEP_MIN = int(os.getenv("SLOT_STEP_MIN", "30"))                  # шаг сетки слотов, мин
+BOOKING_HORIZON_DAYS = int(os.getenv("BOOKING_HORIZON_DAYS", "60"))    # насколько вперёд можно записаться
+AVAILABILITY_CACHE_SEC = float(os.getenv("AVAILABILITY_CACHE_SEC", "30"))
+
+# Админка: записей на странице списка
+ADMIN_PAGE_SIZE = int(os.getenv("ADMIN_PAGE_SIZE", "10"))
+
+# Каталог услуг в памяти (инвалидация через Redis pub/sub)
+CATALOG_CHANNEL = os.getenv("CATALOG_CHANNEL", "beauty_bot:catalog")
+CATALOG_TTL_SEC = float(os.getenv("CATALOG_TTL_SEC", "600"))  # страховка, если сообщение потерялось
+
+# Режим получения апдейтов: polling | webhook
+BOT_MODE = os.getenv("BOT_MODE", "polling").strip().lower()
+WEBHOOK_BASE_URL = os.getenv("WEBHOOK_BASE_URL", "")        # публичный адрес за балансировщиком, https://bot.example.com
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/telegram/webhook")
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET", "")            # X-Telegram-Bot-Api-Secret-Token
+WEBHOOK_HOST = os.getenv("WEBHOOK_HOST", "0.0.0.0")
+WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", "8080"))
+WEBHOOK_MAX_CONNECTIONS = int(os.getenv("WEBHOOK_MAX_CONNECTIONS", "40"))   # параллельных запросов от Telegram
+WEBHOOK_CONCURRENCY = int(os.getenv("WEBHOOK_CONCURRENCY", "20"))          # апдейтов в обработке одновременно
+# через запятую (message,callback_query); пусто — только те типы, на которые есть хендлеры
+ALLOWED_UPDATES = [u.strip() for u in os.getenv("ALLOWED_UPDATES", "").split(",") if u.strip()]
+TELEGRAM_API_URL = os.getenv("TELEGRAM_API_URL", "")        # свой Bot API server / локальная заглушка
+
+# Выбор лидера среди реплик (периодические задачи — только на лидере)
+LEADER_KEY = os.getenv("LEADER_KEY", "beauty_bot:leader")
+LEADER_TTL_SEC = float(os.getenv("LEADER_TTL_SEC", "15"))      # аренда истекает, если лидер пропал
+LEADER_RENEW_SEC = float(os.getenv("LEADER_RENEW_SEC", "5"))   # период продления и попыток захвата
+
+# Антиспам (token bucket): событий/сек и запас на пользователя
+THROTTLE_RATE = float(os.getenv("THROTTLE_RATE", "2"))
+THROTTLE_BURST = float(os.getenv("THROTTLE_BURST", "3"))
+# свои лимиты: область=rate/burst через запятую; область — флаг хендлера
+# flags={"throttle": ...}, префикс callback_data или msg/cb (по умолчанию для типа)
+def _parse_throttle_rules(raw: str) -> dict[str, tuple[float, float]]:
+    """«cal_=5/8,msg=1/2» → {"cal_": (5.0, 8.0), ...}; ошибка в правиле — RuntimeError."""
+    rules: dict[str, tuple[float, float]] = {}
+    for rule in filter(None, (r.strip() for r in raw.split(","))):
+        scope, _, limits = rule.partition("=")
+        parts = limits.split("/")
+        try:
+            rate, burst = (float(x) for x in parts) if len(parts) == 2 else (0.0, 0.0)
+        except ValueError:
+            rate = burst = 0.0
+        if not scope.strip() or not (0 < rate < math.inf and 0 < burst < math.inf):
+            raise RuntimeError(f"THROTTLE_RULES: неверное правило {rule!r}, нужно область=rate/burst (> 0)")
+        rules[scope.strip()] = (rate, burst)
+    return rules
+
+
+THROTTLE_RULES = _parse_throttle_rules(os.getenv("THROTTLE_RULES", "cal_=5/8"))
+THROTTLE_REDIS_PREFIX = os.getenv("THROTTLE_REDIS_PREFIX", "beauty_bot:throttle")
+THROTTLE_MAX_KEYS = int(os.getenv("THROTTLE_MAX_KEYS", "10000"))   # бакетов в памяти процесса
+
+# Кеш FSM поверх Redis: сколько секунд состояние пользователя живёт в памяти процесса
+# >0 — кеш и между апдейтами; безопасно только при одной реплике бота
+FSM_CACHE_TTL_SEC = float(os.getenv("FSM_CACHE_TTL_SEC", "0"))   # 0 — только в пределах апдейта
+FSM_CACHE_MAX_KEYS = int(os.getenv("FSM_CACHE_MAX_KEYS", "10000"))
+
+# Служебный HTTP: /metrics (Prometheus), /health/live, /health/ready (0 — выключить)
+METRICS_HOST = os.getenv("METRICS_HOST", "0.0.0.0")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9100"))
+
+# Мониторинг event loop
+LOOP_MONITOR_INTERVAL_SEC = float(os.getenv("LOOP_MONITOR_INTERVAL_SEC", "0.5"))
+LOOP_LAG_WARN_SEC = float(os.getenv("LOOP_LAG_WARN_SEC", "0.25"))     # лог, если loop проснулся позже
+SLOW_CALLBACK_SEC = float(os.getenv("SLOW_CALLBACK_SEC", "0.1"))      # лог колбэков дольше; 0 — выключить
+HEALTH_MAX_LAG_SEC = float(os.getenv("HEALTH_MAX_LAG_SEC", "1.0"))    # выше — /health/ready отвечает 503
+HEALTH_CHECK_TIMEOUT_SEC = float(os.getenv("HEALTH_CHECK_TIMEOUT_SEC", "2"))
+
 required = {
     "BOT_TOKEN": TOKEN,
     "ADMIN_ID": ADMIN_ID_RAW,
@@ -41,6 +150,11 @@ try:
 except ValueError:
     raise RuntimeError("ADMIN_ID должен быть числом")
 
+if BOT_MODE not in {"polling", "webhook"}:
+    raise RuntimeError("BOT_MODE должен быть polling или webhook")
+if BOT_MODE == "webhook" and not (WEBHOOK_BASE_URL and WEBHOOK_SECRET):
+    raise RuntimeError("Для BOT_MODE=webhook нужны WEBHOOK_BASE_URL и WEBHOOK_SECRET")
+
 if not os.path.exists(GCAL_CREDENTIALS_FILE):
     raise RuntimeError(f"GCAL_CREDENTIALS_FILE не найден: {GCAL_CREDENTIALS_FILE}")
 
@@ -61,3 +175,4 @@ if DEBUG:
         print(f"  DATABASE_URL: {DATABASE_URL.split('@')[-1]}")
     print(f"  REDIS: {REDIS_HOST}:{REDIS_PORT}/{REDIS_DB}")
     print(f"  TZ: {TZ}")
+    print(f"  BOT_MODE: {BOT_MODE}")
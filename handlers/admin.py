@@ -1,43 +1,39 @@
 # handlers/admin.py
 from __future__ import annotations
 
-import math
+import datetime as dt
 
 import logging
 
 from aiogram import Dispatcher, F
-from aiogram.filters import Command
+from aiogram.filters import Command, CommandObject
+from aiogram.exceptions import TelegramBadRequest
 from aiogram.types import Message, CallbackQuery
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from config import ADMIN_ID
-from utils.helpers import parse_local_datetime, format_local_datetime
+from config import ADMIN_ID, ADMIN_PAGE_SIZE
+from utils.helpers import parse_local_datetime, format_local_datetime, TZ
 
 from database import (
-    get_appointments,
+    get_appointments_page,
     get_appointment_by_id,
-    add_appointment,
     update_appointment,
-    update_appointment_status,
-    update_appointment_event_id,
-    delete_appointment,
-)
-
-from services.calendar import (
-    add_event_to_calendar,
-    update_event_in_calendar,
-    delete_event_from_calendar,
-    add_appointment_to_sheet,
-    update_appointment_in_sheet,
-    delete_appointment_from_sheet,
+    commit,
 )
+from services.appointments import bulk_appointments, notify_bulk_clients
 
 from keyboards import (
     admin_menu,                   # сам ReplyKeyboardMarkup
     ADMIN_MENU_LIST_LABEL,        # "📋 Список записей"
     ADMIN_MENU_DELETE_LABEL,      # "🗑️ Удалить запись"
     ADMIN_MENU_EDIT_LABEL,        # "✏ Изменить запись"
+    ADMIN_PAGE_PREFIX,
+    ADMIN_STATUS_FILTERS,
+    AdminListFilter,
+    admin_list_keyboard,
+    parse_admin_page_cb,
 )
 
 log = logging.getLogger(__name__)
@@ -60,28 +56,95 @@ async def admin_panel(message: Message):
     await message.answer("🔹 Панель администратора:\nВыберите действие:", reply_markup=admin_menu)
 
 
-# ---- Просмотр всех записей ----
-async def show_appointments(message: Message):
+# ---- Просмотр записей (постранично) ----
+async def _render_page(
+    f: AdminListFilter, direction: str = "f", cursor=None, *, session: AsyncSession | None = None
+):
+    """Текст и клавиатура одной страницы; из БД читаем только её строки."""
+    now = dt.datetime.now(TZ)
+    since = until = None
+    if f.day:
+        since = dt.datetime.combine(f.day, dt.time.min, tzinfo=TZ)
+        until = since + dt.timedelta(days=1)
+    if f.upcoming:
+        since = max(since, now) if since else now
+
+    rows, has_more = await get_appointments_page(
+        session=session,
+        limit=ADMIN_PAGE_SIZE,
+        status=ADMIN_STATUS_FILTERS[f.status],
+        since=since,
+        until=until,
+        after=cursor if direction == "n" else None,
+        before=cursor if direction == "p" else None,
+    )
+
+    # куда можно листать дальше: в направлении движения знаем точно (has_more),
+    # в обратном — страница есть, раз мы оттуда пришли
+    if direction == "p":
+        has_prev, has_next = has_more, True
+    else:
+        has_prev, has_next = direction == "n", has_more
+    first = (rows[0].date, rows[0].id) if rows else None
+    last = (rows[-1].date, rows[-1].id) if rows else None
+
+    header = ["📋 <b>Записи</b>"]
+    if f.status != "a":
+        header.append(f"статус: {ADMIN_STATUS_FILTERS[f.status]}")
+    if f.day:
+        header.append(f.day.strftime("%d.%m.%Y"))
+    if f.upcoming:
+        header.append("только будущие")
+    lines = [" · ".join(header)]
+    if not rows:
+        lines.append("Записей не найдено.")
+    for a in rows:
+        svc_name = a.service.name if getattr(a, "service", None) else "Услуга"
+        lines.append(
+            f"🆔 {a.id} | 👤 {a.name or '-'} | 💇 {svc_name} | 📅 {format_local_datetime(a.date)} | {a.status}"
+        )
+
+    markup = admin_list_keyboard(
+        f,
+        today=now.date(),
+        prev_cursor=first if has_prev else None,
+        next_cursor=last if has_next else None,
+    )
+    return "\n".join(lines), markup
+
+
+async def show_appointments(message: Message, session: AsyncSession):
     if message.from_user.id != ADMIN_ID:
         await message.answer("⛔ У вас нет доступа!")
         return
 
-    appts = await get_appointments()
-    if not appts:
-        await message.answer("📋 Записей пока нет.")
-        return
+    text, markup = await _render_page(AdminListFilter(), session=session)
+    await commit(session)   # только чтение: не держим транзакцию, пока ждём Telegram
+    await message.answer(text, reply_markup=markup)
 
-    lines = []
-    for a in appts:
-        svc_name = a.service.name if getattr(a, "service", None) else "Услуга"
-        lines.append(
-            f"🆔 {a.id} | 👤 {a.name or '-'} | 💇 {svc_name} | 📅 {format_local_datetime(a.date)}"
-        )
-    await message.answer("📋 <b>Список записей:</b>\n" + "\n".join(lines))
+
+async def appointments_page(call: CallbackQuery, session: AsyncSession):
+    """Фильтры и листание: перерисовываем то же сообщение."""
+    if call.from_user.id != ADMIN_ID:
+        return await call.answer("Нет доступа", show_alert=True)
+    try:
+        f, direction, cursor = parse_admin_page_cb(call.data)
+    except ValueError:
+        return await call.answer("Некорректный запрос", show_alert=True)
+
+    text, markup = await _render_page(f, direction, cursor, session=session)
+    await commit(session)
+    try:
+        await call.message.edit_text(text, reply_markup=markup)
+    except TelegramBadRequest as e:
+        # «message is not modified» — нажали на уже активный фильтр
+        if "not modified" not in str(e):
+            raise
+    await call.answer()
 
 
 # ---- Удаление ----
-async def delete_via_callback(call: CallbackQuery):
+async def delete_via_callback(call: CallbackQuery, session: AsyncSession):
     if call.from_user.id != ADMIN_ID:
         return await call.answer("Нет доступа", show_alert=True)
     try:
@@ -89,60 +152,113 @@ async def delete_via_callback(call: CallbackQuery):
     except Exception:
         return await call.answer("Некорректный ID", show_alert=True)
 
-    appt = await get_appointment_by_id(appt_id)
-    if not appt:
+    rows = await bulk_appointments("delete", [appt_id], session=session)
+    await commit(session)
+    if not rows:
         return await call.answer("Запись не найдена", show_alert=True)
 
-    svc_name = appt.service.name if getattr(appt, "service", None) else "Услуга"
-
-    await delete_appointment_from_sheet(appt.name or "", svc_name, appt.date)
-    if appt.event_id:
-        await delete_event_from_calendar(appt.event_id)
-    await delete_appointment(appt_id)
-
     await call.message.edit_text(f"❌ Запись ID {appt_id} удалена.")
-    await call.bot.send_message(appt.user_id, "❌ Ваша запись отменена.")
+    await notify_bulk_clients(call.bot, "delete", rows)
 
 
 async def delete_appointment_handler(message: Message, state: FSMContext):
     if message.from_user.id != ADMIN_ID:
         await message.answer("⛔ У вас нет доступа!")
         return
-    await message.answer("Введите <b>ID</b> записи, которую хотите удалить:")
+    await message.answer("Введите <b>ID</b> записи (или несколько через запятую), которые хотите удалить:")
     await state.set_state(DeleteAppointment.waiting_for_id)
 
-async def process_delete(message: Message, state: FSMContext):
-    text = (message.text or "").strip()
+async def process_delete(message: Message, state: FSMContext, session: AsyncSession):
     try:
-        appt_id = int(text)
+        ids = _parse_ids(message.text or "")
     except ValueError:
         await message.answer("❌ Ошибка! ID записи должен быть числом.")
         await state.clear()
         return
 
-    appt = await get_appointment_by_id(appt_id)
-    if not appt:
+    # одно DELETE … RETURNING; Sheets и Calendar чистит outbox
+    rows = await bulk_appointments("delete", ids, session=session)
+    await commit(session)
+    await state.clear()
+    if not rows:
         await message.answer("❌ Запись не найдена!")
-        await state.clear()
         return
-    
-    svc_name = appt.service.name if getattr(appt, "service", None) else "Услуга"
 
-    # Google сначала (Sheets + Calendar), затем БД
-    deleted_from_sheets = await delete_appointment_from_sheet(appt.name or "", svc_name, appt.date)
-    if appt.event_id:
-        await delete_event_from_calendar(appt.event_id)
+    deleted = ", ".join(str(r.id) for r in rows)
+    missing = sorted(set(ids) - {r.id for r in rows})
+    await message.answer(
+        f"✅ Удалено записей: <b>{len(rows)}</b> (ID {deleted}).\n"
+        + (f"⚠️ Не найдены: {', '.join(map(str, missing))}\n" if missing else "")
+        + "📄 Google Calendar / Sheets обновятся в фоне."
+    )
 
-    ok = await delete_appointment(appt_id)
-    if not ok:
-        await message.answer("⚠️ Ошибка при удалении записи из базы данных!")
+
+# ---- Массовые операции ----
+_BULK_STATUS_ALIASES = {
+    "pending": "Ожидание", "ожидание": "Ожидание",
+    "confirmed": "Подтверждено", "подтверждено": "Подтверждено",
+    "cancelled": "Отменено", "отменено": "Отменено",
+}
+_BULK_USAGE = (
+    "Использование:\n"
+    "<code>/bulk confirm|cancel|delete [ids 1,2,3] [day ДД.ММ.ГГГГ] [status pending|confirmed|cancelled]</code>\n"
+    "Нужен хотя бы один фильтр. Пример: <code>/bulk confirm day 18.10.2026</code>"
+)
+
+
+def _parse_ids(raw: str) -> list[int]:
+    ids = [int(x) for x in raw.replace(",", " ").split()]
+    if not ids:
+        raise ValueError("empty")
+    return ids
+
+
+def _parse_bulk_args(args: str):
+    tokens = (args or "").split()
+    if not tokens or tokens[0] not in ("confirm", "cancel", "delete"):
+        raise ValueError("действие")
+    action, rest = tokens[0], tokens[1:]
+    ids = since = until = status = None
+    while rest:
+        key, value, rest = rest[0].lower(), (rest[1] if len(rest) > 1 else ""), rest[2:]
+        if key == "ids":
+            ids = _parse_ids(value)
+        elif key == "day":
+            day = dt.datetime.strptime(value, "%d.%m.%Y").date()
+            since = dt.datetime.combine(day, dt.time.min, tzinfo=TZ)
+            until = since + dt.timedelta(days=1)
+        elif key == "status" and value.lower() in _BULK_STATUS_ALIASES:
+            status = _BULK_STATUS_ALIASES[value.lower()]
+        else:
+            raise ValueError(key)
+    return action, ids, since, until, status
+
+
+async def bulk_command(message: Message, command: CommandObject, session: AsyncSession):
+    if message.from_user.id != ADMIN_ID:
+        await message.answer("⛔ У вас нет доступа!")
+        return
+    try:
+        action, ids, since, until, status = _parse_bulk_args(command.args)
+    except ValueError:
+        await message.answer(_BULK_USAGE)
         return
 
+    try:
+        rows = await bulk_appointments(action, ids, since=since, until=until, status=status, session=session)
+    except ValueError as e:
+        await message.answer(f"❌ {e}")
+        return
+    await commit(session)
+
+    if not rows:
+        await message.answer("Подходящих записей нет.")
+        return
+    report = await notify_bulk_clients(message.bot, action, rows)
     await message.answer(
-        f"✅ Запись <b>ID {appt_id}</b> удалена.\n"
-        f"{'📄 Удалена из Google Sheets' if deleted_from_sheets else '⚠️ В Google Sheets запись не найдена'}"
+        f"✅ {action}: записей {len(rows)} (ID {', '.join(str(r.id) for r in rows)}).\n"
+        f"📨 Клиентам: {report.summary()}"
     )
-    await state.clear()
 
 
 # ---- Редактирование ----
@@ -172,7 +288,7 @@ async def process_edit(message: Message, state: FSMContext):
     await message.answer("Введите новую дату в формате <b>ДД.ММ.ГГГГ ЧЧ:ММ</b>:")
     await state.set_state(EditAppointment.waiting_for_new_date)
 
-async def process_new_date(message: Message, state: FSMContext):
+async def process_new_date(message: Message, state: FSMContext, session: AsyncSession):
     data = await state.get_data()
     appt_id: int | None = data.get("appointment_id")
 
@@ -180,7 +296,8 @@ async def process_new_date(message: Message, state: FSMContext):
         await message.answer("❌ Ошибка: не найдено ID записи!")
         return
 
-    appt = await get_appointment_by_id(appt_id)
+    appt = await get_appointment_by_id(appt_id, session=session)
+    await commit(session)   # дальше ответы в Telegram — транзакцию чтения закрываем
     if not appt:
         await message.answer("❌ Запись не найдена!")
         await state.clear()
@@ -192,25 +309,18 @@ async def process_new_date(message: Message, state: FSMContext):
         await message.answer("❌ Неверный формат. Используйте <b>ДД.ММ.ГГГГ ЧЧ:ММ</b>.")
         return
 
-    ok = await update_appointment(appt_id, new_dt)
+    # Calendar и Sheets обновит outbox; занятый слот — SlotTakenError (это ValueError)
+    try:
+        ok = await update_appointment(appt_id, new_dt, sync=True, session=session)
+    except ValueError as e:
+        await message.answer(f"❌ {e}")
+        await state.clear()
+        return
     if not ok:
         await message.answer("⚠️ Ошибка при обновлении базы данных!")
+        await state.clear()
         return
-    
-    svc_name = appt.service.name if getattr(appt, "service", None) else "Услуга"
-
-    if appt.event_id:
-        duration_min = appt.duration_min or 60
-        await update_event_in_calendar(
-            appt.event_id,
-            appt.name or "Клиент",
-            svc_name,
-            new_dt,
-            duration_minutes=duration_min,  # можно было бы оставить duration_hours=..., но лучше minutes
-        )
-
-
-    await update_appointment_in_sheet(appt.name or "", svc_name, appt.date, new_dt)
+    await commit(session)
 
     await message.answer(f"✅ Запись <b>ID {appt_id}</b> перенесена на {format_local_datetime(new_dt)}.")
     await state.clear()
@@ -218,7 +328,7 @@ async def process_new_date(message: Message, state: FSMContext):
 
 
 # ---- Подтверждение ----
-async def confirm_appointment(call: CallbackQuery):
+async def confirm_appointment(call: CallbackQuery, session: AsyncSession):
     appt_id_txt = call.data.split("_", 1)[1]
     try:
         appt_id = int(appt_id_txt)
@@ -226,40 +336,25 @@ async def confirm_appointment(call: CallbackQuery):
         await call.message.answer("❌ Некорректный ID.")
         return
 
-    appt = await get_appointment_by_id(appt_id)
-    if not appt:
-        await call.message.answer("❌ Запись не найдена.")
+    # событие в Calendar создаёт outbox (поставлено ещё при записи)
+    rows = await bulk_appointments("confirm", [appt_id], status=None, session=session)
+    await commit(session)
+    if not rows:
+        await call.message.answer("⚠️ Запись не найдена или уже подтверждена.")
         return
+    appt = rows[0]
 
-    ok = await update_appointment_status(appt_id, "Подтверждено")
-    if not ok:
-        await call.message.answer("⚠️ Не удалось обновить статус.")
-        return
-
-    svc_name = appt.service.name if getattr(appt, "service", None) else "Услуга"
-
-    if not appt.event_id:
-        duration_h = max(1, math.ceil((appt.duration_min or 60) / 60))
-        event_id = await add_event_to_calendar(appt.name or "Клиент", svc_name, appt.date, duration_hours=duration_h)
-        if event_id:
-            await update_appointment_event_id(appt_id, event_id)
-            appt.event_id = event_id
-
-    await call.bot.send_message(
-        appt.user_id,
-        f"✅ Ваша запись подтверждена!\n📅 {format_local_datetime(appt.date)}"
-    )
-
+    await notify_bulk_clients(call.bot, "confirm", rows)
     await call.message.edit_text(
         f"✅ Запись ID {appt_id} подтверждена.\n"
         f"📅 {format_local_datetime(appt.date)}\n"
-        f"📌 Calendar ID: {appt.event_id or '—'}"
+        f"📌 Calendar ID: {appt.event_id or '— (синхронизируется)'}"
     )
 
 
 
 # ---- Отмена ----
-async def cancel_appointment(call: CallbackQuery):
+async def cancel_appointment(call: CallbackQuery, session: AsyncSession):
     appt_id_txt = call.data.split("_", 1)[1]
     try:
         appt_id = int(appt_id_txt)
@@ -267,26 +362,13 @@ async def cancel_appointment(call: CallbackQuery):
         await call.message.answer("❌ Некорректный ID.")
         return
 
-    appt = await get_appointment_by_id(appt_id)
-    if not appt:
+    rows = await bulk_appointments("delete", [appt_id], session=session)
+    await commit(session)
+    if not rows:
         await call.message.answer("❌ Запись не найдена.")
         return
 
-    svc_name = appt.service.name if getattr(appt, "service", None) else "Услуга"
-
-    await delete_appointment_from_sheet(appt.name or "", svc_name, appt.date)
-    if appt.event_id:
-        await delete_event_from_calendar(appt.event_id)
-
-    ok = await delete_appointment(appt_id)
-    if not ok:
-        await call.message.answer("⚠️ Не удалось удалить запись из БД.")
-        return
-
-    await call.bot.send_message(
-        appt.user_id,
-        f"❌ Ваша запись на {svc_name} ({format_local_datetime(appt.date)}) отменена."
-    )
+    await notify_bulk_clients(call.bot, "cancel", rows)
     await call.message.edit_text("❌ Запись удалена и отменена везде.")
 
 
@@ -300,6 +382,7 @@ def register_admin_handlers(dp: Dispatcher):
 
     # Потом — обычные команды/кнопки
     dp.message.register(admin_panel, Command("admin"))
+    dp.message.register(bulk_command, Command("bulk"))
 
     # фильтруем по тексту без эмодзи (на случай, если эмодзи изменятся)
     dp.message.register(
@@ -319,3 +402,4 @@ def register_admin_handlers(dp: Dispatcher):
     dp.callback_query.register(confirm_appointment, F.data.startswith("confirm_"))
     dp.callback_query.register(cancel_appointment,  F.data.startswith("cancel_"))
     dp.callback_query.register(delete_via_callback, F.data.startswith("delete_"))
+    dp.callback_query.register(appointments_page,   F.data.startswith(f"{ADMIN_PAGE_PREFIX}:"))
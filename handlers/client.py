@@ -4,23 +4,22 @@ import logging
 import datetime as dt
 import re
 from aiogram import Dispatcher, F
+from aiogram.exceptions import TelegramBadRequest
 from aiogram.filters import Command
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
-from aiogram.types import Message, ReplyKeyboardRemove, CallbackQuery
+from aiogram.types import Message, ReplyKeyboardRemove, CallbackQuery, User
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from config import ADMIN_ID
 from utils.helpers import parse_local_datetime, format_local_datetime, TZ
 
 # DB helpers
 from database import (
-    list_services,
-    get_service_by_id,
-    get_service_by_name,
-    get_future_appointments_by_user,
+    get_appointments_page,
     get_appointment_by_id,
     upsert_user,
-    has_time_conflict,
+    commit,
 )
 
 # Сервисы (единая точка синхронизации)
@@ -29,12 +28,18 @@ from services.appointments import (
     reschedule_appointment_and_sync,
     delete_appointment_and_sync,
 )
+from services.availability import availability, parse_slot
+from services.catalog import catalog
 
 from keyboards import (
     confirmation_keyboard,
     client_menu,
     services_keyboard,          # инлайн-список услуг
-    my_appointment_keyboard,    # инлайн для «Мои записи»
+    my_appointments_keyboard,   # инлайн для «Мои записи» (одна клавиатура на страницу)
+    parse_my_page_cb,
+    MY_PAGE_PREFIX,
+    calendar_keyboard,          # инлайн-календарь свободных дней
+    time_slots_keyboard,        # свободное время дня
 )
 
 log = logging.getLogger(__name__)
@@ -94,7 +99,7 @@ async def process_phone(message: Message, state: FSMContext):
     await state.update_data(phone=phone_norm)
 
     # показываем услуги после корректного телефона
-    services = await list_services()
+    services = await catalog.all()
     if not services:
         return await message.answer("⚠️ Список услуг пока пуст. Попробуйте позже.")
 
@@ -113,15 +118,20 @@ async def process_service(message: Message, state: FSMContext):
 
     svc = None
     if raw.isdigit():
-        idx = int(raw) - 1
-        all_svcs = await list_services()
-        if 0 <= idx < len(all_svcs):
-            svc = all_svcs[idx]
+        svc = await catalog.by_index(int(raw) - 1)
     if not svc:
-        svc = await get_service_by_name(raw, partial=True)
+        svc = await catalog.by_name(raw, partial=True)
 
     if not svc:
-        services = await list_services()
+        candidates = await catalog.search(raw, limit=4)
+        if candidates:
+            await message.answer(
+                "🤔 Уточните, какую услугу вы имели в виду:",
+                reply_markup=services_keyboard(candidates),
+            )
+            return
+
+        services = await catalog.all()
         lines = [f"{i+1}) 💇 {s.name} — ⏱️ {s.duration_min} мин."
                  for i, s in enumerate(services)]
         await message.answer(
@@ -131,9 +141,9 @@ async def process_service(message: Message, state: FSMContext):
         )
         return
 
-    await state.update_data(service_id=svc.id)
-    await message.answer("📅 Введите дату в формате <b>ДД.ММ.ГГГГ ЧЧ:ММ</b>:", parse_mode="HTML")
+    await state.update_data(service_id=svc.id, duration_min=svc.duration_min or 60)
     await state.set_state(AppointmentForm.date)
+    await _show_calendar(message, state)
 
 
 async def select_service_callback(call: CallbackQuery, state: FSMContext):
@@ -145,75 +155,155 @@ async def select_service_callback(call: CallbackQuery, state: FSMContext):
     except Exception:
         return await call.answer("Некорректная услуга", show_alert=True)
 
-    svc = await get_service_by_id(service_id)
+    svc = await catalog.get(service_id)
     if not svc:
         return await call.answer("Услуга не найдена", show_alert=True)
 
-    await state.update_data(service_id=service_id)
+    await state.update_data(service_id=service_id, duration_min=svc.duration_min or 60)
     await call.message.edit_reply_markup(reply_markup=None)
-    await call.message.answer("📅 Введите дату в формате <b>ДД.ММ.ГГГГ ЧЧ:ММ</b>:", parse_mode="HTML")
     await state.set_state(AppointmentForm.date)
+    await _show_calendar(call.message, state)
     await call.answer()
 
 
-async def process_date(message: Message, state: FSMContext):
-    """Создаёт запись: БД → Calendar → Sheets, и шлёт подтверждение админу."""
-    user_id = message.from_user.id
+# ===== Календарь свободных слотов =====
+CALENDAR_PROMPT = (
+    "📅 Выберите день — показаны только даты со свободным временем.\n"
+    "Или введите дату вручную в формате <b>ДД.ММ.ГГГГ ЧЧ:ММ</b>."
+)
+
+
+async def _calendar_markup(state: FSMContext, year: int, month: int):
+    data = await state.get_data()
+    slots = await availability.month(year, month, data.get("duration_min") or 60)
+    prev_y, prev_m = (year, month - 1) if month > 1 else (year - 1, 12)
+    next_y, next_m = (year, month + 1) if month < 12 else (year + 1, 1)
+    return calendar_keyboard(
+        year, month, slots.keys(),
+        has_prev=availability.month_in_range(prev_y, prev_m),
+        has_next=availability.month_in_range(next_y, next_m),
+    )
+
+
+async def _show_calendar(message: Message, state: FSMContext) -> None:
+    today = availability.today()
+    markup = await _calendar_markup(state, today.year, today.month)
+    await message.answer(CALENDAR_PROMPT, reply_markup=markup, parse_mode="HTML")
+
+
+async def calendar_noop(call: CallbackQuery):
+    await call.answer()
+
+
+async def calendar_nav(call: CallbackQuery, state: FSMContext):
+    """`cal_nav_YYYY-MM` — листаем месяцы (и возврат из выбора времени)."""
+    try:
+        year, month = map(int, call.data.rsplit("_", 1)[1].split("-"))
+    except Exception:
+        return await call.answer("Некорректная дата", show_alert=True)
+    if not availability.month_in_range(year, month):
+        return await call.answer("Запись на этот месяц недоступна", show_alert=True)
+
+    markup = await _calendar_markup(state, year, month)
+    await call.message.edit_text(CALENDAR_PROMPT, reply_markup=markup, parse_mode="HTML")
+    await call.answer()
+
+
+async def calendar_day(call: CallbackQuery, state: FSMContext):
+    """`cal_day_YYYY-MM-DD` — показываем свободное время дня."""
+    try:
+        day = dt.date.fromisoformat(call.data.rsplit("_", 1)[1])
+    except Exception:
+        return await call.answer("Некорректная дата", show_alert=True)
+
+    data = await state.get_data()
+    slots = await availability.day(day, data.get("duration_min") or 60)
+    if not slots:
+        markup = await _calendar_markup(state, day.year, day.month)
+        await call.message.edit_reply_markup(reply_markup=markup)
+        return await call.answer("На этот день свободного времени уже нет", show_alert=True)
+
+    await call.message.edit_text(
+        f"🕒 {day.strftime('%d.%m.%Y')}: выберите время",
+        reply_markup=time_slots_keyboard(day, slots),
+    )
+    await call.answer()
+
+
+async def calendar_time(call: CallbackQuery, state: FSMContext, session: AsyncSession):
+    """`cal_time_YYYY-MM-DDTHH:MM` — бронируем выбранный слот."""
+    appt_dt = parse_slot(call.data.split("_", 2)[2])
+    if appt_dt is None:
+        return await call.answer("Некорректное время", show_alert=True)
+
+    await call.message.edit_reply_markup(reply_markup=None)
+    await call.answer()
+    await _book(call.message, call.from_user, state, appt_dt, session)
+
+
+async def process_date(message: Message, state: FSMContext, session: AsyncSession):
+    """Дата введена текстом (запасной путь к календарю)."""
+    try:
+        appt_dt = parse_local_datetime((message.text or "").strip())  # -> aware (Asia/Tashkent)
+    except Exception:
+        await message.answer("❌ Неверный формат. Используйте <b>ДД.ММ.ГГГГ ЧЧ:ММ</b>.", parse_mode="HTML")
+        return
+    await _book(message, message.from_user, state, appt_dt, session)
+
+
+async def _book(
+    message: Message, from_user: User, state: FSMContext, appt_dt: dt.datetime, session: AsyncSession
+):
+    """
+    Создаёт запись: БД (+ outbox для Calendar/Sheets), и шлёт подтверждение админу.
+    Все запросы — в сессии апдейта; фиксируем до сообщений админу и клиенту.
+    """
+    user_id = from_user.id
     data = await state.get_data()
 
     user_name = (data.get("name") or "").strip()
     phone = data.get("phone")
     service_id = data.get("service_id")
-    date_raw = (message.text or "").strip()
 
     if not service_id:
         await message.answer("❌ Сначала выберите услугу.")
         await state.set_state(AppointmentForm.service)
         return
 
-    # 1) Парсим локальную дату и проверяем «не прошлое»
-    try:
-        appt_dt = parse_local_datetime(date_raw)  # -> aware (Asia/Tashkent)
-    except Exception:
-        await message.answer("❌ Неверный формат. Используйте <b>ДД.ММ.ГГГГ ЧЧ:ММ</b>.", parse_mode="HTML")
-        return
-
+    # 1) Проверяем «не прошлое»
     if appt_dt < dt.datetime.now(tz=TZ):
         await message.answer("❌ Нельзя записаться на прошедшую дату.")
         return
 
     # 2) Подтянуть услугу и длительность
-    svc = await get_service_by_id(service_id)
+    svc = await catalog.get(service_id)
     if not svc:
         await message.answer("❌ Услуга не найдена. Попробуйте снова.")
         await state.set_state(AppointmentForm.service)
         return
     service_name = svc.name
-    duration_min = svc.duration_min or 60
-
-    # 3) Конфликты
-    if await has_time_conflict(appt_dt, duration_min):
-        await message.answer("❌ Время занято. Выберите другое.")
-        return
 
-    # (опц.) создать/обновить пользователя
-    fallback_name = (message.from_user.full_name or message.from_user.username or "").strip() or f"user_{user_id}"
+    # 3) (опц.) создать/обновить пользователя
+    fallback_name = (from_user.full_name or from_user.username or "").strip() or f"user_{user_id}"
     try:
-        await upsert_user(telegram_id=user_id, name=(user_name or fallback_name), phone=phone)
+        await upsert_user(telegram_id=user_id, name=(user_name or fallback_name), phone=phone, session=session)
     except Exception as e:
         log.warning("upsert_user failed: %s", e)
 
-    # 4) Создание и синхронизация
+    # 4) Создание (конфликт слотов проверяет сервис) и синхронизация
     try:
         appt_id = await create_appointment_and_sync(
             user_id=user_id,
             user_name=user_name or fallback_name,
             service_id=service_id,
             date=appt_dt,
+            session=session,
         )
     except ValueError as e:
+        await commit(session)   # профиль из шага 3 сохраняем, транзакцию не держим
         await message.answer(f"❌ {e}")
         return
+    await commit(session)
 
     # 5) Уведомление админу
     phone_line = f"📞 {phone}\n" if phone else "📞 —\n"
@@ -243,52 +333,105 @@ async def process_date(message: Message, state: FSMContext):
 
 
 # ===== Мои записи (просмотр + самообслуживание) =====
-async def my_appointments(message: Message):
+MY_PAGE_SIZE = 5
+
+
+async def _render_my_page(
+    user_id: int, direction: str = "f", cursor=None, *, note: str = "", session: AsyncSession | None = None
+):
+    """Страница будущих записей клиента одним сообщением: текст + общая клавиатура."""
+    rows, has_more = await get_appointments_page(
+        session=session,
+        limit=MY_PAGE_SIZE,
+        user_id=user_id,
+        since=dt.datetime.now(TZ),
+        after=cursor if direction == "n" else None,
+        before=cursor if direction == "p" else None,
+    )
+    if direction == "p":
+        has_prev, has_next = has_more, True
+    else:
+        has_prev, has_next = direction == "n", has_more
+
+    lines = [note] if note else []
+    if not rows:
+        lines.append("📅 У вас пока нет будущих записей.")
+        return "\n".join(lines), None
+
+    lines.append("📋 <b>Ваши записи</b>:")
+    numbered = []
+    for n, a in enumerate(rows, 1):
+        svc_name = a.service.name if getattr(a, "service", None) else "Услуга"
+        lines.append(f"\n{n}) 💇 {svc_name}\n🕒 {format_local_datetime(a.date)}\n📌 Статус: {a.status}")
+        numbered.append((n, a.id))
+
+    markup = my_appointments_keyboard(
+        numbered,
+        prev_cursor=(rows[0].date, rows[0].id) if has_prev else None,
+        next_cursor=(rows[-1].date, rows[-1].id) if has_next else None,
+    )
+    return "\n".join(lines), markup
+
+
+async def my_appointments(message: Message, session: AsyncSession):
     """Показывает клиенту его будущие записи (из БД), с кнопками Перенести/Отменить."""
-    user_id = message.from_user.id
-    appts = await get_future_appointments_by_user(user_id)
+    text, markup = await _render_my_page(message.from_user.id, session=session)
+    await commit(session)   # только чтение: не держим транзакцию, пока ждём Telegram
+    await message.answer(text, reply_markup=markup, parse_mode="HTML")
 
-    if not appts:
-        await message.answer("📅 У вас пока нет будущих записей.")
-        return
 
-    await message.answer("📋 <b>Ваши записи</b>:", parse_mode="HTML")
-    for a in appts:
-        svc_name = a.service.name if getattr(a, "service", None) else "Услуга"
-        text = f"• {svc_name}\n🕒 {format_local_datetime(a.date)}\n📌 Статус: {a.status}"
-        await message.answer(text, reply_markup=my_appointment_keyboard(a.id))
+async def my_appointments_page(call: CallbackQuery, session: AsyncSession):
+    try:
+        direction, cursor = parse_my_page_cb(call.data)
+    except ValueError:
+        return await call.answer("Некорректный запрос", show_alert=True)
+
+    text, markup = await _render_my_page(call.from_user.id, direction, cursor, session=session)
+    await commit(session)
+    try:
+        await call.message.edit_text(text, reply_markup=markup, parse_mode="HTML")
+    except TelegramBadRequest as e:
+        if "not modified" not in str(e):
+            raise
+    await call.answer()
 
 
 # ===== Отмена клиентом =====
-async def cli_cancel(call: CallbackQuery):
+async def cli_cancel(call: CallbackQuery, session: AsyncSession):
     try:
         appt_id = int(call.data.split("_", 2)[2])
     except Exception:
         return await call.answer("Некорректный ID", show_alert=True)
 
-    appt = await get_appointment_by_id(appt_id)
+    appt = await get_appointment_by_id(appt_id, session=session)
+    await commit(session)   # дальше ответы в Telegram — транзакцию чтения закрываем
     if not appt:
         return await call.answer("Запись не найдена", show_alert=True)
 
     if appt.user_id != call.from_user.id:
         return await call.answer("Эта запись не ваша.", show_alert=True)
 
-    ok = await delete_appointment_and_sync(appt_id)
+    ok = await delete_appointment_and_sync(appt_id, session=session)
     if not ok:
         return await call.answer("Не удалось отменить. Попробуйте позже.", show_alert=True)
+    await commit(session)
 
-    await call.message.edit_text("❌ Запись отменена.")
+    # перерисовываем список на месте, без отменённой записи
+    text, markup = await _render_my_page(call.from_user.id, note="❌ Запись отменена.\n", session=session)
+    await commit(session)
+    await call.message.edit_text(text, reply_markup=markup, parse_mode="HTML")
     await call.answer("Готово")
 
 
 # ===== Перенос клиентом (FSM) =====
-async def cli_resched_start(call: CallbackQuery, state: FSMContext):
+async def cli_resched_start(call: CallbackQuery, state: FSMContext, session: AsyncSession):
     try:
         appt_id = int(call.data.split("_", 2)[2])
     except Exception:
         return await call.answer("Некорректный ID", show_alert=True)
 
-    appt = await get_appointment_by_id(appt_id)
+    appt = await get_appointment_by_id(appt_id, session=session)
+    await commit(session)   # дальше ответы в Telegram — транзакцию чтения закрываем
     if not appt:
         return await call.answer("Запись не найдена", show_alert=True)
 
@@ -301,14 +444,15 @@ async def cli_resched_start(call: CallbackQuery, state: FSMContext):
     await call.answer()
 
 
-async def cli_resched_finish(message: Message, state: FSMContext):
+async def cli_resched_finish(message: Message, state: FSMContext, session: AsyncSession):
     data = await state.get_data()
     appt_id = data.get("resched_appt_id")
     if not appt_id:
         await message.answer("❌ Не найден ID записи.")
         return
 
-    appt = await get_appointment_by_id(appt_id)
+    appt = await get_appointment_by_id(appt_id, session=session)
+    await commit(session)
     if not appt:
         await message.answer("❌ Запись не найдена.")
         await state.clear()
@@ -324,16 +468,9 @@ async def cli_resched_finish(message: Message, state: FSMContext):
         await message.answer("❌ Нельзя переносить в прошлое.")
         return
 
-    # длительность берём из услуги/записи
-    svc = await get_service_by_id(appt.service_id) if appt.service_id else None
-    duration_min = getattr(svc, "duration_min", appt.duration_min or 60)
-
-    if await has_time_conflict(new_dt, duration_min, exclude_id=appt.id):
-        await message.answer("❌ Это время занято. Выберите другое.")
-        return
-
+    # конфликт слотов проверяет сервис (SlotTakenError — тоже ValueError)
     try:
-        ok = await reschedule_appointment_and_sync(appt.id, new_dt)
+        ok = await reschedule_appointment_and_sync(appt.id, new_dt, session=session)
     except ValueError as e:
         await message.answer(f"❌ {e}")
         return
@@ -341,6 +478,7 @@ async def cli_resched_finish(message: Message, state: FSMContext):
     if not ok:
         await message.answer("⚠️ Не удалось перенести запись.")
         return
+    await commit(session)
 
     await message.answer(f"✅ Перенесли на {format_local_datetime(new_dt)}.")
     await state.clear()
@@ -366,7 +504,14 @@ def register_client_handlers(dp: Dispatcher):
     # Выбор услуги (инлайн)
     dp.callback_query.register(select_service_callback, F.data.startswith("svc_"))
 
+    # Календарь свободных слотов (инлайн)
+    dp.callback_query.register(calendar_noop, F.data == "cal_noop")
+    dp.callback_query.register(calendar_nav,  AppointmentForm.date, F.data.startswith("cal_nav_"))
+    dp.callback_query.register(calendar_day,  AppointmentForm.date, F.data.startswith("cal_day_"))
+    dp.callback_query.register(calendar_time, AppointmentForm.date, F.data.startswith("cal_time_"))
+
     # Самообслуживание (инлайн)
     dp.callback_query.register(cli_cancel,        F.data.startswith("cli_cancel_"))
+    dp.callback_query.register(my_appointments_page, F.data.startswith(f"{MY_PAGE_PREFIX}:"))
     dp.callback_query.register(cli_resched_start, F.data.startswith("cli_resched_"))
     dp.message.register(cli_resched_finish,       ClientReschedule.waiting_for_new_date)
@@ -1,2 +1,20 @@
-import os, sys
-sys.exit(0 if os.getenv("BOT_TOKEN") else 1)
+# Docker HEALTHCHECK: python healthcheck.py [live|ready]
+# Спрашивает служебный HTTP бота; если он выключен (METRICS_PORT=0) — только проверка env.
+import os, sys, urllib.request
+
+if not os.getenv("BOT_TOKEN"):
+    sys.exit(1)
+
+port = int(os.getenv("METRICS_PORT", "9100"))
+if not port:
+    sys.exit(0)
+
+probe = sys.argv[1] if len(sys.argv) > 1 else "live"
+try:
+    with urllib.request.urlopen(f"http://127.0.0.1:{port}/health/{probe}", timeout=4) as resp:
+        sys.exit(0 if resp.status == 200 else 1)
+except Exception as e:
+    # 503 тоже сюда (HTTPError): печатаем ответ для docker inspect
+    body = getattr(e, "read", lambda: b"")()
+    print(f"{probe}: {e} {body[:500].decode(errors='replace')}")
+    sys.exit(1)
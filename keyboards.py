@@ -2,7 +2,9 @@ from aiogram.types import (
     InlineKeyboardMarkup, InlineKeyboardButton,
     ReplyKeyboardMarkup, KeyboardButton
 )
-from typing import Sequence
+from typing import Collection, NamedTuple, Optional, Sequence
+import calendar
+import datetime as dt
 
 # --- Общие инлайн-кнопки для записи (для админа) ---
 
@@ -28,6 +30,101 @@ def admin_control_buttons(appointment_id: int) -> InlineKeyboardMarkup:
         ]
     )
 
+# --- Инлайн: постраничный список записей (для админа) ---
+
+ADMIN_PAGE_PREFIX = "adm_page"
+ADMIN_STATUS_FILTERS = {            # код в callback_data -> статус записи
+    "a": None,
+    "p": "Ожидание",
+    "c": "Подтверждено",
+    "x": "Отменено",
+}
+_STATUS_BUTTONS = {"a": "Все", "p": "⏳ Ожидание", "c": "✅ Подтв.", "x": "❌ Отмен."}
+_EPOCH = dt.datetime(1970, 1, 1, tzinfo=dt.timezone.utc)
+
+
+class AdminListFilter(NamedTuple):
+    status: str = "a"               # ключ ADMIN_STATUS_FILTERS
+    day: Optional[dt.date] = None   # только записи этого дня
+    upcoming: bool = True           # только будущие
+
+
+Cursor = tuple[dt.datetime, int]    # (date, id) крайней строки страницы
+
+
+def _pack_cursor(cursor: Optional[Cursor]) -> str:
+    # микросекунды от эпохи: точный round-trip без таймзон и в пределах 64 байт
+    if not cursor:
+        return "0:0"
+    us = (cursor[0] - _EPOCH) // dt.timedelta(microseconds=1)
+    return f"{us}:{cursor[1]}"
+
+
+def _unpack_cursor(us: str, appt_id: str) -> Cursor:
+    return _EPOCH + dt.timedelta(microseconds=int(us)), int(appt_id)
+
+
+def admin_page_cb(f: AdminListFilter, direction: str = "f", cursor: Optional[Cursor] = None) -> str:
+    """direction: f — первая страница, n — после курсора, p — перед курсором."""
+    day = f.day.strftime("%Y%m%d") if f.day else "-"
+    return f"{ADMIN_PAGE_PREFIX}:{f.status}:{day}:{int(f.upcoming)}:{direction}:{_pack_cursor(cursor)}"
+
+
+def parse_admin_page_cb(data: str) -> tuple[AdminListFilter, str, Optional[Cursor]]:
+    _, status, day, upcoming, direction, us, appt_id = data.split(":")
+    if status not in ADMIN_STATUS_FILTERS or direction not in ("f", "n", "p"):
+        raise ValueError(data)
+    f = AdminListFilter(
+        status=status,
+        day=dt.datetime.strptime(day, "%Y%m%d").date() if day != "-" else None,
+        upcoming=upcoming == "1",
+    )
+    cursor = _unpack_cursor(us, appt_id) if direction != "f" else None
+    return f, direction, cursor
+
+
+def admin_list_keyboard(
+    f: AdminListFilter,
+    *,
+    today: dt.date,
+    prev_cursor: Optional[Cursor],
+    next_cursor: Optional[Cursor],
+) -> InlineKeyboardMarkup:
+    """Фильтры + «назад/вперёд»; каждая кнопка перерисовывает то же сообщение."""
+    def mark(text: str, active: bool) -> str:
+        return f"• {text}" if active else text
+
+    tomorrow = today + dt.timedelta(days=1)
+    rows = [
+        [
+            InlineKeyboardButton(text=mark(label, f.status == code),
+                                 callback_data=admin_page_cb(f._replace(status=code)))
+            for code, label in _STATUS_BUTTONS.items()
+        ],
+        [
+            InlineKeyboardButton(text=mark("Сегодня", f.day == today),
+                                 callback_data=admin_page_cb(f._replace(day=today))),
+            InlineKeyboardButton(text=mark("Завтра", f.day == tomorrow),
+                                 callback_data=admin_page_cb(f._replace(day=tomorrow))),
+            InlineKeyboardButton(text=mark("Все дни", f.day is None),
+                                 callback_data=admin_page_cb(f._replace(day=None))),
+        ],
+        [
+            InlineKeyboardButton(
+                text="🗂 Показать и прошедшие" if f.upcoming else "🔜 Только будущие",
+                callback_data=admin_page_cb(f._replace(upcoming=not f.upcoming)),
+            ),
+        ],
+    ]
+    nav = []
+    if prev_cursor:
+        nav.append(InlineKeyboardButton(text="‹ Назад", callback_data=admin_page_cb(f, "p", prev_cursor)))
+    if next_cursor:
+        nav.append(InlineKeyboardButton(text="Вперёд ›", callback_data=admin_page_cb(f, "n", next_cursor)))
+    if nav:
+        rows.append(nav)
+    return InlineKeyboardMarkup(inline_keyboard=rows)
+
 # --- Инлайн: выбор услуги (для клиента) ---
 
 def services_keyboard(services: Sequence, cols: int = 2) -> InlineKeyboardMarkup:
@@ -43,16 +140,102 @@ def services_keyboard(services: Sequence, cols: int = 2) -> InlineKeyboardMarkup
         rows.append(row)
     return InlineKeyboardMarkup(inline_keyboard=rows)
 
+# --- Инлайн: календарь записи (для клиента) ---
+
+MONTHS_RU = [
+    "", "Январь", "Февраль", "Март", "Апрель", "Май", "Июнь",
+    "Июль", "Август", "Сентябрь", "Октябрь", "Ноябрь", "Декабрь",
+]
+WEEKDAYS_RU = ["Пн", "Вт", "Ср", "Чт", "Пт", "Сб", "Вс"]
+CAL_NOOP = "cal_noop"
+
+
+def _noop(text: str) -> InlineKeyboardButton:
+    return InlineKeyboardButton(text=text, callback_data=CAL_NOOP)
+
+
+def calendar_keyboard(
+    year: int, month: int, free_days: Collection[dt.date], *, has_prev: bool, has_next: bool
+) -> InlineKeyboardMarkup:
+    """Месяц сеткой Пн–Вс: кнопки только у дней со свободными слотами."""
+    prev_y, prev_m = (year, month - 1) if month > 1 else (year - 1, 12)
+    next_y, next_m = (year, month + 1) if month < 12 else (year + 1, 1)
+    rows: list[list[InlineKeyboardButton]] = [[
+        InlineKeyboardButton(text="‹", callback_data=f"cal_nav_{prev_y:04d}-{prev_m:02d}") if has_prev else _noop(" "),
+        _noop(f"{MONTHS_RU[month]} {year}"),
+        InlineKeyboardButton(text="›", callback_data=f"cal_nav_{next_y:04d}-{next_m:02d}") if has_next else _noop(" "),
+    ]]
+    rows.append([_noop(d) for d in WEEKDAYS_RU])
+    for week in calendar.Calendar().monthdatescalendar(year, month):
+        row = []
+        for day in week:
+            if day.month != month:
+                row.append(_noop(" "))
+            elif day in free_days:
+                row.append(InlineKeyboardButton(text=str(day.day), callback_data=f"cal_day_{day.isoformat()}"))
+            else:
+                row.append(_noop("·"))
+        rows.append(row)
+    return InlineKeyboardMarkup(inline_keyboard=rows)
+
+
+def time_slots_keyboard(day: dt.date, slots: Sequence[dt.datetime], cols: int = 4) -> InlineKeyboardMarkup:
+    """Свободное время выбранного дня + возврат к месяцу."""
+    rows: list[list[InlineKeyboardButton]] = []
+    row: list[InlineKeyboardButton] = []
+    for i, start in enumerate(slots, 1):
+        row.append(InlineKeyboardButton(
+            text=start.strftime("%H:%M"), callback_data=f"cal_time_{start.strftime('%Y-%m-%dT%H:%M')}"
+        ))
+        if i % cols == 0:
+            rows.append(row)
+            row = []
+    if row:
+        rows.append(row)
+    rows.append([InlineKeyboardButton(text="‹ К календарю", callback_data=f"cal_nav_{day.year:04d}-{day.month:02d}")])
+    return InlineKeyboardMarkup(inline_keyboard=rows)
+
 # --- Инлайн: управление своей записью (для клиента) ---
 
-def my_appointment_keyboard(appointment_id: int) -> InlineKeyboardMarkup:
-    """Инлайн-кнопки для клиента: перенос / отмена записи."""
-    return InlineKeyboardMarkup(
-        inline_keyboard=[[
-            InlineKeyboardButton(text="🔁 Перенести", callback_data=f"cli_resched_{appointment_id}"),
-            InlineKeyboardButton(text="❌ Отменить",  callback_data=f"cli_cancel_{appointment_id}"),
-        ]]
-    )
+MY_PAGE_PREFIX = "cli_my"
+
+
+def my_page_cb(direction: str = "f", cursor: Optional[Cursor] = None) -> str:
+    return f"{MY_PAGE_PREFIX}:{direction}:{_pack_cursor(cursor)}"
+
+
+def parse_my_page_cb(data: str) -> tuple[str, Optional[Cursor]]:
+    _, direction, us, appt_id = data.split(":")
+    if direction not in ("f", "n", "p"):
+        raise ValueError(data)
+    return direction, (_unpack_cursor(us, appt_id) if direction != "f" else None)
+
+
+def my_appointments_keyboard(
+    appointment_ids: Sequence[tuple[int, int]],
+    *,
+    prev_cursor: Optional[Cursor] = None,
+    next_cursor: Optional[Cursor] = None,
+) -> InlineKeyboardMarkup:
+    """
+    Одна клавиатура на всю страницу «Мои записи».
+    appointment_ids — пары (номер строки в тексте, id записи).
+    """
+    rows = [
+        [
+            InlineKeyboardButton(text=f"🔁 Перенести №{n}", callback_data=f"cli_resched_{appt_id}"),
+            InlineKeyboardButton(text=f"❌ Отменить №{n}",  callback_data=f"cli_cancel_{appt_id}"),
+        ]
+        for n, appt_id in appointment_ids
+    ]
+    nav = []
+    if prev_cursor:
+        nav.append(InlineKeyboardButton(text="‹ Назад", callback_data=my_page_cb("p", prev_cursor)))
+    if next_cursor:
+        nav.append(InlineKeyboardButton(text="Вперёд ›", callback_data=my_page_cb("n", next_cursor)))
+    if nav:
+        rows.append(nav)
+    return InlineKeyboardMarkup(inline_keyboard=rows)
 
 # --- Reply-меню ---
 
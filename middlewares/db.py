@@ -0,0 +1,39 @@
+from __future__ import annotations
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from database import UOW_KEY, commit, discard_after_commit
+
+
+class DbSessionMiddleware(BaseMiddleware):
+    """
+    Одна сессия БД на апдейт: хендлеры получают её как `session`.
+    Всё, что хендлер и сервисы сделали через неё, фиксируется одним commit
+    после хендлера (или раньше — явным database.commit(session) перед
+    сообщениями во внешний мир, в том числе после одних чтений: иначе
+    соединение простаивает «idle in transaction», пока ждём Telegram).
+    При исключении транзакция откатывается.
+    Соединение из пула берётся только при первом запросе.
+    """
+    def __init__(self, session_pool: async_sessionmaker):
+        self.session_pool = session_pool
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        async with self.session_pool() as session:
+            session.info[UOW_KEY] = True
+            data["session"] = session
+            try:
+                result = await handler(event, data)
+            except Exception:
+                discard_after_commit(session)
+                raise
+            await commit(session)
+            return result
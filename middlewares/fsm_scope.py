@@ -0,0 +1,27 @@
+from __future__ import annotations
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+
+from utils.fsm_cache import open_update_scope, close_update_scope
+
+
+class FsmCacheScopeMiddleware(BaseMiddleware):
+    """
+    Открывает кеш FSM на время одного апдейта (utils.fsm_cache.CachedStorage):
+    state/data читаются из хранилища не больше одного раза за апдейт.
+    Регистрируется outer-middleware до FSMContextMiddleware — тот уже
+    читает state при создании контекста.
+    """
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        token = open_update_scope()
+        try:
+            return await handler(event, data)
+        finally:
+            close_update_scope(token)
@@ -0,0 +1,36 @@
+from __future__ import annotations
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+
+from utils.metrics import HANDLER_SECONDS, HANDLER_ERRORS
+from utils.loopmon import current_handler
+
+
+def _handler_name(data: Dict[str, Any]) -> str:
+    """client.cmd_start / admin.bulk_command — модуль хендлера без пакета."""
+    obj = data.get("handler")
+    fn = getattr(obj, "callback", None)
+    if fn is None:
+        return "unknown"
+    module = getattr(fn, "__module__", "").rsplit(".", 1)[-1]
+    return f"{module}.{getattr(fn, '__name__', 'unknown')}"
+
+
+class HandlerMetricsMiddleware(BaseMiddleware):
+    """Гистограмма времени и счётчик исключений по каждому хендлеру (utils.metrics)."""
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        name = _handler_name(data)
+        # для детектора медленных колбэков (utils.loopmon)
+        token = current_handler.set(name)
+        try:
+            with HANDLER_SECONDS.time(errors=HANDLER_ERRORS, handler=name):
+                return await handler(event, data)
+        finally:
+            current_handler.reset(token)
@@ -1,19 +1,75 @@
 from __future__ import annotations
-from time import monotonic
-from typing import Any, Awaitable, Callable, Dict
+import logging
+from collections import Counter
+from typing import Any, Awaitable, Callable, Dict, Optional
 
 from aiogram import BaseMiddleware
+from aiogram.dispatcher.flags import get_flag
 from aiogram.types import Message, CallbackQuery
 
+from config import (
+    THROTTLE_RATE,
+    THROTTLE_BURST,
+    THROTTLE_RULES,
+    THROTTLE_REDIS_PREFIX,
+    THROTTLE_MAX_KEYS,
+)
+from utils.ratelimit import BucketMap, RedisTokenBucket
+
+log = logging.getLogger(__name__)
+
+
 class ThrottlingMiddleware(BaseMiddleware):
     """
-    Простая защита от спама: ограничиваем частоту событий от одного пользователя.
+    Защита от спама: token bucket на пользователя и область.
     Не применяется, если у пользователя активно состояние FSM (бот чего-то ждёт).
+
+    Область — флаг хендлера flags={"throttle": "..."}, иначе самый длинный
+    подходящий префикс callback_data из rules, иначе msg / cb.
+    Два уровня: бакеты в памяти (ограниченный LRU) отсекают флуд без похода
+    в Redis, а Lua-бакет в Redis делает лимит общим для всех реплик.
+    Redis недоступен — решает локальный уровень.
     """
-    def __init__(self, rate: float = 0.5):
-        # минимальный интервал между событиями одного типа (сек)
+    def __init__(
+        self,
+        *,
+        rate: float = THROTTLE_RATE,
+        burst: float = THROTTLE_BURST,
+        rules: Optional[Dict[str, tuple[float, float]]] = None,
+        redis=None,
+    ):
         self.rate = rate
-        self._last: Dict[tuple[int, str], float] = {}  # (user_id, kind) -> ts
+        self.burst = burst
+        self.rules = dict(THROTTLE_RULES if rules is None else rules)
+        self._prefixes = sorted(self.rules, key=len, reverse=True)
+        self._local = BucketMap(maxsize=THROTTLE_MAX_KEYS)
+        self._shared = RedisTokenBucket(redis, prefix=THROTTLE_REDIS_PREFIX) if redis is not None else None
+        # метрики
+        self.passed = 0
+        self.throttled = 0
+        self.redis_errors = 0
+        self.throttled_by_scope: Counter[str] = Counter()
+
+    def _scope(self, event: Message | CallbackQuery, data: Dict[str, Any]) -> str:
+        flag = get_flag(data, "throttle")
+        if flag:
+            return str(flag)
+        if isinstance(event, CallbackQuery):
+            cb = event.data or ""
+            return next((p for p in self._prefixes if cb.startswith(p)), "cb")
+        return "msg"
+
+    async def _allow(self, key: str, rate: float, burst: float) -> bool:
+        if not self._local.try_acquire(key, rate, burst):
+            return False
+        if self._shared is None:
+            return True
+        try:
+            return await self._shared.try_acquire(key, rate, burst)
+        except Exception as e:
+            self.redis_errors += 1
+            log.debug("Shared throttling unavailable: %s", e)
+            return True
 
     async def __call__(
         self,
@@ -22,22 +78,32 @@ class ThrottlingMiddleware(BaseMiddleware):
         data: Dict[str, Any],
     ) -> Any:
         # если есть активное состояние FSM — не троттлим
-        state = data.get("state")
-        if state and await state.get_state():
+        # (raw_state уже прочитал FSMContextMiddleware — второй раз в хранилище не идём)
+        if data.get("raw_state"):
             return await handler(event, data)
 
         user_id = getattr(getattr(event, "from_user", None), "id", None)
         if not user_id:
             return await handler(event, data)
 
-        kind = "cb" if isinstance(event, CallbackQuery) else "msg"
-        key = (user_id, kind)
-
-        now = monotonic()
-        last = self._last.get(key, 0.0)
-        if (now - last) < self.rate:
+        scope = self._scope(event, data)
+        rate, burst = self.rules.get(scope, (self.rate, self.burst))
+        if not await self._allow(f"{user_id}:{scope}", rate, burst):
+            self.throttled += 1
+            self.throttled_by_scope[scope] += 1
             # можно отправить мягкий ответ, если нужно:
             # if isinstance(event, Message): await event.answer("⏳ Слишком часто…")
             return  # тихо игнорируем
-        self._last[key] = now
+        self.passed += 1
         return await handler(event, data)
+
+    def stats(self) -> dict[str, float]:
+        total = self.passed + self.throttled
+        return {
+            "passed": self.passed,
+            "throttled": self.throttled,
+            "throttled_rate": (self.throttled / total) if total else 0.0,
+            "redis_errors": self.redis_errors,
+            "local_keys": len(self._local),
+            "local_evictions": self._local.evictions,
+        }
@@ -2,100 +2,148 @@
 from __future__ import annotations
 
 import datetime as dt
-from typing import Dict, Tuple
+from typing import Optional
 
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from loguru import logger
 
+from config import (
+    REMINDER_POLL_SEC,
+    REMINDER_BATCH_SIZE,
+    REMINDER_CATCHUP_SEC,
+    REMINDER_MAX_ATTEMPTS,
+    REMINDER_RETRY_BASE_SEC,
+    REMINDER_RETRY_MAX_SEC,
+)
 from utils.helpers import TZ, format_local_datetime
-from database import get_appointments, AppointmentStatus
-
-
-# Простая защита от повторных отправок в течение одной и той же минуты
-# ключ: (appointment_id, "24h"/"2h", minute_dt)
-_recent: Dict[Tuple[int, str, dt.datetime], float] = {}
-
-WINDOW_SEC = 90  # сколько держим метку «уже слали» (сек)
-
-def _floor_minute(d: dt.datetime) -> dt.datetime:
-    return d.astimezone(TZ).replace(second=0, microsecond=0)
+from services.delivery import TelegramDelivery, OutgoingMessage
+from utils.metrics import REMINDER_TICK_SECONDS
+from database import (
+    claim_due_reminders,
+    fail_reminders,
+    mark_reminders_sent,
+    release_reminders,
+    next_reminder_due,
+    schedule_missing_reminders,
+)
+
+# Напоминания лежат в таблице reminders (считаются при подтверждении/переносе).
+# Тик забирает наступившие пачками, статус «отправлено» пишется в БД —
+# рестарт не теряет и не дублирует напоминания.
+
+HUMAN_LABELS = {
+    "24h": "за 24 часа",
+    "1h": "за 1 час",
+}
+
+CATCH_UP = dt.timedelta(seconds=REMINDER_CATCHUP_SEC)
+STALE_SENDING = dt.timedelta(minutes=5)  # упали посреди отправки — заберём снова
+
+_sched: Optional[AsyncIOScheduler] = None
+
+
+def _message(r) -> OutgoingMessage:
+    a = r.appointment
+    svc_name = getattr(getattr(a, "service", None), "name", None) or "Услуга"
+    human = HUMAN_LABELS.get(r.kind, "")
+    return OutgoingMessage(
+        chat_id=a.user_id,
+        text=(
+            f"🔔 Напоминание {human} до визита:\n"
+            f"💇 {svc_name}\n"
+            f"📅 {format_local_datetime(a.date)}"
+        ),
+        key=r.id,
+    )
 
-def _same_minute(a: dt.datetime, b: dt.datetime) -> bool:
-    return _floor_minute(a) == _floor_minute(b)
 
-def _prune_recent(now_ts: float) -> None:
-    # чистим устаревшие метки
-    to_del = [k for k, exp in _recent.items() if exp <= now_ts]
-    for k in to_del:
-        _recent.pop(k, None)
+async def _tick(bot):
+    with REMINDER_TICK_SECONDS.time():
+        while True:
+            now = dt.datetime.now(TZ)
+            batch = await claim_due_reminders(
+                now, limit=REMINDER_BATCH_SIZE, catch_up=CATCH_UP, stale_after=STALE_SENDING
+            )
+            if not batch:
+                break
+
+            report = await TelegramDelivery(bot).send_many(_message(r) for r in batch)
+            await mark_reminders_sent(report.sent)
+            await fail_reminders(report.dropped)
+            await release_reminders(
+                report.failed,
+                max_attempts=REMINDER_MAX_ATTEMPTS,
+                backoff_sec=REMINDER_RETRY_BASE_SEC,
+                backoff_max_sec=REMINDER_RETRY_MAX_SEC,
+            )
+            logger.info("Reminders tick: {}", report.summary())
+            if len(batch) < REMINDER_BATCH_SIZE:
+                break
+
+        await _arm_next(bot)
+
+
+async def _arm_next(bot) -> None:
+    """Точный запуск к сроку ближайшего напоминания (опрос — только страховка)."""
+    if _sched is None:
+        return
+    due = await next_reminder_due()
+    if due is None:
+        return
+    run_at = max(due, dt.datetime.now(TZ))
+    if run_at - dt.datetime.now(TZ) >= dt.timedelta(seconds=REMINDER_POLL_SEC):
+        return  # успеет плановый тик
+    _sched.add_job(
+        _tick,
+        trigger="date",
+        run_date=run_at,
+        args=[bot],
+        id="reminders_next",
+        replace_existing=True,
+    )
 
 
-async def _tick(bot):
-    now = dt.datetime.now(TZ)
-    # целевые моменты: через 24 часа и через 2 часа от текущего момента
-    targets = [
-        (now + dt.timedelta(hours=24), "24h", "за 24 часа"),
-        (now + dt.timedelta(hours=1),  "1h",  "за 1 час"),
-    ]
-
-    # чистим кэш дублей
-    _prune_recent(now.timestamp())
-
-    appts = await get_appointments()  # ORM-объекты
-    for a in appts:
-        # напоминаем только по подтверждённым записям
-        if getattr(a, "status", None) != AppointmentStatus.CONFIRMED:
-            continue
-        
-        # пропускаем слишком далёкие/прошедшие (защитный фильтр)
-        delta = (a.date - now).total_seconds()
-        if not(0 <= delta < 25 * 3600):
-            continue
-
-        # убеждаемся, что дата aware
-        if a.date.tzinfo is None:
-            logger.warning("Appointment %s has naive datetime, skipping", a.id)
-            continue
-
-        svc_name = getattr(getattr(a, "service", None), "name", None) or "Услуга"
-        when_str = format_local_datetime(a.date)
-
-        for target_dt, label, human in targets:
-            if _same_minute(a.date, target_dt):
-                key = (a.id, label, _floor_minute(target_dt))
-                if key in _recent:
-                    continue  # в эту минуту уже отправляли
-
-                try:
-                    await bot.send_message(
-                        a.user_id,
-                        f"🔔 Напоминание {human} до визита:\n"
-                        f"💇 {svc_name}\n"
-                        f"📅 {when_str}"
-                    )
-                    # помечаем, чтобы не слать повторно в ту же минуту
-                    _recent[key] = (now.timestamp() + WINDOW_SEC)
-                    logger.info("Reminder sent (%s) for appointment %s", label, a.id)
-                except Exception as e:
-                    logger.warning("Failed to notify user %s for appt %s: %r", a.user_id, a.id, e)
+async def _catch_up(bot):
+    """При старте: дозаполнить очередь и разослать пропущенное за время простоя."""
+    added = await schedule_missing_reminders(CATCH_UP)
+    if added:
+        logger.info("Reminder queue backfilled: {} reminders", added)
+    await _tick(bot)
 
 
 def setup_scheduler(bot):
     """
-    Регистрирует периодическую задачу напоминаний.
-    Запуск каждую минуту, таймзона берётся из helpers.TZ.
+    Регистрирует задачи напоминаний: страховочный опрос очереди раз в
+    REMINDER_POLL_SEC и точный запуск к сроку ближайшего напоминания.
+    Таймзона берётся из helpers.TZ. При нескольких репликах вызывается
+    только на лидере (utils.leader), повторный вызов ничего не делает.
     """
+    global _sched
+    if _sched is not None:
+        return
     sched = AsyncIOScheduler(timezone=str(TZ))
     # add_job с replace_existing=True — безопасно при рестартах.
     sched.add_job(
         _tick,
         trigger="interval",
-        minutes=1,
+        seconds=REMINDER_POLL_SEC,
         args=[bot],
         id="reminders",
         replace_existing=True,
         coalesce=True,   # если были пропуски во время сна — выполним один раз
         max_instances=1  # не пускать параллельные тики
     )
+    sched.add_job(_catch_up, args=[bot], id="reminders_catch_up", replace_existing=True)
     sched.start()
+    _sched = sched
     logger.info("📆 Reminder scheduler started")
+
+
+def stop_scheduler() -> None:
+    """Снять задачи (лидерство потеряно или остановка); начатый тик доработает сам."""
+    global _sched
+    if _sched is None:
+        return
+    _sched.shutdown(wait=False)
+    _sched = None
+    logger.info("📆 Reminder scheduler stopped")
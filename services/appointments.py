@@ -3,32 +3,48 @@ from __future__ import annotations
 import datetime as dt
 import logging
 
+from sqlalchemy.ext.asyncio import AsyncSession
+
 from database import (
     add_appointment as db_add,                  # (user_id: int, service_id: int, date: dt) -> int
     update_appointment as db_update_date,
     delete_appointment as db_delete,
-    update_appointment_event_id as db_set_event_id,
     get_appointment_by_id,
-    get_service_by_id,
     has_time_conflict,
+    after_commit,
+    confirm_appointments,
+    cancel_appointments,
+    delete_appointments,
+    BulkAppointment,
+    SlotTakenError,
 )
-from services.calendar import (
-    add_event_to_calendar,
-    update_event_in_calendar,
-    delete_event_from_calendar,
-    add_appointment_to_sheet,
-    update_appointment_in_sheet,
-    delete_appointment_from_sheet,
-)
+from services.delivery import TelegramDelivery, OutgoingMessage, DeliveryReport
+from utils.helpers import format_local_datetime
+from services.outbox import outbox_worker
+from services.availability import availability
+from services.catalog import catalog
 
 log = logging.getLogger(__name__)
 
 
+# Calendar и Sheets синхронизирует services.outbox: событие пишется в той же
+# транзакции, что и запись, поэтому клиент ждёт только Postgres.
+# session — сессия апдейта (middlewares.db); воркер будим и кеш слотов
+# сбрасываем только после фиксации транзакции.
+
+
+def _after_write(session: AsyncSession | None) -> None:
+    after_commit(session, outbox_worker.notify)
+    after_commit(session, availability.invalidate)
+
+
 async def create_appointment_and_sync(
     user_id: int,            # telegram_id
     user_name: str,          # имя клиента (для красивых сообщений/Sheets)
     service_id: int,
     date: dt.datetime,
+    *,
+    session: AsyncSession | None = None,
 ) -> int:
     
     # валидация имени
@@ -43,95 +59,114 @@ async def create_appointment_and_sync(
         raise ValueError("нельзя бронировать прошедшее время")
 
     # тянем услугу
-    svc = await get_service_by_id(service_id)
+    svc = await catalog.get(service_id)
     if not svc:
         raise ValueError("Service not found")
-    service_name = svc.name
 
 
     # конфликт слотов
-    if await has_time_conflict(date, svc.duration_min):
-        raise ValueError("Этот слот уже занят")
-
-    # БД
-    appt_id = await db_add(user_id=user_id, service_id=service_id, date=date, name=user_name)
+    if await has_time_conflict(date, svc.duration_min, session=session):
+        raise SlotTakenError()
+
+    # БД + outbox (Calendar, Sheets); параллельную бронь отсечёт ограничение в БД → SlotTakenError
+    appt_id = await db_add(
+        user_id=user_id, service_id=service_id, date=date, name=user_name, sync=True, session=session
+    )
+    _after_write(session)
     log.info("Appointment %s created in DB", appt_id)
 
-    # Calendar
-    duration_min = getattr(svc, "duration_min", 60)
-    event_id = await add_event_to_calendar(user_name, service_name, date, duration_min=duration_min)
-    if event_id:
-        await db_set_event_id(appt_id, event_id)
-        log.info("Calendar event set for %s: %s", appt_id, event_id)
-    else:
-        log.warning("Calendar failed for appointment %s", appt_id)
-
-    # Sheets
-    await add_appointment_to_sheet(user_name, service_name, date)
-
-
     return appt_id
 
 
 async def reschedule_appointment_and_sync(
     appointment_id: int,
     new_date: dt.datetime,
+    *,
+    session: AsyncSession | None = None,
 ) -> bool:
     if new_date.tzinfo is None:
         raise ValueError("new_date должен быть timezone-aware")
     if new_date < dt.datetime.now(new_date.tzinfo):
         raise ValueError("нельзя переносить в прошлое")
 
-    appt = await get_appointment_by_id(appointment_id)
+    appt = await get_appointment_by_id(appointment_id, session=session)
     if not appt:
         return False
 
-    # тянем услугу и имя клиента
-    svc = await get_service_by_id(appt.service_id) if appt.service_id else None
-    service_name = getattr(svc, "name", "Услуга")
+    # длительность услуги
+    svc = await catalog.get(appt.service_id) if appt.service_id else None
     duration_min = getattr(svc, "duration_min", appt.duration_min or 60)
-    user_name = getattr(appt, "name", "Клиент")
 
     # проверка конфликта
-    if await has_time_conflict(new_date, duration_min, exclude_id=appointment_id):
-        raise ValueError("Этот слот уже занят")
+    if await has_time_conflict(new_date, duration_min, exclude_id=appointment_id, session=session):
+        raise SlotTakenError()
 
-    old_date = appt.date
-
-    # БД
-    ok = await db_update_date(appointment_id, new_date)
+    # БД + outbox (Calendar, Sheets); параллельную бронь отсечёт ограничение в БД → SlotTakenError
+    ok = await db_update_date(appointment_id, new_date, sync=True, session=session)
     if not ok:
         return False
-
-    # Calendar
-    if appt.event_id:
-        success = await update_event_in_calendar(appt.event_id, user_name, service_name, new_date, duration_min=duration_min)
-        if not success:
-            log.warning("Calendar update failed for %s", appointment_id)
-
-    # Sheets
-    updated = await update_appointment_in_sheet(user_name, service_name, old_date, new_date)
-    if not updated:
-        log.warning("Sheets update failed for %s", appointment_id)
+    _after_write(session)
 
     return True
 
 
-async def delete_appointment_and_sync(appointment_id: int) -> bool:
-    appt = await get_appointment_by_id(appointment_id)
-    if not appt:
-        return False
-
-    svc = await get_service_by_id(appt.service_id) if appt.service_id else None
-    service_name = getattr(svc, "name", "Услуга")
-    user_name = getattr(appt, "name", "Клиент")
-
-    # Calendar
-    if appt.event_id:
-        _ = await delete_event_from_calendar(appt.event_id)
-
-    # Sheets
-    await delete_appointment_from_sheet(user_name, service_name, appt.date)
-
-    # DB
-    return await db_delete(appointment_id)
+async def delete_appointment_and_sync(
+    appointment_id: int, *, session: AsyncSession | None = None
+) -> bool:
+    # БД + outbox (Calendar, Sheets)
+    ok = await db_delete(appointment_id, sync=True, session=session)
+    if ok:
+        _after_write(session)
+    return ok
+
+
+# ---------- Массовые операции (админка) ----------
+BULK_ACTIONS = {
+    "confirm": confirm_appointments,
+    "cancel": cancel_appointments,
+    "delete": delete_appointments,
+}
+
+_BULK_CLIENT_TEXT = {
+    "confirm": "✅ Ваша запись подтверждена!\n💇 {service}\n📅 {date}",
+    "cancel": "❌ Ваша запись на {service} ({date}) отменена.",
+    "delete": "❌ Ваша запись на {service} ({date}) отменена.",
+}
+
+
+async def bulk_appointments(
+    action: str,
+    ids: list[int] | None = None,
+    *,
+    since: dt.datetime | None = None,
+    until: dt.datetime | None = None,
+    status: str | None = None,
+    session: AsyncSession | None = None,
+) -> list[BulkAppointment]:
+    """
+    Одна SQL-операция над всеми записями фильтра; Calendar/Sheets — через outbox.
+    status=None у confirm означает «по умолчанию только ожидающие».
+    """
+    op = BULK_ACTIONS[action]
+    filters = {"since": since, "until": until, "session": session}
+    if status is not None or action != "confirm":
+        filters["status"] = status
+    rows = await op(ids, **filters)
+    if rows:
+        _after_write(session)
+    log.info("Bulk %s: %s appointments", action, len(rows))
+    return rows
+
+
+async def notify_bulk_clients(bot, action: str, rows: list[BulkAppointment]) -> DeliveryReport:
+    """Уведомить клиентов после фиксации; общий лимит Bot API соблюдает TelegramDelivery."""
+    template = _BULK_CLIENT_TEXT[action]
+    messages = [
+        OutgoingMessage(
+            chat_id=r.user_id,
+            text=template.format(service=r.service_name or "Услуга", date=format_local_datetime(r.date)),
+            key=r.id,
+        )
+        for r in rows
+    ]
+    return await TelegramDelivery(bot).send_many(messages)
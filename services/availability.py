@@ -0,0 +1,136 @@
+# services/availability.py
+from __future__ import annotations
+
+import calendar
+import datetime as dt
+import logging
+import time
+from typing import Optional
+
+from config import (
+    WORK_DAY_START,
+    WORK_DAY_END,
+    SLOT_STEP_MIN,
+    BOOKING_HORIZON_DAYS,
+    AVAILABILITY_CACHE_SEC,
+)
+from database import get_free_slots
+from utils.helpers import TZ
+
+log = logging.getLogger(__name__)
+
+# день -> свободные начала слотов (местное время)
+MonthSlots = dict[dt.date, list[dt.datetime]]
+
+
+def _parse_hhmm(s: str) -> dt.time:
+    h, m = s.strip().split(":", 1)
+    return dt.time(int(h), int(m))
+
+
+class AvailabilityCache:
+    """
+    Свободные слоты по месяцам для выбранной длительности услуги.
+
+    Месяц считается одним запросом (database.get_free_slots) и живёт в кеше
+    ttl секунд; после создания/переноса/удаления записи кеш сбрасывается.
+    Между репликами кеш не согласуется — лишний показанный слот отсечёт
+    ограничение в БД (SlotTakenError).
+    """
+
+    def __init__(
+        self,
+        *,
+        ttl: float = AVAILABILITY_CACHE_SEC,
+        step_min: int = SLOT_STEP_MIN,
+        day_start: dt.time = _parse_hhmm(WORK_DAY_START),
+        day_end: dt.time = _parse_hhmm(WORK_DAY_END),
+        horizon_days: int = BOOKING_HORIZON_DAYS,
+    ):
+        self.ttl = ttl
+        self.step_min = step_min
+        self.day_start = day_start
+        self.day_end = day_end
+        self.horizon_days = horizon_days
+        self._data: dict[tuple[int, int, int], tuple[float, MonthSlots]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    # --- границы ---
+    def today(self) -> dt.date:
+        return dt.datetime.now(TZ).date()
+
+    def last_day(self) -> dt.date:
+        return self.today() + dt.timedelta(days=self.horizon_days)
+
+    def month_in_range(self, year: int, month: int) -> bool:
+        first = dt.date(year, month, 1)
+        today = self.today()
+        return (year, month) >= (today.year, today.month) and first <= self.last_day()
+
+    # --- API ---
+    async def month(self, year: int, month: int, duration_min: int) -> MonthSlots:
+        key = (year, month, duration_min)
+        cached = self._data.get(key)
+        now = time.monotonic()
+        if cached and now - cached[0] < self.ttl:
+            self.hits += 1
+            return cached[1]
+        self.misses += 1
+
+        slots = await self._load(year, month, duration_min)
+        self._data[key] = (now, slots)
+        return slots
+
+    async def day(self, day: dt.date, duration_min: int) -> list[dt.datetime]:
+        return (await self.month(day.year, day.month, duration_min)).get(day, [])
+
+    def invalidate(self) -> None:
+        self._data.clear()
+
+    def stats(self) -> dict[str, float]:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits / total) if total else 0.0,
+            "cached_months": len(self._data),
+        }
+
+    # --- внутреннее ---
+    async def _load(self, year: int, month: int, duration_min: int) -> MonthSlots:
+        first = max(dt.date(year, month, 1), self.today())
+        last = min(dt.date(year, month, calendar.monthrange(year, month)[1]), self.last_day())
+        out: MonthSlots = {}
+        if first > last:
+            return out
+
+        started = time.perf_counter()
+        rows = await get_free_slots(
+            first, last,
+            duration_min=duration_min,
+            step_min=self.step_min,
+            day_start=self.day_start,
+            day_end=self.day_end,
+            tz=str(TZ),
+            not_before=dt.datetime.now(TZ),
+        )
+        for start in rows:
+            local = start.astimezone(TZ)
+            out.setdefault(local.date(), []).append(local)
+        log.debug(
+            "Availability %04d-%02d (%s min): %s slots in %.1f ms",
+            year, month, duration_min, len(rows), (time.perf_counter() - started) * 1000,
+        )
+        return out
+
+
+availability = AvailabilityCache()
+
+
+def parse_slot(raw: str) -> Optional[dt.datetime]:
+    """'2026-10-17T14:30' из callback_data → aware datetime в TZ."""
+    try:
+        return dt.datetime.strptime(raw, "%Y-%m-%dT%H:%M").replace(tzinfo=TZ)
+    except ValueError:
+        return None
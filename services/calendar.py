@@ -3,19 +3,34 @@ from __future__ import annotations
 from datetime import timedelta
 from tenacity import retry, wait_exponential, stop_after_attempt
 
-import asyncio
 import datetime as dt
+import functools
 import logging
+import threading
 import zoneinfo
-from typing import Optional
+from typing import NamedTuple, Optional, Sequence
 
 import gspread
+import google_auth_httplib2
+import httplib2
+from google.auth.transport.requests import Request as GoogleAuthRequest
 from google.oauth2 import service_account
 from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
 from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
 
-from config import GCAL_CREDENTIALS_FILE, GCAL_CALENDAR_ID
+from config import (
+    GCAL_CREDENTIALS_FILE,
+    GCAL_CALENDAR_ID,
+    SHEETS_BATCH_WINDOW_SEC,
+    GOOGLE_EXECUTOR_WORKERS,
+    GOOGLE_CALENDAR_CONCURRENCY,
+    GOOGLE_SHEETS_CONCURRENCY,
+    GOOGLE_MAX_QUEUE,
+)
+from services.sheets_writer import SheetsBatchWriter
+from utils.executor import BoundedExecutor
+from utils.metrics import GOOGLE_SECONDS, GOOGLE_ERRORS
 
 log = logging.getLogger(__name__)
 if not log.handlers:
@@ -34,11 +49,119 @@ if not GCAL_CREDENTIALS_FILE or not GCAL_CALENDAR_ID:
     raise ValueError("GCAL_CREDENTIALS_FILE и GCAL_CALENDAR_ID должны быть заданы")
 
 # ---- Клиенты (sync) ----
+class CalendarClientManager:
+    """
+    Долгоживущий клиент Google Calendar на весь процесс.
+
+    Credentials читаются с диска один раз и общие для всех потоков.
+    Resource (и его httplib2-соединение) — свой на каждый поток: httplib2 не
+    потокобезопасен, а воркеры google_executor переиспользуются, поэтому
+    keep-alive соединения живут между вызовами.
+    Токен обновляет фоновый поток заранее, за REFRESH_MARGIN до истечения;
+    сетевой запрос обновления идёт без блокировок, а счётчики — под своим
+    _stats_lock, так что service() на горячем пути обновление не ждёт.
+    """
+
+    REFRESH_MARGIN = dt.timedelta(minutes=5)
+    RETRY_DELAY_SEC = 30.0
+    HTTP_TIMEOUT_SEC = 30
+
+    def __init__(self, credentials_file: str, scopes: list[str]):
+        self._credentials_file = credentials_file
+        self._scopes = scopes
+        self._lock = threading.Lock()          # только ленивое создание credentials
+        self._stats_lock = threading.Lock()
+        self._local = threading.local()
+        self._creds: Optional[service_account.Credentials] = None
+        self._stop = threading.Event()
+        self._refresher: Optional[threading.Thread] = None
+        # счётчики
+        self.builds = 0
+        self.cache_hits = 0
+        self.token_refreshes = 0
+        self.refresh_errors = 0
+
+    # --- credentials ---
+    def _load_credentials(self) -> service_account.Credentials:
+        return service_account.Credentials.from_service_account_file(
+            self._credentials_file, scopes=self._scopes
+        )
+
+    def _credentials(self) -> service_account.Credentials:
+        with self._lock:
+            if self._creds is None:
+                # публикуем только обновлённые credentials: если первое обновление
+                # упало (сеть при старте), следующий вызов попробует заново
+                creds = self._load_credentials()
+                self._refresh(creds)
+                self._creds = creds
+                self._refresher = threading.Thread(
+                    target=self._refresh_loop, name="gcal-token-refresher", daemon=True
+                )
+                self._refresher.start()
+            return self._creds
+
+    def _refresh(self, creds: service_account.Credentials) -> None:
+        creds.refresh(GoogleAuthRequest())
+        with self._stats_lock:
+            self.token_refreshes += 1
+
+    def _seconds_until_refresh(self) -> float:
+        expiry = self._creds.expiry  # naive UTC (так принято в google-auth)
+        if expiry is None:
+            return self.RETRY_DELAY_SEC
+        now = dt.datetime.now(dt.timezone.utc).replace(tzinfo=None)
+        return max((expiry - now - self.REFRESH_MARGIN).total_seconds(), 0.0)
+
+    def _refresh_loop(self) -> None:
+        while not self._stop.wait(self._seconds_until_refresh()):
+            try:
+                self._refresh(self._creds)
+                log.debug("Calendar token refreshed, expires at %s", self._creds.expiry)
+            except Exception as e:
+                with self._stats_lock:
+                    self.refresh_errors += 1
+                log.warning("Не удалось обновить токен Calendar: %s", e)
+                if self._stop.wait(self.RETRY_DELAY_SEC):
+                    return
+
+    # --- service ---
+    def service(self):
+        """Resource Calendar v3 для текущего потока (создаётся один раз на поток)."""
+        svc = getattr(self._local, "service", None)
+        if svc is not None:
+            with self._stats_lock:
+                self.cache_hits += 1
+            return svc
+
+        http = google_auth_httplib2.AuthorizedHttp(
+            self._credentials(), http=httplib2.Http(timeout=self.HTTP_TIMEOUT_SEC)
+        )
+        svc = build("calendar", "v3", http=http, cache_discovery=False)
+        self._local.service = svc
+        with self._stats_lock:
+            self.builds += 1
+        return svc
+
+    def stats(self) -> dict[str, int]:
+        with self._stats_lock:
+            return {
+                "builds": self.builds,
+                "cache_hits": self.cache_hits,
+                "token_refreshes": self.token_refreshes,
+                "refresh_errors": self.refresh_errors,
+            }
+
+    def close(self) -> None:
+        """Остановить фоновое обновление токена (при завершении бота)."""
+        self._stop.set()
+
+
+calendar_client = CalendarClientManager(GCAL_CREDENTIALS_FILE, SCOPES_CAL)
+
+
 def _calendar_service_sync():
-    creds = service_account.Credentials.from_service_account_file(
-        GCAL_CREDENTIALS_FILE, scopes=SCOPES_CAL
-    )
-    return build("calendar", "v3", credentials=creds, cache_discovery=False)
+    return calendar_client.service()
 
 def _gspread_client_sync() -> gspread.Client:
     creds = service_account.Credentials.from_service_account_file(
@@ -97,74 +220,271 @@ def _ensure_sheet_headers(sheet) -> None:
 def _fmt_sheet_dt(d: dt.datetime) -> str:
     return d.astimezone(TZ).strftime("%d.%m.%Y %H:%M")
 
+# ---- Индекс строк листа ----
+SheetKey = tuple[str, str, str]  # (name, service, date) в нормализованном виде
+
+
+
+def _sheet_key(name: str, service: str, date_str: str) -> SheetKey:
+    return (str(name or "").strip().lower(), str(service or "").strip().lower(), str(date_str or "").strip())
+
+
+def _row_key(row: list[str]) -> Optional[SheetKey]:
+    if len(row) < 3:
+        return None
+    return _sheet_key(row[0], row[1], row[2])
+
+
+def _sheet_row(values: list[str]) -> dict:
+    """Строка для batchUpdate; значения пишем как есть (RAW), без разбора дат."""
+    return {"values": [{"userEnteredValue": {"stringValue": str(v)}} for v in values]}
+
+
+class SheetRowIndex:
+    """
+    Индекс «(name, service, date) → номер строки» для листа Appointments.
+
+    Строится одним get_all_values() и дальше ведётся инкрементально:
+    добавленные строки дописываются в конец, удаление сдвигает всё, что ниже.
+    Перед записью затрагиваемые строки сверяются одним values_batch_get;
+    если там уже не то (лист правили руками), индекс считается устаревшим
+    и перечитывается целиком.
+
+    Ключи, которых не оказалось и в только что перечитанном листе, попадают
+    в негативный кеш: повторный move/delete такой строки лист заново не
+    перечитывает. Кеш сбрасывается при каждом перечитывании.
+
+    Все операции идут под одним локом: номера строк остаются согласованными,
+    даже когда вызовы приходят из разных потоков.
+    """
+
+    MAX_MISSING = 10_000
+
+    def __init__(self, spreadsheet_title: str = "Appointments"):
+        self._title = spreadsheet_title
+        self._lock = threading.RLock()
+        self._sheet = None
+        self._rows: dict[SheetKey, int] = {}
+        self._missing: set[SheetKey] = set()   # точно нет на листе (по последнему перечитыванию)
+        self._last_row = 1  # последняя занятая строка (1 — заголовок)
+        self._loaded = False
+        # счётчики
+        self.lookups = 0
+        self.rebuilds = 0
+        self.stale = 0
+
+    # --- внутреннее ---
+    def _worksheet(self):
+        if self._sheet is None:
+            sheet = _gspread_client_sync().open(self._title).sheet1
+            _ensure_sheet_headers(sheet)
+            self._sheet = sheet
+        return self._sheet
+
+    def _rebuild(self) -> None:
+        records = self._worksheet().get_all_values()
+        rows: dict[SheetKey, int] = {}
+        for i, row in enumerate(records[1:], start=2):
+            key = _row_key(row)
+            if key is not None:
+                rows.setdefault(key, i)
+        self._rows = rows
+        self._missing = set()
+        self._last_row = max(len(records), 1)
+        self._loaded = True
+        self.rebuilds += 1
+
+    def _verify(self, keys: list[SheetKey]) -> bool:
+        """Совпадают ли строки индекса с листом (один запрос на все ключи)."""
+        if not keys:
+            return True
+        sheet = self._worksheet()
+        ranges = [f"'{sheet.title}'!A{self._rows[k]}:C{self._rows[k]}" for k in keys]
+        resp = sheet.spreadsheet.values_batch_get(ranges)
+        value_ranges = resp.get("valueRanges", [])
+        if len(value_ranges) != len(keys):
+            return False
+        for key, vr in zip(keys, value_ranges):
+            values = (vr.get("values") or [[]])[0]
+            if _row_key(values) != key:
+                return False
+        return True
+
+    def _forget_row(self, row: int) -> None:
+        """Строка удалена: убираем её ключ и сдвигаем всё, что ниже."""
+        self._rows = {
+            k: (r - 1 if r > row else r)
+            for k, r in self._rows.items()
+            if r != row
+        }
+        self._last_row -= 1
+
+    # --- операции ---
+    def apply_batch(
+        self,
+        appends: list[list[str]],
+        moves: list[tuple[SheetKey, list[str]]],
+        deletes: list[SheetKey],
+    ) -> tuple[list[bool], list[bool]]:
+        """
+        Применить пачку изменений одним spreadsheets.batchUpdate.
+
+        appends — строки [name, service, date] (уже существующие пропускаются);
+        moves — (ключ строки, её новые значения); deletes — ключи строк.
+        Возвращает, нашлась ли строка для каждого move и каждого delete.
+        """
+        with self._lock:
+            if not self._loaded:
+                self._rebuild()
+            self.lookups += len(appends) + len(moves) + len(deletes)
+
+            wanted = [k for k, _ in moves] + list(deletes)
+            known = [k for k in {*wanted, *(_row_key(v) for v in appends)} if k in self._rows]
+            unknown = [k for k in wanted if k not in self._rows and k not in self._missing]
+            if unknown or not self._verify(known):
+                # индекс устарел — перечитываем лист целиком (один раз на пачку)
+                self.stale += 1
+                self._rebuild()
+                if len(self._missing) < self.MAX_MISSING:
+                    self._missing.update(k for k in wanted if k not in self._rows)
+
+            sheet = self._worksheet()
+            sheet_id = sheet.id
+            requests: list[dict] = []
+
+            moved_ok: list[bool] = []
+            renamed: list[tuple[int, SheetKey, SheetKey]] = []
+            for key, values in moves:
+                row = self._rows.get(key)
+                moved_ok.append(row is not None)
+                if row is None:
+                    continue
+                requests.append({"updateCells": {
+                    "range": {
+                        "sheetId": sheet_id,
+                        "startRowIndex": row - 1, "endRowIndex": row,
+                        "startColumnIndex": 2, "endColumnIndex": 3,  # только дата
+                    },
+                    "rows": [_sheet_row(values[2:3])],
+                    "fields": "userEnteredValue",
+                }})
+                renamed.append((row, key, _row_key(values)))
+
+            deleted_ok: list[bool] = []
+            deleted_rows: set[int] = set()
+            for key in deletes:
+                row = self._rows.get(key)
+                deleted_ok.append(row is not None)
+                if row is not None:
+                    deleted_rows.add(row)
+            # снизу вверх, чтобы номера оставшихся строк не поехали
+            for row in sorted(deleted_rows, reverse=True):
+                requests.append({"deleteDimension": {"range": {
+                    "sheetId": sheet_id, "dimension": "ROWS",
+                    "startIndex": row - 1, "endIndex": row,
+                }}})
+
+            fresh: list[list[str]] = []
+            seen: set[SheetKey] = set()
+            for values in appends:
+                key = _row_key(values)
+                if key in self._rows or key in seen:
+                    continue
+                seen.add(key)
+                fresh.append(values)
+            if fresh:
+                requests.append({"appendCells": {
+                    "sheetId": sheet_id,
+                    "rows": [_sheet_row(v) for v in fresh],
+                    "fields": "userEnteredValue",
+                }})
+
+            if requests:
+                sheet.spreadsheet.batch_update({"requests": requests})
+
+            # индекс — в том же порядке, что и запросы
+            for row, old_key, new_key in renamed:
+                if self._rows.get(old_key) == row:
+                    del self._rows[old_key]
+                self._rows.setdefault(new_key, row)
+                self._missing.discard(new_key)
+            for row in sorted(deleted_rows, reverse=True):
+                self._forget_row(row)
+            for values in fresh:
+                self._last_row += 1
+                key = _row_key(values)
+                self._rows.setdefault(key, self._last_row)
+                self._missing.discard(key)
+
+            return moved_ok, deleted_ok
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "rows": len(self._rows),
+                "missing": len(self._missing),
+                "lookups": self.lookups,
+                "rebuilds": self.rebuilds,
+                "stale": self.stale,
+            }
+
+
+# Все блокирующие вызовы Google — в своём пуле, с лимитом и очередью на каждый API
+google_executor = BoundedExecutor(
+    "google",
+    max_workers=GOOGLE_EXECUTOR_WORKERS,
+    lanes={"calendar": GOOGLE_CALENDAR_CONCURRENCY, "sheets": GOOGLE_SHEETS_CONCURRENCY},
+    max_queue=GOOGLE_MAX_QUEUE,
+)
+
+sheet_index = SheetRowIndex()
+sheets_writer = SheetsBatchWriter(
+    sheet_index.apply_batch,
+    window=SHEETS_BATCH_WINDOW_SEC,
+    run=functools.partial(google_executor.run, "sheets"),
+)
+
+
 # =========================
 #   Google Sheets (async)
 # =========================
+# Все изменения идут через sheets_writer: за короткое окно они склеиваются
+# и уходят в Google одним batchUpdate.
 async def add_appointment_to_sheet(name: str, service: str, date: dt.datetime) -> None:
     """Добавить строку, если её ещё нет."""
-    def _sync():
-        client = _gspread_client_sync()
-        sheet = client.open("Appointments").sheet1
-        _ensure_sheet_headers(sheet)
-        target = [str(name or "").strip(), str(service or "").strip(), _fmt_sheet_dt(date)]
-        records = sheet.get_all_values()
-        for row in records[1:]:
-            if (
-                len(row) >= 3
-                and row[0].strip().lower() == target[0].lower()
-                and row[1].strip().lower() == target[1].lower()
-                and row[2].strip() == target[2]
-            ):
-                return
-        sheet.append_row(target)
-    await asyncio.to_thread(_sync)
+    target = [str(name or "").strip(), str(service or "").strip(), _fmt_sheet_dt(date)]
+    await sheets_writer.append(_row_key(target), target)
 
 async def update_appointment_in_sheet(
     name: str, service: str, old_date: dt.datetime, new_date: dt.datetime
 ) -> bool:
     """Найти строку по (name, service, old_date) и заменить дату."""
-    def _sync() -> bool:
-        client = _gspread_client_sync()
-        sheet = client.open("Appointments").sheet1
-        _ensure_sheet_headers(sheet)
-        records = sheet.get_all_values()
-        old_str = _fmt_sheet_dt(old_date)
-        new_str = _fmt_sheet_dt(new_date)
-        for i, row in enumerate(records, start=1):
-            if (
-                len(row) >= 3
-                and row[0].strip().lower() == name.strip().lower()
-                and row[1].strip().lower() == service.strip().lower()
-                and row[2].strip() == old_str
-            ):
-                sheet.update_cell(i, 3, new_str)
-                return True
-        return False
-    return await asyncio.to_thread(_sync)
+    target = [str(name or "").strip(), str(service or "").strip(), _fmt_sheet_dt(new_date)]
+    return await sheets_writer.move(
+        _sheet_key(name, service, _fmt_sheet_dt(old_date)), _row_key(target), target
+    )
 
 async def delete_appointment_from_sheet(name: str, service: str, date: dt.datetime) -> bool:
     """Удалить строку по (name, service, date)."""
-    def _sync() -> bool:
-        client = _gspread_client_sync()
-        sheet = client.open("Appointments").sheet1
-        _ensure_sheet_headers(sheet)
-        records = sheet.get_all_values()
-        date_str = _fmt_sheet_dt(date)
-        for i, row in enumerate(records, start=1):
-            if (
-                len(row) >= 3
-                and row[0].strip().lower() == name.strip().lower()
-                and row[1].strip().lower() == service.strip().lower()
-                and row[2].strip() == date_str
-            ):
-                sheet.delete_rows(i)
-                return True
-        return False
-    return await asyncio.to_thread(_sync)
+    return await sheets_writer.delete(_sheet_key(name, service, _fmt_sheet_dt(date)))
 
 # =========================
 #   Google Calendar (async)
 # =========================
+def _event_body(name: str, service: str, date: dt.datetime, duration_min: int) -> dict:
+    start = date.astimezone(TZ)
+    end = start + dt.timedelta(minutes=duration_min)
+    return {
+        "summary": f"{name} - {service}",
+        "start": {"dateTime": start.isoformat(), "timeZone": "Asia/Tashkent"},
+        "end": {"dateTime": end.isoformat(), "timeZone": "Asia/Tashkent"},
+    }
+
+async def _calendar_call(call: str, fn, *args):
+    """Вызов Calendar API в потоке с замером задержки и счётчиком ошибок."""
+    with GOOGLE_SECONDS.time(errors=GOOGLE_ERRORS, api="calendar", call=call):
+        return await google_executor.run("calendar", fn, *args)
+
 # Ретраи при HttpError/сетевых обрывах
 _retry = dict(
     retry=retry_if_exception_type((HttpError, ConnectionError, TimeoutError)),
@@ -181,18 +501,12 @@ async def add_event_to_calendar(
 
     def _sync() -> Optional[str]:
         svc = _calendar_service_sync()
-        start = date.astimezone(TZ)
-        end = start + dt.timedelta(minutes=duration_min)
-        body = {
-            "summary": f"{name} - {service}",
-            "start": {"dateTime": start.isoformat(), "timeZone": "Asia/Tashkent"},
-            "end": {"dateTime": end.isoformat(), "timeZone": "Asia/Tashkent"},
-        }
+        body = _event_body(name, service, date, duration_min)
         event = svc.events().insert(calendarId=GCAL_CALENDAR_ID, body=body).execute()
         return event.get("id")
 
     try:
-        return await asyncio.to_thread(_sync)
+        return await _calendar_call("insert", _sync)
     except Exception as e:
         log.error("Ошибка добавления в Calendar: %s", e)
         return None
@@ -219,18 +533,12 @@ async def update_event_in_calendar(
 
     def _sync() -> bool:
         svc = _calendar_service_sync()
-        start = new_date.astimezone(TZ)
-        end = start + dt.timedelta(minutes=minutes)
-        body = {
-            "summary": f"{name} - {service}",
-            "start": {"dateTime": start.isoformat(), "timeZone": "Asia/Tashkent"},
-            "end": {"dateTime": end.isoformat(), "timeZone": "Asia/Tashkent"},
-        }
+        body = _event_body(name, service, new_date, minutes)
         svc.events().patch(calendarId=GCAL_CALENDAR_ID, eventId=event_id, body=body).execute()
         return True
 
     try:
-        return await asyncio.to_thread(_sync)
+        return await _calendar_call("patch", _sync)
     except Exception as e:
         log.error("Ошибка обновления Calendar: %s", e)
         return False
@@ -250,7 +558,109 @@ async def delete_event_from_calendar(event_id: str) -> bool:
                 return True
             raise
     try:
-        return await asyncio.to_thread(_sync)
+        return await _calendar_call("delete", _sync)
     except Exception as e:
         log.error("Ошибка удаления из Calendar: %s", e)
         return False
+
+
+# =========================
+#   Google Calendar (batch)
+# =========================
+# Один HTTP-запрос на пачку операций (batch endpoint Google).
+# Для массовых действий: отмена дня, пересинхронизация после сбоя, outbox.
+CALENDAR_BATCH_LIMIT = 50  # Google рекомендует не больше 50 вызовов в пачке
+
+
+class CalendarInsert(NamedTuple):
+    name: str
+    service: str
+    date: dt.datetime
+    duration_min: int = 60
+
+
+class CalendarPatch(NamedTuple):
+    event_id: str
+    name: str
+    service: str
+    date: dt.datetime
+    duration_min: int = 60
+
+
+class CalendarBatchResult(NamedTuple):
+    op: str                  # "insert" | "patch" | "delete"
+    index: int               # позиция во входном списке своей операции
+    ok: bool
+    event_id: Optional[str]  # для insert — id созданного события
+    error: Optional[str] = None
+
+
+def _batch_sync(
+    inserts: Sequence[CalendarInsert],
+    patches: Sequence[CalendarPatch],
+    deletes: Sequence[str],
+) -> list[CalendarBatchResult]:
+    svc = _calendar_service_sync()
+    events = svc.events()
+
+    calls: list[tuple[str, int, Optional[str], object]] = []
+    for i, item in enumerate(inserts):
+        assert item.date.tzinfo is not None, "date должен быть timezone-aware"
+        body = _event_body(item.name, item.service, item.date, item.duration_min)
+        calls.append(("insert", i, None, events.insert(calendarId=GCAL_CALENDAR_ID, body=body)))
+    for i, item in enumerate(patches):
+        assert item.date.tzinfo is not None, "date должен быть timezone-aware"
+        body = _event_body(item.name, item.service, item.date, item.duration_min)
+        calls.append(("patch", i, item.event_id,
+                      events.patch(calendarId=GCAL_CALENDAR_ID, eventId=item.event_id, body=body)))
+    for i, event_id in enumerate(deletes):
+        calls.append(("delete", i, event_id, events.delete(calendarId=GCAL_CALENDAR_ID, eventId=event_id)))
+
+    results: dict[str, CalendarBatchResult] = {}
+
+    def _callback(request_id: str, response, exception) -> None:
+        op, index, event_id, _ = calls[int(request_id)]
+        if exception is None:
+            if op == "insert":
+                event_id = (response or {}).get("id")
+            results[request_id] = CalendarBatchResult(op, index, True, event_id)
+            return
+        status = getattr(getattr(exception, "resp", None), "status", None)
+        if op == "delete" and status in (404, 410):
+            results[request_id] = CalendarBatchResult(op, index, True, event_id)  # уже удалено
+        else:
+            results[request_id] = CalendarBatchResult(op, index, False, event_id, str(exception))
+
+    for start in range(0, len(calls), CALENDAR_BATCH_LIMIT):
+        chunk = range(start, min(start + CALENDAR_BATCH_LIMIT, len(calls)))
+        batch = svc.new_batch_http_request(callback=_callback)
+        for n in chunk:
+            batch.add(calls[n][3], request_id=str(n))
+        try:
+            batch.execute()
+        except Exception as e:
+            log.error("Ошибка пакетного запроса в Calendar: %s", e)
+            for n in chunk:
+                op, index, event_id, _ = calls[n]
+                results.setdefault(str(n), CalendarBatchResult(op, index, False, event_id, str(e)))
+
+    return [results[str(n)] for n in range(len(calls))]
+
+
+async def batch_calendar_ops(
+    inserts: Sequence[CalendarInsert] = (),
+    patches: Sequence[CalendarPatch] = (),
+    deletes: Sequence[str] = (),
+) -> list[CalendarBatchResult]:
+    """
+    Пакетно создать/обновить/удалить события.
+    Результаты — по одному на операцию, в порядке: inserts, patches, deletes.
+    Удаление уже удалённого события (404/410) считается успехом.
+    """
+    if not (inserts or patches or deletes):
+        return []
+    results = await _calendar_call("batch", _batch_sync, list(inserts), list(patches), list(deletes))
+    failed = sum(not r.ok for r in results)
+    if failed:
+        GOOGLE_ERRORS.inc(failed, api="calendar", call="batch_item")
+    return results
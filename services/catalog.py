@@ -0,0 +1,185 @@
+# services/catalog.py
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from decimal import Decimal
+from typing import NamedTuple, Optional
+
+from config import CATALOG_CHANNEL, CATALOG_TTL_SEC
+from database import list_services
+from utils.fuzzy import TrigramIndex
+
+log = logging.getLogger(__name__)
+
+
+class ServiceRecord(NamedTuple):
+    """Неизменяемая копия строки services (без привязки к сессии)."""
+    id: int
+    name: str
+    duration_min: int
+    price: Decimal
+
+
+class _Snapshot(NamedTuple):
+    version: int
+    loaded_at: float
+    ordered: tuple[ServiceRecord, ...]        # как list_services(): по имени
+    by_id: dict[int, ServiceRecord]
+    by_lname: dict[str, ServiceRecord]
+    matcher: TrigramIndex[ServiceRecord]      # нечёткий поиск по названию
+
+
+class ServiceCatalog:
+    """
+    Каталог услуг в памяти процесса.
+
+    Таблица services меняется редко, поэтому читаем её целиком один раз
+    (при старте и после инвалидации) и отдаём иммутабельный снимок.
+    Инвалидация между репликами — сообщение в Redis-канал CATALOG_CHANNEL
+    (см. publish_invalidation); на случай потерянного сообщения снимок
+    дополнительно устаревает через CATALOG_TTL_SEC.
+    """
+
+    POLL_SEC = 1.0  # ожидание сообщения в канале за один опрос
+
+    def __init__(self, *, ttl: float = CATALOG_TTL_SEC, channel: str = CATALOG_CHANNEL):
+        self.ttl = ttl
+        self.channel = channel
+        self._snap: Optional[_Snapshot] = None
+        self._version = 0
+        self._reload_lock: Optional[asyncio.Lock] = None
+        self._listener: Optional[asyncio.Task] = None
+        # метрики
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    # --- чтение ---
+    async def all(self) -> tuple[ServiceRecord, ...]:
+        return (await self._snapshot()).ordered
+
+    async def get(self, service_id: int) -> Optional[ServiceRecord]:
+        return (await self._snapshot()).by_id.get(service_id)
+
+    async def by_index(self, idx: int) -> Optional[ServiceRecord]:
+        """idx — номер в списке, который видит клиент (с нуля)."""
+        ordered = (await self._snapshot()).ordered
+        return ordered[idx] if 0 <= idx < len(ordered) else None
+
+    async def by_name(self, name: str, *, partial: bool = False) -> Optional[ServiceRecord]:
+        """
+        Без учёта регистра. partial — нечёткий поиск (префиксы, опечатки):
+        возвращаем лучший вариант, только если он однозначен.
+        """
+        snap = await self._snapshot()
+        exact = snap.by_lname.get((name or "").strip().lower())
+        if exact or not partial:
+            return exact
+        return snap.matcher.best(name)
+
+    async def search(self, query: str, limit: int = 5) -> list[ServiceRecord]:
+        """Кандидаты по убыванию похожести — для подсказки «возможно, вы имели в виду»."""
+        return [m.value for m in (await self._snapshot()).matcher.search(query, limit)]
+
+    @property
+    def version(self) -> int:
+        return self._snap.version if self._snap else 0
+
+    # --- загрузка / инвалидация ---
+    async def load(self) -> None:
+        """Перечитать таблицу services (прогрев при старте и после инвалидации)."""
+        rows = await list_services()
+        records = tuple(
+            ServiceRecord(r.id, r.name, r.duration_min, r.price) for r in rows
+        )
+        self._version += 1
+        self._snap = _Snapshot(
+            version=self._version,
+            loaded_at=time.monotonic(),
+            ordered=records,
+            by_id={r.id: r for r in records},
+            by_lname={r.name.lower(): r for r in records},
+            matcher=TrigramIndex((r.name, r) for r in records),
+        )
+        log.info("Service catalog v%s loaded: %s services", self._version, len(records))
+
+    def invalidate(self) -> None:
+        self.invalidations += 1
+        self._snap = None
+
+    async def _snapshot(self) -> _Snapshot:
+        snap = self._snap
+        if snap is not None and time.monotonic() - snap.loaded_at < self.ttl:
+            self.hits += 1
+            return snap
+
+        self.misses += 1
+        if self._reload_lock is None:
+            self._reload_lock = asyncio.Lock()
+        async with self._reload_lock:
+            # пока ждали лок, каталог мог перечитать соседний запрос
+            if self._snap is None or self._snap is snap:
+                await self.load()
+            return self._snap
+
+    # --- межпроцессная инвалидация ---
+    def start(self, redis) -> None:
+        """Подписаться на канал инвалидации (redis.asyncio.Redis)."""
+        if self._listener is None or self._listener.done():
+            self._listener = asyncio.create_task(self._listen(redis), name="catalog-invalidation")
+
+    async def stop(self) -> None:
+        if self._listener:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+
+    async def _listen(self, redis) -> None:
+        lost = False  # подписка обрывалась — сообщения за это время могли пропасть
+        while True:
+            try:
+                pubsub = redis.pubsub(ignore_subscribe_messages=True)
+                try:
+                    await pubsub.subscribe(self.channel)
+                    if lost:
+                        self.invalidate()
+                        lost = False
+                    while True:
+                        # опрос с таймаутом: клиент общий с FSM (socket_timeout=3),
+                        # и listen() принял бы тишину в канале за обрыв
+                        msg = await pubsub.get_message(ignore_subscribe_messages=True, timeout=self.POLL_SEC)
+                        if msg and msg.get("type") == "message":
+                            log.info("Service catalog invalidated via %s", self.channel)
+                            self.invalidate()
+                finally:
+                    await pubsub.aclose()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                lost = True
+                log.warning("Catalog invalidation listener failed: %s; resubscribing in 5s", e)
+                await asyncio.sleep(5)
+
+    def stats(self) -> dict[str, float]:
+        total = self.hits + self.misses
+        return {
+            "version": self.version,
+            "size": len(self._snap.ordered) if self._snap else 0,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits / total) if total else 0.0,
+            "invalidations": self.invalidations,
+        }
+
+
+async def publish_invalidation(redis, channel: str = CATALOG_CHANNEL) -> int:
+    """Вызывать после правки services: все реплики перечитают каталог."""
+    return await redis.publish(channel, "services")
+
+
+catalog = ServiceCatalog()
@@ -0,0 +1,110 @@
+# services/delivery.py
+from __future__ import annotations
+
+import asyncio
+import logging
+from time import monotonic
+from typing import Any, Hashable, Iterable, NamedTuple, Optional
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramRetryAfter, TelegramForbiddenError, TelegramBadRequest
+
+from config import TG_GLOBAL_RATE, TG_PER_CHAT_INTERVAL, TG_SEND_CONCURRENCY
+from utils.ratelimit import TokenBucket
+
+log = logging.getLogger(__name__)
+
+MAX_RETRY_AFTER_ATTEMPTS = 3
+
+# общий бюджет бота на исходящие рассылки (все конвейеры в процессе делят его)
+telegram_bucket = TokenBucket(rate=TG_GLOBAL_RATE)
+
+
+class OutgoingMessage(NamedTuple):
+    chat_id: int
+    text: str
+    key: Hashable = None                 # чем вызывающий опознаёт сообщение (id напоминания и т.п.)
+    reply_markup: Optional[Any] = None
+
+
+class DeliveryReport(NamedTuple):
+    sent: list            # ключи доставленных
+    failed: list          # ключи недоставленных из-за временной ошибки (можно повторить)
+    dropped: list         # ключи, которые Telegram отверг насовсем (бот заблокирован, чат не найден)
+    throttled: int        # сколько раз упёрлись в RetryAfter
+
+    def summary(self) -> str:
+        return (f"sent={len(self.sent)} throttled={self.throttled} "
+                f"failed={len(self.failed)} dropped={len(self.dropped)}")
+
+
+class TelegramDelivery:
+    """
+    Ограниченный по параллельности конвейер отправки сообщений.
+
+    Соблюдает общий лимит бота (token bucket) и интервал между сообщениями
+    в один чат. TelegramRetryAfter — лимит всего бота, поэтому на указанное
+    время ставится на паузу общий bucket (а не одна корутина), затем повтор.
+    Forbidden/BadRequest повторять бессмысленно — такие сообщения идут в dropped.
+    """
+
+    def __init__(
+        self,
+        bot: Bot,
+        *,
+        concurrency: int = TG_SEND_CONCURRENCY,
+        per_chat_interval: float = TG_PER_CHAT_INTERVAL,
+        bucket: TokenBucket = telegram_bucket,
+    ):
+        self.bot = bot
+        self.concurrency = concurrency
+        self.per_chat_interval = per_chat_interval
+        self.bucket = bucket
+
+    async def send_many(self, messages: Iterable[OutgoingMessage]) -> DeliveryReport:
+        sem = asyncio.Semaphore(self.concurrency)
+        chat_locks: dict[int, asyncio.Lock] = {}
+        chat_next: dict[int, float] = {}
+        report = DeliveryReport(sent=[], failed=[], dropped=[], throttled=0)
+        throttled = 0
+
+        async def _one(msg: OutgoingMessage) -> None:
+            # сообщения одному чату — строго по очереди и с интервалом
+            lock = chat_locks.setdefault(msg.chat_id, asyncio.Lock())
+            async with lock:
+                wait = chat_next.get(msg.chat_id, 0.0) - monotonic()
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                async with sem:
+                    await self._send(msg, report, on_throttle=_throttled)
+                chat_next[msg.chat_id] = monotonic() + self.per_chat_interval
+
+        def _throttled() -> None:
+            nonlocal throttled
+            throttled += 1
+
+        await asyncio.gather(*(_one(m) for m in messages))
+        return report._replace(throttled=throttled)
+
+    async def _send(self, msg: OutgoingMessage, report: DeliveryReport, *, on_throttle) -> None:
+        for attempt in range(1, MAX_RETRY_AFTER_ATTEMPTS + 1):
+            await self.bucket.acquire()
+            try:
+                await self.bot.send_message(msg.chat_id, msg.text, reply_markup=msg.reply_markup)
+                report.sent.append(msg.key)
+                return
+            except TelegramRetryAfter as e:
+                on_throttle()
+                self.bucket.pause(e.retry_after)
+                if attempt == MAX_RETRY_AFTER_ATTEMPTS:
+                    break
+            except (TelegramForbiddenError, TelegramBadRequest) as e:
+                report.dropped.append(msg.key)
+                log.warning("Chat %s: message rejected: %s", msg.chat_id, e)
+                return
+            except Exception as e:
+                report.failed.append(msg.key)
+                log.warning("Chat %s: send failed: %r", msg.chat_id, e)
+                return
+        report.failed.append(msg.key)
+        log.warning("Chat %s: flood control, giving up", msg.chat_id)
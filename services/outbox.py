@@ -0,0 +1,425 @@
+# services/outbox.py
+from __future__ import annotations
+
+import asyncio
+import datetime as dt
+import logging
+import uuid
+from typing import NamedTuple, Optional
+
+from sqlalchemy import exists, func, literal, literal_column, select, update
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+
+from config import OUTBOX_POLL_INTERVAL, OUTBOX_BATCH_SIZE, OUTBOX_MAX_ATTEMPTS, OUTBOX_CLAIM_LEASE_SEC
+from database import (
+    AsyncSessionLocal,
+    Appointment,
+    OutboxEvent,
+    OutboxKind,
+    OutboxStatus,
+)
+from services.calendar import (
+    CalendarInsert,
+    CalendarPatch,
+    batch_calendar_ops,
+    add_appointment_to_sheet,
+    update_appointment_in_sheet,
+    delete_appointment_from_sheet,
+)
+
+log = logging.getLogger(__name__)
+
+BACKOFF_BASE_SEC = 5
+BACKOFF_MAX_SEC = 15 * 60
+
+
+# событие ещё не донесено: ждёт очереди / бэкоффа или в работе у воркера
+_UNFINISHED = (OutboxStatus.PENDING, OutboxStatus.PROCESSING)
+
+
+class _Claimed(NamedTuple):
+    """Снимок забранного события — живёт дольше сессии, в которой его взяли."""
+    id: int
+    appointment_id: int
+    kind: str
+    payload: dict
+    attempts: int
+    token: str
+
+
+class OutboxSyncError(RuntimeError):
+    """Google вернул отказ — событие нужно повторить позже."""
+
+
+class OutboxWorker:
+    """
+    Фоновый разборщик таблицы outbox → Google Calendar / Sheets.
+
+    Порядок событий одной записи сохраняется: в работу берём только голову
+    цепочки — событие, раньше которого у записи нет незавершённых.
+    Забор — короткая транзакция (FOR UPDATE SKIP LOCKED + статус processing,
+    безопасно и при нескольких репликах); вызовы Google идут уже без
+    транзакции и соединения из пула, итоги пишутся второй транзакцией.
+    Головы разных записей уходят в Calendar одним batch-запросом.
+    Если событие упало, цепочка ждёт следующей попытки (экспоненциальная задержка).
+    Итоги пишутся, только пока забор держит аренду (claim_token): реплика с
+    истёкшей арендой не перезапишет результат того, кто забрал событие после.
+    Голова, упавшая насовсем (failed), цепочку не держит: перенос без event_id
+    создаёт событие заново, а удалять в Calendar нечего.
+    """
+
+    def __init__(
+        self,
+        *,
+        batch_size: int = OUTBOX_BATCH_SIZE,
+        poll_interval: float = OUTBOX_POLL_INTERVAL,
+        max_attempts: int = OUTBOX_MAX_ATTEMPTS,
+    ):
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        # счётчики и gauge'и
+        self.processed = 0
+        self.retried = 0
+        self.failed = 0
+        self.recreated = 0
+        self.lease_lost = 0
+        self.backlog = 0
+        self.lag_sec = 0.0
+
+    # --- жизненный цикл ---
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="outbox-worker")
+            log.info("Outbox worker started")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def notify(self) -> None:
+        """Разбудить воркер сразу после коммита, не дожидаясь опроса."""
+        self._wakeup.set()
+
+    def stats(self) -> dict[str, float]:
+        return {
+            "backlog": self.backlog,
+            "lag_sec": self.lag_sec,
+            "processed": self.processed,
+            "retried": self.retried,
+            "failed": self.failed,
+            "recreated": self.recreated,
+            "lease_lost": self.lease_lost,
+        }
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                taken = await self.drain_once()
+                await self.refresh_gauges()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                log.exception("Outbox drain failed")
+                taken = 0
+            if taken >= self.batch_size:
+                continue  # пачка обработана целиком — вероятно, есть ещё
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    async def refresh_gauges(self) -> None:
+        async with AsyncSessionLocal() as s:
+            count, oldest = (await s.execute(
+                select(func.count(OutboxEvent.id), func.min(OutboxEvent.created_at))
+                .where(OutboxEvent.status.in_(_UNFINISHED))
+            )).one()
+        self.backlog = int(count or 0)
+        self.lag_sec = (
+            (dt.datetime.now(dt.timezone.utc) - oldest).total_seconds() if oldest else 0.0
+        )
+
+    # --- разбор ---
+    async def drain_once(self) -> int:
+        """
+        Одна пачка: забрать головы цепочек (короткая транзакция), сходить
+        в Google без открытой транзакции и соединения, записать итоги
+        (вторая короткая транзакция). Возвращает, сколько событий обработали.
+        """
+        claimed = await self._claim()
+        if not claimed:
+            return 0
+        progress = [dict(ev.payload) for ev in claimed]
+        results = await self._sync_wave(claimed, progress)
+        await self._record(claimed, progress, results)
+        return len(claimed)
+
+    async def _claim(self) -> list[_Claimed]:
+        """
+        Берём только головы цепочек: у записи нет более раннего незавершённого
+        события (в бэкоффе или в работе у другой реплики) — так порядок
+        событий одной записи сохраняется. Забранные помечаем processing с
+        арендой до available_at и своим claim_token: если реплика упадёт,
+        событие заберут снова (с новым токеном).
+        """
+        earlier = aliased(OutboxEvent)
+        now = dt.datetime.now(dt.timezone.utc)
+        token = uuid.uuid4().hex
+        async with AsyncSessionLocal() as s, s.begin():
+            rows = list((await s.execute(
+                select(OutboxEvent)
+                .where(
+                    # литералы, а не параметры: иначе планировщик не возьмёт частичный ix_outbox_pending
+                    OutboxEvent.status.in_([literal_column(f"'{st}'") for st in _UNFINISHED]),
+                    OutboxEvent.available_at <= now,
+                    ~exists().where(
+                        earlier.appointment_id == OutboxEvent.appointment_id,
+                        earlier.id < OutboxEvent.id,
+                        earlier.status.in_(_UNFINISHED),
+                    ),
+                )
+                .order_by(OutboxEvent.id.asc())
+                .limit(self.batch_size)
+                .with_for_update(skip_locked=True, of=OutboxEvent)
+            )).scalars())
+            if not rows:
+                return []
+
+            await s.execute(
+                update(OutboxEvent)
+                .where(OutboxEvent.id.in_([r.id for r in rows]))
+                .values(status=OutboxStatus.PROCESSING, claim_token=token,
+                        available_at=now + dt.timedelta(seconds=OUTBOX_CLAIM_LEASE_SEC))
+                .execution_options(synchronize_session=False)
+            )
+            event_ids = dict((await s.execute(
+                select(Appointment.id, Appointment.event_id)
+                .where(Appointment.id.in_({r.appointment_id for r in rows}))
+            )).all())
+
+        return [self._hydrate(r, event_ids, token) for r in rows]
+
+    @staticmethod
+    def _hydrate(row: OutboxEvent, event_ids: dict[int, Optional[str]], token: str) -> _Claimed:
+        """
+        Сверяемся с appointments: событие в Calendar могло появиться уже после
+        постановки в outbox (админ подтвердил раньше воркера), а саму запись
+        могли удалить — тогда create (и перенос, который может обернуться
+        созданием) делать незачем.
+        """
+        payload = dict(row.payload)
+        if row.kind in (OutboxKind.CREATE, OutboxKind.RESCHEDULE) and row.appointment_id not in event_ids:
+            payload["skip"] = True
+        event_id = event_ids.get(row.appointment_id)
+        if event_id and not payload.get("event_id"):
+            payload["event_id"] = event_id
+        return _Claimed(row.id, row.appointment_id, row.kind, payload, row.attempts, token)
+
+    async def _record(
+        self, claimed: list[_Claimed], progress: list[dict], results: list[Optional[BaseException]]
+    ) -> None:
+        now = dt.datetime.now(dt.timezone.utc)
+        async with AsyncSessionLocal() as s, s.begin():
+            held = set((await s.execute(
+                select(OutboxEvent.id)
+                .where(
+                    OutboxEvent.id.in_([ev.id for ev in claimed]),
+                    OutboxEvent.status == OutboxStatus.PROCESSING,
+                    OutboxEvent.claim_token == claimed[0].token,
+                )
+                .with_for_update()
+            )).scalars())
+            for ev, p, err in zip(claimed, progress, results):
+                if ev.id not in held:
+                    # аренда истекла, событие забрал другой — его итог главнее
+                    self.lease_lost += 1
+                    log.warning("Outbox event %s (%s, appt %s): lease expired, result dropped",
+                                ev.id, ev.kind, ev.appointment_id)
+                    continue
+                if p.get("event_id") and p["event_id"] != ev.payload.get("event_id"):
+                    await self._remember_event_id(s, ev, p["event_id"])
+                elif ev.kind == OutboxKind.DELETE and p.get("event_id") and not err:
+                    await self._forget_event_id(s, ev, p["event_id"])
+                values = self._retry_values(ev, err, now) if err else dict(
+                    status=OutboxStatus.DONE, processed_at=now,
+                )
+                if not err:
+                    self.processed += 1
+                await s.execute(
+                    update(OutboxEvent)
+                    .where(
+                        OutboxEvent.id == ev.id,
+                        OutboxEvent.status == OutboxStatus.PROCESSING,
+                        OutboxEvent.claim_token == ev.token,
+                    )
+                    .values(**values)
+                    .execution_options(synchronize_session=False)
+                )
+
+    async def _remember_event_id(self, s: AsyncSession, ev: _Claimed, event_id: str) -> None:
+        """
+        Calendar выдал event_id: сохраняем в запись и в следующие события цепочки —
+        до следующего CREATE (запись отменили и вернули в работу: у неё будет
+        своё событие, а это удалит DELETE между ними).
+        """
+        later_create = aliased(OutboxEvent)
+        recreated = exists().where(
+            later_create.appointment_id == ev.appointment_id,
+            later_create.kind == OutboxKind.CREATE,
+            later_create.id > ev.id,
+        )
+        await s.execute(
+            update(Appointment)
+            .where(Appointment.id == ev.appointment_id, Appointment.event_id.is_(None), ~recreated)
+            .values(event_id=event_id)
+            .execution_options(synchronize_session=False)
+        )
+        await s.execute(
+            update(OutboxEvent)
+            .where(OutboxEvent.id == ev.id)
+            .values(payload=OutboxEvent.payload.op("||")(literal({"event_id": event_id}, JSONB)))
+            .execution_options(synchronize_session=False)
+        )
+        await s.execute(
+            update(OutboxEvent)
+            .where(
+                OutboxEvent.appointment_id == ev.appointment_id,
+                OutboxEvent.status == OutboxStatus.PENDING,
+                OutboxEvent.id > ev.id,
+                ~exists().where(
+                    later_create.appointment_id == ev.appointment_id,
+                    later_create.kind == OutboxKind.CREATE,
+                    later_create.id > ev.id,
+                    later_create.id <= OutboxEvent.id,
+                ),
+            )
+            .values(payload=OutboxEvent.payload.op("||")(literal({"event_id": event_id}, JSONB)))
+            .execution_options(synchronize_session=False)
+        )
+
+    async def _forget_event_id(self, s: AsyncSession, ev: _Claimed, event_id: str) -> None:
+        """Событие удалено из Calendar — запись больше на него не ссылается."""
+        await s.execute(
+            update(Appointment)
+            .where(Appointment.id == ev.appointment_id, Appointment.event_id == event_id)
+            .values(event_id=None)
+            .execution_options(synchronize_session=False)
+        )
+
+    def _retry_values(self, ev: _Claimed, exc: BaseException, now: dt.datetime) -> dict:
+        attempts = ev.attempts + 1
+        values = dict(attempts=attempts, last_error=repr(exc)[:1000])
+        if attempts >= self.max_attempts:
+            self.failed += 1
+            log.error("Outbox event %s (%s, appt %s) failed for good: %r",
+                      ev.id, ev.kind, ev.appointment_id, exc)
+            return {**values, "status": OutboxStatus.FAILED, "processed_at": now}
+        delay = min(BACKOFF_BASE_SEC * 2 ** (attempts - 1), BACKOFF_MAX_SEC)
+        self.retried += 1
+        log.warning("Outbox event %s (%s, appt %s) retry #%s in %ss: %r",
+                    ev.id, ev.kind, ev.appointment_id, attempts, delay, exc)
+        return {**values, "status": OutboxStatus.PENDING,
+                "available_at": now + dt.timedelta(seconds=delay)}
+
+    # --- внешние вызовы ---
+    async def _sync_wave(
+        self, heads: list[_Claimed], progress: list[dict]
+    ) -> list[Optional[BaseException]]:
+        """
+        Доносит волну событий до Google: все Calendar-операции — одним
+        batch-запросом, затем Sheets (через склеивающий writer).
+        progress — копии payload: сюда пишем полученный event_id, чтобы при
+        повторе не создать событие в Calendar второй раз.
+        Возвращает ошибку (или None) для каждого события.
+        """
+        errors: list[Optional[BaseException]] = [None] * len(heads)
+        slots: dict[str, list[int]] = {"insert": [], "patch": [], "delete": []}
+        inserts: list[CalendarInsert] = []
+        patches: list[CalendarPatch] = []
+        deletes: list[str] = []
+
+        for i, (ev, p) in enumerate(zip(heads, progress)):
+            if p.get("skip"):
+                continue
+            name = p.get("name") or "Клиент"
+            service = p.get("service") or "Услуга"
+            date = dt.datetime.fromisoformat(p["date"])
+            duration_min = int(p.get("duration_min") or 60)
+            event_id = p.get("event_id")
+
+            if ev.kind == OutboxKind.CREATE and not event_id:
+                inserts.append(CalendarInsert(name, service, date, duration_min))
+                slots["insert"].append(i)
+            elif ev.kind == OutboxKind.RESCHEDULE and not event_id:
+                # создание не удалось насовсем (failed) — переносить нечего, создаём заново
+                self.recreated += 1
+                log.warning("Outbox event %s: appt %s has no Calendar event, recreating on reschedule",
+                            ev.id, ev.appointment_id)
+                inserts.append(CalendarInsert(name, service, date, duration_min))
+                slots["insert"].append(i)
+            elif ev.kind == OutboxKind.RESCHEDULE and event_id:
+                patches.append(CalendarPatch(event_id, name, service, date, duration_min))
+                slots["patch"].append(i)
+            elif ev.kind == OutboxKind.DELETE and event_id:
+                deletes.append(event_id)
+                slots["delete"].append(i)
+
+        try:
+            results = await batch_calendar_ops(inserts, patches, deletes)
+        except Exception as e:
+            results = []
+            for op, idx in slots.items():
+                for i in idx:
+                    errors[i] = e
+        for r in results:
+            i = slots[r.op][r.index]
+            if not r.ok:
+                errors[i] = OutboxSyncError(f"Calendar {r.op} failed: {r.error}")
+            elif r.op == "insert":
+                progress[i]["event_id"] = r.event_id
+
+        sheets = await asyncio.gather(
+            *(self._sync_sheet(ev.kind, p) for ev, p, err in zip(heads, progress, errors) if err is None),
+            return_exceptions=True,
+        )
+        it = iter(sheets)
+        for i, err in enumerate(errors):
+            if err is None:
+                res = next(it)
+                if isinstance(res, BaseException):
+                    errors[i] = res
+        return errors
+
+    async def _sync_sheet(self, kind: str, p: dict) -> None:
+        if p.get("skip"):
+            return
+        name = p.get("name") or ""
+        service = p.get("service") or "Услуга"
+        date = dt.datetime.fromisoformat(p["date"])
+
+        if kind == OutboxKind.CREATE:
+            await add_appointment_to_sheet(name, service, date)
+        elif kind == OutboxKind.RESCHEDULE:
+            old_date = dt.datetime.fromisoformat(p["old_date"])
+            if not await update_appointment_in_sheet(name, service, old_date, date):
+                # строки нет (создание упало насовсем) — добавляем, а не теряем запись
+                log.warning("Sheets: row for %s / %s not found, appending", name, old_date)
+                await add_appointment_to_sheet(name, service, date)
+        elif kind == OutboxKind.DELETE:
+            await delete_appointment_from_sheet(name, service, date)
+        else:
+            log.error("Unknown outbox event kind: %s", kind)
+
+
+outbox_worker = OutboxWorker()
@@ -0,0 +1,248 @@
+# services/sheets_writer.py
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Hashable, Optional
+
+from utils.metrics import GOOGLE_SECONDS, GOOGLE_ERRORS
+
+log = logging.getLogger(__name__)
+
+# apply(appends, moves, deletes) -> (moved_ok, deleted_ok); выполняется в потоке
+ApplyBatch = Callable[
+    [list[list[str]], list[tuple[Hashable, list[str]]], list[Hashable]],
+    tuple[list[bool], list[bool]],
+]
+
+# run(fn, *args) — где выполнить apply: по умолчанию asyncio.to_thread
+RunInThread = Callable[..., Awaitable[Any]]
+
+APPEND, MOVE, DELETE = "append", "move", "delete"
+
+# как резолвить future отправителя по итогам flush
+_NONE, _TRUE, _FOUND = "none", "true", "found"
+
+
+class _Op:
+    """Итоговая операция над одной строкой после склейки."""
+    __slots__ = ("kind", "origin", "values", "waiters")
+
+    def __init__(self, kind: str, origin: Optional[Hashable], values: Optional[list[str]]):
+        self.kind = kind
+        self.origin = origin    # ключ существующей строки (move/delete)
+        self.values = values    # итоговые значения строки (append/move)
+        self.waiters: list[tuple[asyncio.Future, str]] = []
+
+
+class _Batch:
+    """
+    Буфер изменений за одно окно.
+    ops: append/move — по итоговому ключу строки, delete — по ключу удаляемой.
+    """
+
+    def __init__(self):
+        self.ops: dict[Hashable, _Op] = {}
+        self.moved_from: set[Hashable] = set()  # строки, которые уже «уехали» на другой ключ
+        self.detached: list[tuple[asyncio.Future, str]] = []  # схлопнулись без запроса
+
+    def add(self, kind: str, key: Hashable, new_key: Optional[Hashable],
+            values: Optional[list[str]], fut: asyncio.Future) -> bool:
+        """Склеить операцию с уже накопленными. False — конфликт, нужна новая пачка."""
+        cur = self.ops.get(key)
+
+        if kind == APPEND:
+            if cur is None:
+                if key in self.moved_from:
+                    return False
+                op = self.ops[key] = _Op(APPEND, None, values)
+                op.waiters.append((fut, _NONE))
+            elif cur.kind in (APPEND, MOVE):
+                cur.waiters.append((fut, _NONE))  # строка и так будет — дубль не пишем
+            else:
+                return False
+
+        elif kind == MOVE:
+            if new_key != key and (new_key in self.ops or new_key in self.moved_from):
+                return False
+            if cur is None:
+                if key in self.moved_from:
+                    return False
+                op = self.ops[new_key] = _Op(MOVE, key, values)
+                op.waiters.append((fut, _FOUND))
+                if new_key != key:
+                    self.moved_from.add(key)
+            elif cur.kind == APPEND:
+                # create → reschedule: одна вставка уже с итоговой датой
+                del self.ops[key]
+                cur.values = values
+                cur.waiters.append((fut, _TRUE))
+                self.ops[new_key] = cur
+            elif cur.kind == MOVE:
+                del self.ops[key]
+                cur.values = values
+                cur.waiters.append((fut, _FOUND))
+                self.ops[new_key] = cur
+            else:
+                return False
+
+        elif kind == DELETE:
+            if cur is None:
+                if key in self.moved_from:
+                    return False
+                op = self.ops[key] = _Op(DELETE, key, None)
+                op.waiters.append((fut, _FOUND))
+            elif cur.kind == APPEND:
+                # create → delete: в Google не идём вовсе
+                del self.ops[key]
+                self.detached.extend(cur.waiters)
+                self.detached.append((fut, _TRUE))
+            elif cur.kind == MOVE:
+                if cur.origin != key and cur.origin in self.ops:
+                    return False
+                # reschedule → delete: удаляем исходную строку
+                del self.ops[key]
+                self.moved_from.discard(cur.origin)
+                op = self.ops[cur.origin] = _Op(DELETE, cur.origin, None)
+                op.waiters.extend(cur.waiters)
+                op.waiters.append((fut, _FOUND))
+            else:
+                return False
+
+        return True
+
+
+class SheetsBatchWriter:
+    """
+    Склеивает изменения листа за короткое окно и отправляет их одним batchUpdate.
+
+    Операции одной строки сливаются: create → reschedule превращается в одну
+    вставку с итоговой датой, create → delete не доходит до Google вовсе.
+    Если склеить нельзя (например, два изменения претендуют на один ключ),
+    текущая пачка закрывается и операция уходит в следующую — порядок
+    сохраняется, пачки отправляются строго по очереди.
+    """
+
+    def __init__(self, apply: ApplyBatch, *, window: float = 1.0, run: RunInThread = asyncio.to_thread):
+        self._apply = apply
+        self._run = run
+        self.window = window
+        self._batch: Optional[_Batch] = None
+        self._sealed: deque[_Batch] = deque()
+        self._flusher: Optional[asyncio.Task] = None
+        # метрики
+        self.flushes = 0
+        self.flush_errors = 0
+        self.ops_submitted = 0
+        self.ops_sent = 0
+        self.last_batch_size = 0
+        self.max_batch_size = 0
+        self.flush_latency_sum = 0.0
+        self.flush_latency_max = 0.0
+        self.last_flush_latency = 0.0
+
+    # --- API ---
+    def append(self, key: Hashable, values: list[str]) -> asyncio.Future:
+        return self._submit(APPEND, key, None, values)
+
+    def move(self, key: Hashable, new_key: Hashable, values: list[str]) -> asyncio.Future:
+        return self._submit(MOVE, key, new_key, values)
+
+    def delete(self, key: Hashable) -> asyncio.Future:
+        return self._submit(DELETE, key, None, None)
+
+    def stats(self) -> dict[str, float]:
+        return {
+            "flushes": self.flushes,
+            "flush_errors": self.flush_errors,
+            "ops_submitted": self.ops_submitted,
+            "ops_sent": self.ops_sent,
+            "last_batch_size": self.last_batch_size,
+            "max_batch_size": self.max_batch_size,
+            "avg_batch_size": (self.ops_sent / self.flushes) if self.flushes else 0.0,
+            "last_flush_latency_sec": self.last_flush_latency,
+            "max_flush_latency_sec": self.flush_latency_max,
+            "avg_flush_latency_sec": (self.flush_latency_sum / self.flushes) if self.flushes else 0.0,
+        }
+
+    # --- внутреннее ---
+    def _submit(self, kind: str, key: Hashable, new_key: Optional[Hashable],
+                values: Optional[list[str]]) -> asyncio.Future:
+        fut = asyncio.get_running_loop().create_future()
+        if self._batch is None:
+            self._batch = _Batch()
+        if not self._batch.add(kind, key, new_key, values, fut):
+            self._sealed.append(self._batch)
+            self._batch = _Batch()
+            self._batch.add(kind, key, new_key, values, fut)
+        self.ops_submitted += 1
+        if self._flusher is None or self._flusher.done():
+            self._flusher = asyncio.create_task(self._flush_loop(), name="sheets-writer")
+        return fut
+
+    async def _flush_loop(self) -> None:
+        while self._batch is not None or self._sealed:
+            if not self._sealed:
+                await asyncio.sleep(max(self.window, 0))  # копим окно
+                if self._batch is not None:
+                    self._sealed.append(self._batch)
+                    self._batch = None
+            while self._sealed:
+                await self._flush(self._sealed.popleft())
+
+    async def _flush(self, batch: _Batch) -> None:
+        ops = list(batch.ops.values())
+        appends = [op for op in ops if op.kind == APPEND]
+        moves = [op for op in ops if op.kind == MOVE]
+        deletes = [op for op in ops if op.kind == DELETE]
+
+        for fut, how in batch.detached:
+            _resolve(fut, how, True)
+        if not ops:
+            return
+
+        started = time.perf_counter()
+        try:
+            with GOOGLE_SECONDS.time(errors=GOOGLE_ERRORS, api="sheets", call="batch_update"):
+                moved_ok, deleted_ok = await self._run(
+                    self._apply,
+                    [op.values for op in appends],
+                    [(op.origin, op.values) for op in moves],
+                    [op.origin for op in deletes],
+                )
+        except Exception as e:
+            self.flush_errors += 1
+            log.warning("Sheets batch of %s ops failed: %s", len(ops), e)
+            for op in ops:
+                for fut, _ in op.waiters:
+                    if not fut.done():
+                        fut.set_exception(e)
+            return
+        finally:
+            latency = time.perf_counter() - started
+            self.flushes += 1
+            self.ops_sent += len(ops)
+            self.last_batch_size = len(ops)
+            self.max_batch_size = max(self.max_batch_size, len(ops))
+            self.last_flush_latency = latency
+            self.flush_latency_sum += latency
+            self.flush_latency_max = max(self.flush_latency_max, latency)
+
+        for op in appends:
+            for fut, how in op.waiters:
+                _resolve(fut, how, True)
+        for op, found in zip(moves, moved_ok):
+            for fut, how in op.waiters:
+                _resolve(fut, how, found)
+        for op, found in zip(deletes, deleted_ok):
+            for fut, how in op.waiters:
+                _resolve(fut, how, found)
+
+
+def _resolve(fut: asyncio.Future, how: str, found: bool) -> None:
+    if fut.done():
+        return
+    result: Any = {_NONE: None, _TRUE: True, _FOUND: found}[how]
+    fut.set_result(result)
@@ -0,0 +1,94 @@
+# tests/test_bulk.py
+import asyncio
+import datetime as dt
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+import database
+from database import AppointmentStatus, _bulk_where
+from handlers.admin import _parse_bulk_args
+from utils.helpers import TZ
+
+
+def _sql(conds) -> str:
+    return " AND ".join(
+        str(c.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}))
+        for c in conds
+    )
+
+
+# ---------- _parse_bulk_args ----------
+def test_parse_day_gives_local_day_bounds():
+    action, ids, since, until, status = _parse_bulk_args("confirm day 18.10.2026")
+    assert action == "confirm"
+    assert ids is None and status is None
+    assert since == dt.datetime(2026, 10, 18, tzinfo=TZ)
+    assert until == dt.datetime(2026, 10, 19, tzinfo=TZ)
+    assert since.utcoffset() == TZ.utcoffset(dt.datetime(2026, 10, 18))
+
+
+def test_parse_ids_and_status():
+    action, ids, since, until, status = _parse_bulk_args("cancel ids 1,2,3 status confirmed")
+    assert action == "cancel"
+    assert ids == [1, 2, 3]
+    assert since is None and until is None
+    assert status == AppointmentStatus.CONFIRMED
+
+
+def test_parse_without_filters_leaves_them_empty():
+    assert _parse_bulk_args("delete") == ("delete", None, None, None, None)
+
+
+@pytest.mark.parametrize("args", [
+    "", None, "drop ids 1", "confirm ids", "confirm ids x", "confirm day 31.02.2026",
+    "confirm status archived", "confirm when 18.10.2026",
+])
+def test_parse_rejects_bad_args(args):
+    with pytest.raises(ValueError):
+        _parse_bulk_args(args)
+
+
+# ---------- _bulk_where ----------
+def test_bulk_where_requires_a_filter():
+    with pytest.raises(ValueError):
+        _bulk_where(None, None, None, None)
+
+
+def test_bulk_where_day_is_half_open():
+    _, _, since, until, _ = _parse_bulk_args("cancel day 18.10.2026")
+    sql = _sql(_bulk_where(None, since, until, None))
+    assert "appointments.date >= '2026-10-18 00:00:00+05:00'" in sql
+    assert "appointments.date < '2026-10-19 00:00:00+05:00'" in sql
+
+
+def test_bulk_where_empty_ids_is_still_a_filter():
+    # пустой список id — «ничего», а не «всё»
+    sql = _sql(_bulk_where([], None, None, None))
+    assert "appointments.id IN" in sql
+
+
+def test_confirm_touches_only_pending_by_default(monkeypatch):
+    captured = {}
+
+    async def fake_update(new_status, conds, session):
+        captured["status"], captured["sql"] = new_status, _sql(conds)
+        return []
+
+    monkeypatch.setattr(database, "_bulk_update_status", fake_update)
+    asyncio.run(database.confirm_appointments(since=dt.datetime(2026, 10, 18, tzinfo=TZ)))
+    assert captured["status"] == AppointmentStatus.CONFIRMED
+    assert f"appointments.status = '{AppointmentStatus.PENDING}'" in captured["sql"]
+
+
+def test_confirm_with_explicit_status_none_drops_status_filter(monkeypatch):
+    captured = {}
+
+    async def fake_update(new_status, conds, session):
+        captured["sql"] = _sql(conds)
+        return []
+
+    monkeypatch.setattr(database, "_bulk_update_status", fake_update)
+    asyncio.run(database.confirm_appointments([7], status=None))
+    assert "appointments.status" not in captured["sql"]
+    assert "appointments.id IN (7)" in captured["sql"]
@@ -0,0 +1,53 @@
+# tests/test_calendar_client.py
+import datetime as dt
+
+import pytest
+
+from services.calendar import CalendarClientManager
+
+
+class _FakeCredentials:
+    def __init__(self, fail_first: int = 0):
+        self.fail_first = fail_first
+        self.refreshes = 0
+        self.expiry = dt.datetime.utcnow() + dt.timedelta(hours=1)
+
+    def refresh(self, request):
+        self.refreshes += 1
+        if self.refreshes <= self.fail_first:
+            raise ConnectionError("network down")
+
+
+@pytest.fixture
+def manager():
+    m = CalendarClientManager("unused.json", [])
+    yield m
+    m.close()
+
+
+def test_failed_first_refresh_is_retried_and_starts_refresher(manager):
+    fake = _FakeCredentials(fail_first=1)
+    manager._load_credentials = lambda: fake
+
+    with pytest.raises(ConnectionError):
+        manager._credentials()
+    assert manager._creds is None
+    assert manager._refresher is None
+
+    assert manager._credentials() is fake
+    assert fake.refreshes == 2
+    assert manager._refresher is not None and manager._refresher.is_alive()
+    assert manager.stats()["token_refreshes"] == 1
+
+
+def test_credentials_are_loaded_once(manager):
+    loads = []
+
+    def load():
+        loads.append(1)
+        return _FakeCredentials()
+
+    manager._load_credentials = load
+    first = manager._credentials()
+    assert manager._credentials() is first
+    assert len(loads) == 1
@@ -0,0 +1,17 @@
+# tests/test_config.py
+import pytest
+
+from config import _parse_throttle_rules
+
+
+def test_throttle_rules_parse():
+    assert _parse_throttle_rules(" cal_ = 5/8 ,msg=1/2,") == {"cal_": (5.0, 8.0), "msg": (1.0, 2.0)}
+    assert _parse_throttle_rules("") == {}
+
+
+@pytest.mark.parametrize("raw", [
+    "cal_=5", "cal_=5/x", "cal_=5/8/1", "cal_", "=1/2", "cal_=0/2", "cal_=1/-1", "cal_=nan/2", "cal_=1/inf",
+])
+def test_throttle_rules_reject_bad_rule(raw):
+    with pytest.raises(RuntimeError, match="THROTTLE_RULES"):
+        _parse_throttle_rules(raw)
@@ -0,0 +1,80 @@
+# tests/test_executor.py
+import asyncio
+import threading
+
+import pytest
+
+from utils.executor import BoundedExecutor, ExecutorBusy
+
+
+@pytest.fixture
+def executor():
+    ex = BoundedExecutor("test", max_workers=2, lanes={"calendar": 1, "sheets": 1}, max_queue=1)
+    yield ex
+    ex.shutdown()
+
+
+def test_slot_is_held_until_thread_finishes_even_if_caller_is_cancelled(executor):
+    release = threading.Event()
+
+    async def go():
+        task = asyncio.create_task(executor.run("calendar", release.wait, 5))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        await asyncio.sleep(0.05)
+        # корутину отменили, но поток ещё занят — слот не свободен
+        assert executor.stats()["calendar_active"] == 1
+        assert executor._lanes["calendar"].sem.locked()
+
+        release.set()
+        for _ in range(100):
+            if executor.stats()["calendar_active"] == 0:
+                break
+            await asyncio.sleep(0.01)
+        assert executor.stats()["calendar_active"] == 0
+        assert executor.stats()["calendar_completed"] == 1
+        assert await executor.run("calendar", lambda: 42) == 42
+
+    asyncio.run(go())
+
+
+def test_full_lane_rejects_with_executor_busy(executor):
+    release = threading.Event()
+
+    async def go():
+        running = asyncio.create_task(executor.run("calendar", release.wait, 5))
+        await asyncio.sleep(0.05)
+        queued = asyncio.create_task(executor.run("calendar", lambda: "queued"))
+        await asyncio.sleep(0.05)
+        assert executor.stats()["calendar_queued"] == 1
+
+        with pytest.raises(ExecutorBusy):
+            await executor.run("calendar", lambda: None)
+        assert executor.stats()["calendar_rejected"] == 1
+        # у другого API своя полоса — она свободна
+        assert await executor.run("sheets", lambda: "ok") == "ok"
+
+        release.set()
+        assert await running is True
+        assert await queued == "queued"
+
+    asyncio.run(go())
+
+
+def test_exception_in_thread_frees_the_slot(executor):
+    def boom():
+        raise ValueError("google said no")
+
+    async def go():
+        with pytest.raises(ValueError):
+            await executor.run("sheets", boom)
+        await asyncio.sleep(0)   # колбэк освобождения — через call_soon_threadsafe
+        assert executor.stats()["sheets_active"] == 0
+        assert await executor.run("sheets", lambda: 1) == 1
+
+    asyncio.run(go())
+
+
+def test_lane_limits_cannot_exceed_workers():
+    with pytest.raises(ValueError):
+        BoundedExecutor("bad", max_workers=1, lanes={"calendar": 1, "sheets": 1}, max_queue=1)
@@ -0,0 +1,95 @@
+# tests/test_leader.py
+import asyncio
+
+from utils.leader import LeaderElection
+
+
+class _FakeRedis:
+    """SET NX и Lua-продление в памяти; hang=True — Redis «завис» и не отвечает."""
+
+    def __init__(self):
+        self.owner = None
+        self.hang = False
+        self.renewals = 0
+
+    def register_script(self, src):
+        renew = "PEXPIRE" in src
+
+        async def run(keys, args):
+            if self.hang:
+                await asyncio.sleep(3600)
+            if renew:
+                self.renewals += 1
+                return int(self.owner == args[0])
+            if self.owner == args[0]:
+                self.owner = None
+                return 1
+            return 0
+        return run
+
+    async def set(self, key, value, nx=False, px=None):
+        if self.hang:
+            await asyncio.sleep(3600)
+        if nx and self.owner is not None:
+            return None
+        self.owner = value
+        return True
+
+
+def _election(redis, events, *, ttl=0.6, renew=0.2):
+    loop = asyncio.get_running_loop()
+    return LeaderElection(
+        redis,
+        on_elected=lambda: events.append(("elected", loop.time())),
+        on_demoted=lambda: events.append(("demoted", loop.time())),
+        ttl=ttl, renew=renew,
+    )
+
+
+def test_leader_demotes_at_hard_deadline_when_redis_hangs():
+    async def go():
+        redis, events = _FakeRedis(), []
+        le = _election(redis, events, ttl=1.2, renew=0.4)
+        le.start()
+        await asyncio.sleep(0.6)          # выбран и успел продлить аренду
+        assert le.is_leader and redis.renewals >= 1
+        hung_at = asyncio.get_running_loop().time()
+        redis.hang = True
+        await asyncio.sleep(1.4)
+        demoted = [t for e, t in events if e == "demoted"]
+        assert not le.is_leader and len(demoted) == 1
+        # срок — время отправки последнего удачного продления + ttl - renew,
+        # т.е. не позже hung_at + 0.8; ключ в Redis жил бы до hung_at + 1.2
+        assert demoted[0] - hung_at < 1.0
+        redis.hang = False
+        await le.stop()
+
+    asyncio.run(go())
+
+
+def test_lease_taken_by_another_replica_demotes():
+    async def go():
+        redis, events = _FakeRedis(), []
+        le = _election(redis, events)
+        le.start()
+        await asyncio.sleep(0.1)
+        assert le.is_leader
+        redis.owner = "someone-else"
+        await asyncio.sleep(0.3)
+        assert not le.is_leader
+        assert [e for e, _ in events] == ["elected", "demoted"]
+        await le.stop()
+
+    asyncio.run(go())
+
+
+def test_stop_releases_own_lease():
+    async def go():
+        redis, events = _FakeRedis(), []
+        le = _election(redis, events)
+        le.start()
+        await asyncio.sleep(0.1)
+        await le.stop()
+        assert redis.owner is None and not le.is_leader
+
+    asyncio.run(go())
@@ -0,0 +1,89 @@
+# tests/test_outbox.py
+import asyncio
+import datetime as dt
+from types import SimpleNamespace
+
+import pytest
+
+import services.outbox as outbox
+from database import OutboxKind
+from services.calendar import CalendarBatchResult
+from services.outbox import OutboxWorker, _Claimed
+
+DATE = dt.datetime(2026, 10, 20, 12, tzinfo=dt.timezone.utc)
+
+
+def _payload(**extra):
+    return {"name": "Анна", "service": "Стрижка", "date": DATE.isoformat(), "duration_min": 60, **extra}
+
+
+@pytest.fixture
+def google(monkeypatch):
+    """Поддельные Calendar/Sheets: записываем вызовы, insert выдаёт новый event_id."""
+    calls = SimpleNamespace(inserts=[], patches=[], deletes=[], sheet=[])
+
+    async def batch(inserts, patches, deletes):
+        calls.inserts += inserts
+        calls.patches += patches
+        calls.deletes += deletes
+        return (
+            [CalendarBatchResult("insert", i, True, f"new-{i}", None) for i in range(len(inserts))]
+            + [CalendarBatchResult("patch", i, True, p.event_id, None) for i, p in enumerate(patches)]
+            + [CalendarBatchResult("delete", i, True, None, None) for i in range(len(deletes))]
+        )
+
+    async def add(name, service, date):
+        calls.sheet.append(("add", name, date))
+
+    async def move(name, service, old_date, new_date):
+        calls.sheet.append(("move", name, new_date))
+        return False   # строки нет
+
+    async def remove(name, service, date):
+        calls.sheet.append(("delete", name, date))
+
+    monkeypatch.setattr(outbox, "batch_calendar_ops", batch)
+    monkeypatch.setattr(outbox, "add_appointment_to_sheet", add)
+    monkeypatch.setattr(outbox, "update_appointment_in_sheet", move)
+    monkeypatch.setattr(outbox, "delete_appointment_from_sheet", remove)
+    return calls
+
+
+def test_reschedule_without_event_recreates_it(google):
+    w = OutboxWorker()
+    ev = _Claimed(1, 7, OutboxKind.RESCHEDULE, _payload(old_date=DATE.isoformat(), event_id=None), 0, "t")
+    progress = [dict(ev.payload)]
+    errors = asyncio.run(w._sync_wave([ev], progress))
+    assert errors == [None]
+    assert len(google.inserts) == 1 and not google.patches
+    assert progress[0]["event_id"] == "new-0"
+    # строки в таблице не было — дописали, а не потеряли
+    assert google.sheet == [("move", "Анна", DATE), ("add", "Анна", DATE)]
+    assert w.recreated == 1
+
+
+def test_reschedule_with_event_patches_it(google):
+    w = OutboxWorker()
+    ev = _Claimed(1, 7, OutboxKind.RESCHEDULE, _payload(old_date=DATE.isoformat(), event_id="e1"), 0, "t")
+    asyncio.run(w._sync_wave([ev], [dict(ev.payload)]))
+    assert not google.inserts and [p.event_id for p in google.patches] == ["e1"]
+
+
+def test_delete_without_event_touches_only_sheet(google):
+    w = OutboxWorker()
+    ev = _Claimed(1, 7, OutboxKind.DELETE, _payload(event_id=None), 0, "t")
+    assert asyncio.run(w._sync_wave([ev], [dict(ev.payload)])) == [None]
+    assert not google.inserts and not google.deletes
+    assert google.sheet == [("delete", "Анна", DATE)]
+
+
+@pytest.mark.parametrize("kind", [OutboxKind.CREATE, OutboxKind.RESCHEDULE])
+def test_events_of_deleted_appointment_are_skipped(kind):
+    row = SimpleNamespace(id=1, appointment_id=7, kind=kind, payload=_payload(), attempts=0)
+    assert OutboxWorker._hydrate(row, {}, "t").payload["skip"] is True
+
+
+def test_hydrate_fills_event_id_and_token():
+    row = SimpleNamespace(id=1, appointment_id=7, kind=OutboxKind.RESCHEDULE, payload=_payload(), attempts=2)
+    ev = OutboxWorker._hydrate(row, {7: "e1"}, "tok")
+    assert ev.payload["event_id"] == "e1" and ev.token == "tok" and "skip" not in ev.payload
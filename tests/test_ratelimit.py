@@ -0,0 +1,142 @@
+# tests/test_ratelimit.py
+import asyncio
+
+import pytest
+
+import utils.ratelimit as ratelimit
+from middlewares.throttling import ThrottlingMiddleware
+from utils.ratelimit import BucketMap, RedisTokenBucket, TokenBucket
+
+
+class _Clock:
+    def __init__(self, t: float = 1000.0):
+        self.t = t
+
+    def __call__(self) -> float:
+        return self.t
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    c = _Clock()
+    monkeypatch.setattr(ratelimit, "monotonic", c)
+    return c
+
+
+class _FakeRedis:
+    """register_script → корутина, которая записывает вызовы и отвечает заданным значением."""
+
+    def __init__(self, result=1, error: Exception | None = None):
+        self.result = result
+        self.error = error
+        self.calls: list[tuple[list, list]] = []
+
+    def register_script(self, src):
+        async def run(keys, args):
+            self.calls.append((keys, args))
+            if self.error:
+                raise self.error
+            return self.result
+        return run
+
+
+# ---------- TokenBucket ----------
+def test_bucket_burst_is_capped_by_capacity(clock):
+    b = TokenBucket(rate=2, capacity=3)
+    clock.t += 100   # простой не копит больше capacity
+    assert [b.try_acquire() for _ in range(4)] == [True, True, True, False]
+
+
+def test_bucket_refills_over_time(clock):
+    b = TokenBucket(rate=2, capacity=3)
+    for _ in range(3):
+        assert b.try_acquire()
+    assert not b.try_acquire()
+    clock.t += 0.25            # полтокена
+    assert not b.try_acquire()
+    clock.t += 0.25            # ровно один
+    assert b.try_acquire()
+    assert not b.try_acquire()
+    assert b.wait_time() == pytest.approx(0.5)
+
+
+def test_bucket_pause_blocks_and_restarts_empty(clock):
+    b = TokenBucket(rate=10, capacity=10)
+    b.pause(2)
+    clock.t += 1.9
+    assert not b.try_acquire()
+    assert b.wait_time() == pytest.approx(0.1)
+    clock.t += 0.2             # пауза кончилась 0.1 сек назад — накопился один токен
+    assert b.try_acquire()
+    assert not b.try_acquire()
+
+
+def test_bucket_rejects_bad_rate():
+    with pytest.raises(ValueError):
+        TokenBucket(rate=0)
+
+
+# ---------- BucketMap ----------
+def test_bucket_map_keys_are_independent(clock):
+    m = BucketMap(maxsize=10)
+    assert m.try_acquire("a", 1, 1)
+    assert not m.try_acquire("a", 1, 1)
+    assert m.try_acquire("b", 1, 1)
+
+
+def test_bucket_map_evicts_least_recently_used(clock):
+    m = BucketMap(maxsize=2)
+    m.try_acquire("a", 1, 1)
+    m.try_acquire("b", 1, 1)
+    m.try_acquire("a", 1, 1)   # a — свежее b
+    m.try_acquire("c", 1, 1)
+    assert len(m) == 2 and m.evictions == 1
+    assert set(m._items) == {"a", "c"}
+    # вытесненный b начинает с полного бакета
+    assert m.try_acquire("b", 1, 1)
+
+
+def test_bucket_map_evicts_idle(clock):
+    m = BucketMap(maxsize=10, idle_ttl=60)
+    m.try_acquire("a", 1, 1)
+    clock.t += 61
+    m.try_acquire("b", 1, 1)
+    assert set(m._items) == {"b"} and m.evictions == 1
+
+
+def test_bucket_map_rebuilds_bucket_when_limits_change(clock):
+    m = BucketMap(maxsize=10)
+    assert m.try_acquire("a", 1, 1)
+    assert not m.try_acquire("a", 1, 1)
+    assert m.try_acquire("a", 1, 2)   # другие лимиты — новый бакет
+
+
+# ---------- RedisTokenBucket ----------
+def test_redis_bucket_prefixes_key_and_passes_limits():
+    redis = _FakeRedis(result=0)
+    b = RedisTokenBucket(redis, prefix="p")
+    assert asyncio.run(b.try_acquire("42:cal_", 5.0, 8.0)) is False
+    assert redis.calls == [(["p:42:cal_"], [5.0, 8.0])]
+
+
+# ---------- ThrottlingMiddleware._allow ----------
+def test_allow_checks_local_before_shared(clock):
+    redis = _FakeRedis(result=1)
+    mw = ThrottlingMiddleware(rate=1, burst=1, rules={}, redis=redis)
+    assert asyncio.run(mw._allow("1:msg", 1, 1))
+    assert len(redis.calls) == 1
+    # локальный бакет пуст — в Redis не идём
+    assert not asyncio.run(mw._allow("1:msg", 1, 1))
+    assert len(redis.calls) == 1
+
+
+def test_allow_respects_shared_verdict(clock):
+    mw = ThrottlingMiddleware(rate=1, burst=1, rules={}, redis=_FakeRedis(result=0))
+    assert not asyncio.run(mw._allow("1:msg", 1, 1))
+
+
+def test_allow_falls_back_to_local_when_redis_fails(clock):
+    mw = ThrottlingMiddleware(rate=1, burst=1, rules={}, redis=_FakeRedis(error=ConnectionError("down")))
+    assert asyncio.run(mw._allow("1:msg", 1, 1))
+    assert mw.redis_errors == 1
+    assert not asyncio.run(mw._allow("1:msg", 1, 1))
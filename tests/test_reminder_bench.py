@@ -0,0 +1,141 @@
+# tests/test_reminder_bench.py
+"""
+Бенчмарк тика напоминаний: время захвата наступивших напоминаний не должно
+расти вместе с историей (отправленные напоминания и прошедшие записи).
+
+Нужен настоящий Postgres: TEST_DATABASE_URL=postgresql+asyncpg://… — отдельная
+пустая база, таблицы в ней пересоздаются. Без переменной тест пропускается.
+    TEST_DATABASE_URL=… python -m pytest -m benchmark -s
+"""
+import asyncio
+import datetime as dt
+import json
+import os
+import time
+
+import pytest
+from sqlalchemy import delete, insert, text, update
+from sqlalchemy.dialects import postgresql
+
+pytestmark = [
+    pytest.mark.benchmark,
+    pytest.mark.skipif(not os.getenv("TEST_DATABASE_URL"), reason="нужен TEST_DATABASE_URL"),
+]
+
+HISTORY_SIZES = (1_000, 10_000, 50_000)   # прошедших записей (по 2 отправленных напоминания)
+DUE = 50                                  # наступивших напоминаний на каждом шаге
+RUNS = 5
+CHUNK = 2_000
+
+
+def _plan_nodes(node: dict):
+    yield node
+    for child in node.get("Plans", []):
+        yield from _plan_nodes(child)
+
+
+async def _bench() -> list[tuple[int, float, list[dict]]]:
+    from database import (
+        Appointment, AppointmentStatus, Base, Reminder, ReminderStatus, Service,
+        AsyncSessionLocal, _due_reminders, claim_due_reminders, engine,
+    )
+
+    now = dt.datetime.now(dt.timezone.utc).replace(microsecond=0)
+    catch_up, stale_after = dt.timedelta(hours=3), dt.timedelta(minutes=10)
+
+    async with engine.begin() as conn:
+        await conn.execute(text("CREATE EXTENSION IF NOT EXISTS btree_gist"))
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+
+    async with AsyncSessionLocal() as s:
+        svc_id = (await s.execute(
+            insert(Service).values(name="bench", duration_min=60, price=0).returning(Service.id)
+        )).scalar_one()
+        # наступившие: будущие подтверждённые записи, напоминание «за час» уже пора слать
+        due_ids = (await s.execute(
+            insert(Appointment).values([
+                {"user_id": 1, "service_id": svc_id, "duration_min": 60,
+                 "date": now + dt.timedelta(hours=2 + i), "end_at": now + dt.timedelta(hours=3 + i),
+                 "status": AppointmentStatus.CONFIRMED}
+                for i in range(DUE)
+            ]).returning(Appointment.id)
+        )).scalars().all()
+        await s.execute(insert(Reminder).values([
+            {"appointment_id": a, "kind": "1h", "due_at": now - dt.timedelta(minutes=1)} for a in due_ids
+        ]))
+        await s.commit()
+
+    results = []
+    history = 0
+    for size in HISTORY_SIZES:
+        # догоняем историю до size прошедших записей с отправленными напоминаниями
+        async with AsyncSessionLocal() as s:
+            while history < size:
+                n = min(CHUNK, size - history)
+                ids = (await s.execute(
+                    insert(Appointment).values([
+                        {"user_id": 1, "service_id": svc_id, "duration_min": 60,
+                         "date": now - dt.timedelta(hours=2 + history + i),
+                         "end_at": now - dt.timedelta(hours=1 + history + i),
+                         "status": AppointmentStatus.CONFIRMED}
+                        for i in range(n)
+                    ]).returning(Appointment.id)
+                )).scalars().all()
+                await s.execute(insert(Reminder).values([
+                    {"appointment_id": a, "kind": kind, "status": ReminderStatus.SENT,
+                     "due_at": now - dt.timedelta(days=1), "sent_at": now - dt.timedelta(days=1)}
+                    for a in ids for kind in ("24h", "1h")
+                ]))
+                history += n
+            await s.commit()
+        async with engine.connect() as conn:
+            await conn.execute(text("ANALYZE appointments"))
+            await conn.execute(text("ANALYZE reminders"))
+            await conn.commit()
+
+        timings = []
+        for _ in range(RUNS):
+            start = time.perf_counter()
+            claimed = await claim_due_reminders(now, limit=DUE, catch_up=catch_up, stale_after=stale_after)
+            timings.append(time.perf_counter() - start)
+            assert len(claimed) == DUE
+            async with AsyncSessionLocal() as s:
+                await s.execute(
+                    update(Reminder).where(Reminder.status == ReminderStatus.SENDING)
+                    .values(status=ReminderStatus.PENDING, claimed_at=None)
+                )
+                await s.commit()
+
+        sql = _due_reminders(now, limit=DUE, stale_after=stale_after).compile(
+            dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}
+        )
+        async with engine.connect() as conn:
+            plan = (await conn.execute(text(f"EXPLAIN (ANALYZE, FORMAT JSON) {sql}"))).scalar_one()
+            if isinstance(plan, str):   # asyncpg отдаёт json строкой
+                plan = json.loads(plan)
+            await conn.rollback()
+        results.append((size, min(timings), list(_plan_nodes(plan[0]["Plan"]))))
+
+    async with engine.begin() as conn:
+        await conn.execute(delete(Reminder))
+        await conn.run_sync(Base.metadata.drop_all)
+    await engine.dispose()
+    return results
+
+
+def test_claim_time_is_flat_as_history_grows():
+    results = asyncio.run(_bench())
+    for size, best, _ in results:
+        print(f"history={size:>6}  claim={best * 1000:.1f} ms")
+
+    for size, _, nodes in results:
+        scans = [n for n in nodes if n.get("Relation Name") == "reminders"]
+        # только частичный индекс очереди: отправленная история не читается вовсе
+        assert scans and all(n["Node Type"] != "Seq Scan" for n in scans), (size, scans)
+        assert all(n.get("Index Name", "ix_reminders_due") == "ix_reminders_due" for n in scans)
+        assert sum(n.get("Actual Rows", 0) for n in scans) <= DUE
+
+    (_, smallest, _), (_, largest, _) = results[0], results[-1]
+    # история выросла в 50 раз — время захвата почти не меняется
+    assert largest <= smallest * 3 + 0.005, results
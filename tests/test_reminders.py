@@ -0,0 +1,32 @@
+# tests/test_reminders.py
+import asyncio
+import datetime as dt
+
+from sqlalchemy.dialects import postgresql
+
+from database import _schedule_reminders_bulk
+
+
+class _RecordingSession:
+    def __init__(self):
+        self.statements = []
+
+    async def execute(self, stmt):
+        self.statements.append(str(stmt.compile(dialect=postgresql.dialect())))
+
+
+def test_rescheduled_reminder_drops_retry_backoff():
+    s = _RecordingSession()
+    now = dt.datetime(2026, 10, 17, 12, tzinfo=dt.timezone.utc)
+    asyncio.run(_schedule_reminders_bulk(s, [(1, now + dt.timedelta(days=3))], skip_before=now))
+    upsert = s.statements[-1]
+    assert "ON CONFLICT ON CONSTRAINT uq_reminders_appointment_kind DO UPDATE" in upsert
+    assert "not_before = %(param_" in upsert and "attempts = %(param_" in upsert
+
+
+def test_moments_before_skip_before_are_not_scheduled():
+    s = _RecordingSession()
+    now = dt.datetime(2026, 10, 17, 12, tzinfo=dt.timezone.utc)
+    # визит через 30 минут: ни одно напоминание уже не успеть — только DELETE устаревших
+    asyncio.run(_schedule_reminders_bulk(s, [(1, now + dt.timedelta(minutes=30))], skip_before=now))
+    assert len(s.statements) == 1 and s.statements[0].startswith("DELETE FROM reminders")
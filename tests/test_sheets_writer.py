@@ -0,0 +1,141 @@
+# tests/test_sheets_writer.py
+import asyncio
+
+import pytest
+
+from services.sheets_writer import SheetsBatchWriter
+
+
+class _Sheet:
+    """Поддельный apply: записывает пачки; строки «находятся», если их ключ есть в rows."""
+
+    def __init__(self, rows=(), error: Exception | None = None):
+        self.rows = set(rows)
+        self.error = error
+        self.calls: list[tuple[list, list, list]] = []
+
+    def apply(self, appends, moves, deletes):
+        self.calls.append((appends, moves, deletes))
+        if self.error:
+            raise self.error
+        return [k in self.rows for k, _ in moves], [k in self.rows for k in deletes]
+
+
+async def _direct(fn, *args):
+    return fn(*args)
+
+
+def _writer(sheet: _Sheet) -> SheetsBatchWriter:
+    return SheetsBatchWriter(sheet.apply, window=0, run=_direct)
+
+
+def _run(coro):
+    return asyncio.run(coro)
+
+
+def test_append_then_update_is_one_append_with_final_values():
+    sheet = _Sheet()
+
+    async def go():
+        w = _writer(sheet)
+        a = w.append("k1", ["Анна", "Стрижка", "10:00"])
+        m = w.move("k1", "k2", ["Анна", "Стрижка", "12:00"])
+        return await a, await m
+
+    assert _run(go()) == (None, True)
+    assert sheet.calls == [([["Анна", "Стрижка", "12:00"]], [], [])]
+
+
+def test_update_then_delete_deletes_the_original_row():
+    sheet = _Sheet(rows={"k1"})
+
+    async def go():
+        w = _writer(sheet)
+        m = w.move("k1", "k2", ["Анна", "Стрижка", "12:00"])
+        d = w.delete("k2")
+        return await m, await d
+
+    assert _run(go()) == (True, True)
+    assert sheet.calls == [([], [], ["k1"])]
+
+
+def test_update_of_missing_row_reports_not_found():
+    sheet = _Sheet()
+
+    async def go():
+        w = _writer(sheet)
+        return await w.move("k1", "k2", ["x", "y", "z"])
+
+    assert _run(go()) is False
+    assert sheet.calls == [([], [("k1", ["x", "y", "z"])], [])]
+
+
+def test_delete_of_pending_append_never_reaches_google():
+    sheet = _Sheet()
+
+    async def go():
+        w = _writer(sheet)
+        a = w.append("k1", ["Анна", "Стрижка", "10:00"])
+        m = w.move("k1", "k2", ["Анна", "Стрижка", "12:00"])
+        d = w.delete("k2")
+        return await a, await m, await d
+
+    assert _run(go()) == (None, True, True)
+    assert sheet.calls == []
+
+
+def test_duplicate_append_is_written_once():
+    sheet = _Sheet()
+
+    async def go():
+        w = _writer(sheet)
+        await asyncio.gather(w.append("k1", ["a"]), w.append("k1", ["a"]))
+
+    _run(go())
+    assert sheet.calls == [([["a"]], [], [])]
+
+
+def test_conflicting_ops_are_flushed_in_submission_order():
+    sheet = _Sheet(rows={"k1"})
+
+    async def go():
+        w = _writer(sheet)
+        # удалить существующую строку, затем создать такую же — склеить нельзя
+        d = w.delete("k1")
+        a = w.append("k1", ["new"])
+        # перенос на ключ, который уже занят в текущей пачке, — тоже в следующую
+        m = w.move("k3", "k1", ["moved"])
+        return await d, await a, await m
+
+    assert _run(go()) == (True, None, False)
+    assert sheet.calls == [
+        ([], [], ["k1"]),
+        ([["new"]], [], []),
+        ([], [("k3", ["moved"])], []),
+    ]
+
+
+def test_append_after_row_moved_away_goes_to_next_batch():
+    sheet = _Sheet(rows={"k1"})
+
+    async def go():
+        w = _writer(sheet)
+        m = w.move("k1", "k2", ["moved"])
+        a = w.append("k1", ["fresh"])
+        return await m, await a
+
+    assert _run(go()) == (True, None)
+    assert sheet.calls == [([], [("k1", ["moved"])], []), ([["fresh"]], [], [])]
+
+
+def test_failed_flush_fails_every_waiter():
+    sheet = _Sheet(error=ConnectionError("quota"))
+
+    async def go():
+        w = _writer(sheet)
+        futs = [w.append("k1", ["a"]), w.move("k2", "k3", ["b"]), w.delete("k4")]
+        return await asyncio.gather(*futs, return_exceptions=True), w.stats()
+
+    results, stats = _run(go())
+    assert all(isinstance(r, ConnectionError) for r in results)
+    assert stats["flush_errors"] == 1
@@ -0,0 +1,72 @@
+# utils/dbpool.py
+from __future__ import annotations
+
+import time
+
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+
+class PoolMetrics:
+    """Счётчики пула соединений; гейджи (занято/свободно) берутся у самого пула."""
+
+    def __init__(self):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_sum = 0.0           # ожидание свободного соединения (включая создание нового)
+        self.wait_max = 0.0
+        self.checkout_sum = 0.0       # весь checkout: ожидание + pre-ping + события
+        self.checkout_max = 0.0
+        self.last_checkout = 0.0
+
+    def observe_wait(self, sec: float) -> None:
+        self.wait_sum += sec
+        self.wait_max = max(self.wait_max, sec)
+
+    def observe_checkout(self, sec: float) -> None:
+        self.checkouts += 1
+        self.checkout_sum += sec
+        self.checkout_max = max(self.checkout_max, sec)
+        self.last_checkout = sec
+
+
+pool_metrics = PoolMetrics()
+
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """
+    AsyncAdaptedQueuePool с замером ожидания соединения и длительности checkout.
+    Метрики общие на класс (pool_metrics): пул пересоздаётся при dispose/инвалидации.
+    """
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            pool_metrics.timeouts += 1
+            raise
+        finally:
+            pool_metrics.observe_wait(time.perf_counter() - started)
+
+    def connect(self):
+        started = time.perf_counter()
+        conn = super().connect()
+        pool_metrics.observe_checkout(time.perf_counter() - started)
+        return conn
+
+    def stats(self) -> dict[str, float]:
+        m = pool_metrics
+        return {
+            "size": self.size(),
+            "checked_out": self.checkedout(),
+            "checked_in": self.checkedin(),
+            "overflow": self.overflow(),
+            "checkouts": m.checkouts,
+            "timeouts": m.timeouts,
+            "avg_wait_sec": (m.wait_sum / m.checkouts) if m.checkouts else 0.0,
+            "max_wait_sec": m.wait_max,
+            "avg_checkout_sec": (m.checkout_sum / m.checkouts) if m.checkouts else 0.0,
+            "max_checkout_sec": m.checkout_max,
+            "last_checkout_sec": m.last_checkout,
+        }
@@ -0,0 +1,94 @@
+# utils/executor.py
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, TypeVar
+
+T = TypeVar("T")
+
+
+class ExecutorBusy(RuntimeError):
+    """Очередь к API переполнена — отказываем сразу, не дожидаясь потока."""
+
+
+class _Lane:
+    """Полоса одного API: свой лимит параллельных вызовов и своя очередь."""
+
+    def __init__(self, concurrency: int, max_queue: int):
+        self.concurrency = concurrency
+        self.max_queue = max_queue
+        self.sem: asyncio.Semaphore | None = None   # создаём внутри loop
+        self.active = 0
+        self.queued = 0
+        self.completed = 0
+        self.rejected = 0
+
+
+class BoundedExecutor:
+    """
+    Отдельный пул потоков для блокирующего I/O (Google) с ограничениями по API.
+
+    Пул не делится с default executor loop'а (asyncio.to_thread), поэтому
+    зависший Google не занимает потоки остальной блокирующей работы.
+    У каждого API (calendar, sheets) свой семафор: сумма лимитов не больше
+    max_workers, так что вызов, получивший слот, сразу получает поток.
+    Ждущих слота — не больше max_queue на API; дальше run() бросает
+    ExecutorBusy (fast-fail), а вызывающий код отвечает как на ошибку Google.
+    """
+
+    def __init__(self, name: str, *, max_workers: int, lanes: dict[str, int], max_queue: int):
+        if sum(lanes.values()) > max_workers:
+            raise ValueError("сумма лимитов по API больше max_workers")
+        self.name = name
+        self.max_workers = max_workers
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self._lanes = {api: _Lane(n, max_queue) for api, n in lanes.items()}
+
+    async def run(self, api: str, fn: Callable[..., T], *args: Any) -> T:
+        lane = self._lanes[api]
+        if lane.sem is None:
+            lane.sem = asyncio.Semaphore(lane.concurrency)
+        if lane.sem.locked() and lane.queued >= lane.max_queue:
+            lane.rejected += 1
+            raise ExecutorBusy(f"{self.name}/{api}: очередь заполнена ({lane.queued})")
+
+        lane.queued += 1
+        try:
+            await lane.sem.acquire()
+        finally:
+            lane.queued -= 1
+        lane.active += 1
+        loop = asyncio.get_running_loop()
+
+        def _done(_fut) -> None:
+            lane.active -= 1
+            lane.completed += 1
+            lane.sem.release()
+
+        try:
+            # как asyncio.to_thread: контекст (contextvars) переезжает в поток
+            ctx = contextvars.copy_context()
+            fut = self._pool.submit(functools.partial(ctx.run, fn, *args))
+        except BaseException:
+            _done(None)
+            raise
+        # слот освобождается, когда поток действительно закончил, а не когда
+        # ожидающую корутину отменили (вызов в потоке прервать нельзя)
+        fut.add_done_callback(lambda f: loop.call_soon_threadsafe(_done, f))
+        return await asyncio.wrap_future(fut)
+
+    def stats(self) -> dict[str, int]:
+        out: dict[str, int] = {"max_workers": self.max_workers}
+        for api, lane in self._lanes.items():
+            out[f"{api}_active"] = lane.active
+            out[f"{api}_queued"] = lane.queued
+            out[f"{api}_completed"] = lane.completed
+            out[f"{api}_rejected"] = lane.rejected
+        return out
+
+    def shutdown(self) -> None:
+        # не ждём зависшие вызовы Google: потоки умрут вместе с процессом
+        self._pool.shutdown(wait=False, cancel_futures=True)
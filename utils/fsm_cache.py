@@ -0,0 +1,128 @@
+# utils/fsm_cache.py
+from __future__ import annotations
+
+import copy
+import time
+from collections import OrderedDict
+from contextvars import ContextVar
+from typing import Any, Dict, Optional
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, StateType, StorageKey
+
+from config import FSM_CACHE_TTL_SEC, FSM_CACHE_MAX_KEYS
+
+_MISSING: Any = object()
+
+
+class _Entry:
+    __slots__ = ("state", "data", "expires")
+
+    def __init__(self, expires: float):
+        self.state: Any = _MISSING
+        self.data: Any = _MISSING
+        self.expires = expires
+
+
+# кеш текущего апдейта: открывается middlewares.fsm_scope, живёт до конца обработки
+_update_scope: ContextVar[Optional[Dict[StorageKey, _Entry]]] = ContextVar("fsm_update_scope", default=None)
+
+
+def open_update_scope():
+    """Новый кеш на апдейт; вернуть токен в close_update_scope."""
+    return _update_scope.set({})
+
+
+def close_update_scope(token) -> None:
+    _update_scope.reset(token)
+
+
+class CachedStorage(BaseStorage):
+    """
+    Read-through кеш FSM поверх хранилища aiogram (RedisStorage).
+
+    Чтения state/data обслуживаются из кеша апдейта (в пределах одного апдейта
+    повторный get_state()/get_data() в Redis не ходит). Запись — сквозная:
+    сначала в хранилище, затем в кеш. Между апдейтами кеш (LRU в памяти
+    процесса) включается только при ttl > 0 и годится лишь для одной реплики:
+    иначе соседняя реплика изменит состояние, а мы до ttl будем читать старое.
+    """
+
+    def __init__(self, inner: BaseStorage, *, ttl: float = FSM_CACHE_TTL_SEC,
+                 maxsize: int = FSM_CACHE_MAX_KEYS):
+        self.inner = inner
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._local: OrderedDict[StorageKey, _Entry] = OrderedDict()
+        # метрики: hits — сэкономленные обращения к хранилищу
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+
+    def __getattr__(self, name: str) -> Any:
+        # redis, key_builder и прочее — от исходного хранилища
+        return getattr(self.inner, name)
+
+    # --- кеш ---
+    def _entry(self, key: StorageKey) -> _Entry:
+        scope = _update_scope.get()
+        if scope is not None and key in scope:
+            return scope[key]
+
+        now = time.monotonic()
+        entry = self._local.get(key)
+        if entry is None or entry.expires <= now:
+            entry = _Entry(now + self.ttl)
+            if self.ttl > 0:
+                self._local[key] = entry
+                while len(self._local) > self.maxsize:
+                    self._local.popitem(last=False)
+        elif self.ttl > 0:
+            self._local.move_to_end(key)
+        if scope is not None:
+            scope[key] = entry
+        return entry
+
+    # --- BaseStorage ---
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        entry = self._entry(key)
+        if entry.state is _MISSING:
+            self.misses += 1
+            entry.state = await self.inner.get_state(key)
+        else:
+            self.hits += 1
+        return entry.state
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        await self.inner.set_state(key, state)
+        self.writes += 1
+        self._entry(key).state = state.state if isinstance(state, State) else state
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        entry = self._entry(key)
+        if entry.data is _MISSING:
+            self.misses += 1
+            entry.data = await self.inner.get_data(key)
+        else:
+            self.hits += 1
+        # глубокая копия: хендлеры правят полученный dict и вложенные списки
+        return copy.deepcopy(entry.data)
+
+    async def set_data(self, key: StorageKey, data: Dict[str, Any]) -> None:
+        await self.inner.set_data(key, data)
+        self.writes += 1
+        self._entry(key).data = copy.deepcopy(data)
+
+    async def close(self) -> None:
+        self._local.clear()
+        await self.inner.close()
+
+    def stats(self) -> dict[str, float]:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._local),
+            "hits": self.hits,
+            "misses": self.misses,
+            "writes": self.writes,
+            "hit_rate": (self.hits / total) if total else 0.0,
+        }
@@ -0,0 +1,105 @@
+# utils/fuzzy.py
+from __future__ import annotations
+
+import re
+from collections import defaultdict
+from typing import Generic, Iterable, NamedTuple, TypeVar
+
+T = TypeVar("T")
+
+_WORD_RE = re.compile(r"\w+")
+
+# ранги совпадений: выше — лучше; нечёткое (триграммы) — в диапазоне (0, 1]
+EXACT = 3.0
+PREFIX = 2.0
+WORD_PREFIX = 1.5
+
+
+def normalize(s: str) -> str:
+    """Регистр, «ё», пунктуация и лишние пробелы не важны."""
+    s = (s or "").casefold().replace("ё", "е")
+    return " ".join(_WORD_RE.findall(s))
+
+
+def trigrams(norm: str) -> frozenset[str]:
+    """Триграммы каждого слова с отступами, как в pg_trgm: «  ма», « ма», …"""
+    grams: set[str] = set()
+    for word in norm.split():
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return frozenset(grams)
+
+
+class Match(NamedTuple, Generic[T]):
+    score: float
+    value: T
+
+
+class _Entry(NamedTuple):
+    norm: str
+    words: tuple[str, ...]
+    grams: frozenset[str]
+
+
+class TrigramIndex(Generic[T]):
+    """
+    Неизменяемый индекс для нечёткого поиска по коротким строкам (названия услуг).
+
+    Кандидаты берутся из инвертированного списка триграмм, поэтому сравниваем
+    только строки с общими триграммами. Ранжирование: точное совпадение >
+    префикс строки > префикс слова > сходство по триграммам (коэффициент Дайса),
+    которое и даёт терпимость к опечаткам.
+    """
+
+    def __init__(self, items: Iterable[tuple[str, T]], *, threshold: float = 0.35):
+        self.threshold = threshold
+        self._entries: list[_Entry] = []
+        self._values: list[T] = []
+        self._postings: dict[str, list[int]] = defaultdict(list)
+        for key, value in items:
+            norm = normalize(key)
+            entry = _Entry(norm, tuple(norm.split()), trigrams(norm))
+            idx = len(self._entries)
+            self._entries.append(entry)
+            self._values.append(value)
+            for g in entry.grams:
+                self._postings[g].append(idx)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def search(self, query: str, limit: int = 5) -> list[Match[T]]:
+        q = normalize(query)
+        if not q:
+            return []
+        q_grams = trigrams(q)
+
+        shared: dict[int, int] = defaultdict(int)
+        for g in q_grams:
+            for idx in self._postings.get(g, ()):
+                shared[idx] += 1
+
+        found: list[tuple[float, str, int]] = []
+        for idx, common in shared.items():
+            e = self._entries[idx]
+            if e.norm == q:
+                score = EXACT
+            elif e.norm.startswith(q):
+                score = PREFIX
+            elif any(w.startswith(q) for w in e.words):
+                score = WORD_PREFIX
+            else:
+                score = 2 * common / (len(q_grams) + len(e.grams))
+                if score < self.threshold:
+                    continue
+            found.append((score, e.norm, idx))
+
+        found.sort(key=lambda t: (-t[0], t[1]))
+        return [Match(score, self._values[idx]) for score, _, idx in found[:limit]]
+
+    def best(self, query: str) -> T | None:
+        """Лучший кандидат, только если он однозначен (без ничьей на первом месте)."""
+        top = self.search(query, limit=2)
+        if not top or (len(top) == 2 and top[0].score == top[1].score):
+            return None
+        return top[0].value
@@ -0,0 +1,64 @@
+# utils/health.py
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import Awaitable, Callable
+
+from aiohttp import web
+
+from utils.loopmon import LoopMonitor
+
+log = logging.getLogger(__name__)
+
+Check = Callable[[], Awaitable[None]]
+
+
+class Health:
+    """
+    /health/live — процесс жив: loop отвечает (иначе запрос просто не
+    обслужится) и сэмплер loopmon не отстал больше чем на max_heartbeat_age.
+    /health/ready — можно слать трафик: зависимости (БД, Redis) отвечают
+    за timeout и задержка loop ниже max_lag.
+    """
+
+    def __init__(self, monitor: LoopMonitor, *, max_lag: float, timeout: float):
+        self.monitor = monitor
+        self.max_lag = max_lag
+        self.timeout = timeout
+        self.max_heartbeat_age = max(5.0, monitor.interval * 10)
+        self._checks: dict[str, Check] = {}
+
+    def add_check(self, name: str, check: Check) -> None:
+        self._checks[name] = check
+
+    async def _run_check(self, check: Check) -> str:
+        try:
+            await asyncio.wait_for(check(), self.timeout)
+            return "ok"
+        except asyncio.TimeoutError:
+            return "timeout"
+        except Exception as e:
+            return f"error: {e}"
+
+    async def live(self, request: web.Request) -> web.Response:
+        age = self.monitor.heartbeat_age()
+        ok = age < self.max_heartbeat_age
+        return web.json_response({"status": "ok" if ok else "stalled", "heartbeat_age_sec": round(age, 3)},
+                                 status=200 if ok else 503)
+
+    async def ready(self, request: web.Request) -> web.Response:
+        names = list(self._checks)
+        results = await asyncio.gather(*(self._run_check(self._checks[n]) for n in names))
+        checks = dict(zip(names, results))
+        lag = self.monitor.last_lag
+        checks["loop_lag"] = "ok" if lag < self.max_lag else f"lag {lag:.3f}s"
+        ok = all(v == "ok" for v in checks.values())
+        if not ok:
+            log.warning("Readiness failed: %s", checks)
+        return web.json_response({"status": "ok" if ok else "unavailable", "checks": checks},
+                                 status=200 if ok else 503)
+
+    def setup_routes(self, app: web.Application) -> None:
+        app.router.add_get("/health/live", self.live)
+        app.router.add_get("/health/ready", self.ready)
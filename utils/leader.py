@@ -0,0 +1,161 @@
+# utils/leader.py
+from __future__ import annotations
+
+import asyncio
+import inspect
+import os
+import socket
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Optional, Union
+
+from loguru import logger as log
+
+from config import LEADER_KEY, LEADER_TTL_SEC, LEADER_RENEW_SEC
+
+Callback = Callable[[], Union[None, Awaitable[None]]]
+
+# продлеваем / отпускаем только свою аренду
+_RENEW = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('PEXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+"""
+_RELEASE = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+class LeaderElection:
+    """
+    Выбор лидера среди реплик через аренду в Redis (SET NX PX + продление).
+
+    Апдейты обрабатывают все реплики, а периодическую работу (планировщик
+    напоминаний) — только лидер: on_elected запускает её, on_demoted
+    останавливает. Лидер продлевает аренду каждые renew сек. Срок полномочий —
+    жёсткий: момент отправки последнего успешного продления + ttl - renew
+    (время берём до вызова, ответ мог идти долго). Каждый вызов Redis ограничен
+    оставшимся до срока временем, и по наступлении срока лидер слагает
+    полномочия, как бы ни отвечал Redis, — раньше, чем ключ истечёт и его
+    заберёт другая реплика. При штатной остановке аренда
+    отпускается сразу — преемник подхватит через renew сек, не дожидаясь ttl.
+    """
+
+    def __init__(
+        self,
+        redis,
+        *,
+        on_elected: Callback,
+        on_demoted: Callback,
+        key: str = LEADER_KEY,
+        ttl: float = LEADER_TTL_SEC,
+        renew: float = LEADER_RENEW_SEC,
+    ):
+        if renew >= ttl:
+            raise ValueError("renew должен быть меньше ttl")
+        self.redis = redis
+        self.key = key
+        self.ttl = ttl
+        self.renew = renew
+        self.identity = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._on_elected = on_elected
+        self._on_demoted = on_demoted
+        self._renew_script = redis.register_script(_RENEW)
+        self._release_script = redis.register_script(_RELEASE)
+        self._task: Optional[asyncio.Task] = None
+        self._leader = False
+        self._deadline = 0.0   # monotonic: до этого момента аренда точно наша
+        # метрики
+        self.elections = 0
+        self.demotions = 0
+        self.errors = 0
+
+    @property
+    def is_leader(self) -> bool:
+        return self._leader
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="leader-election")
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._leader:
+            await self._demote("shutdown")
+            try:
+                await self._release_script(keys=[self.key], args=[self.identity])
+            except Exception as e:
+                log.warning(f"Leader lease release failed: {e}")
+
+    async def _run(self) -> None:
+        lease = self.ttl - self.renew
+        while True:
+            try:
+                sent = time.monotonic()
+                if self._leader:
+                    if sent >= self._deadline:
+                        await self._demote("lease not renewed")
+                    elif await asyncio.wait_for(
+                        self._renew_script(keys=[self.key], args=[self.identity, int(self.ttl * 1000)]),
+                        self._deadline - sent,
+                    ):
+                        self._deadline = sent + lease
+                    else:
+                        await self._demote("lease lost")
+                elif await asyncio.wait_for(
+                    self.redis.set(self.key, self.identity, nx=True, px=int(self.ttl * 1000)), lease
+                ):
+                    self._deadline = sent + lease
+                    await self._elect()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.errors += 1
+                log.warning(f"Leader election: Redis error: {e!r}")
+                # ключ может истечь — не дожидаемся двух лидеров одновременно
+                if self._leader and time.monotonic() >= self._deadline:
+                    await self._demote("lease not renewed")
+            delay = self.renew
+            if self._leader:
+                # проснуться не позже срока, чтобы сложить полномочия вовремя
+                delay = min(delay, max(0.0, self._deadline - time.monotonic()))
+            await asyncio.sleep(delay)
+
+    async def _elect(self) -> None:
+        self._leader = True
+        self.elections += 1
+        log.info(f"👑 Leader elected: {self.identity}")
+        await self._call(self._on_elected)
+
+    async def _demote(self, reason: str) -> None:
+        self._leader = False
+        self.demotions += 1
+        log.warning(f"Leader demoted ({reason}): {self.identity}")
+        await self._call(self._on_demoted)
+
+    @staticmethod
+    async def _call(cb: Callback) -> Any:
+        try:
+            res = cb()
+            if inspect.isawaitable(res):
+                await res
+        except Exception:
+            log.exception("Leader callback failed")
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "is_leader": int(self._leader),
+            "elections": self.elections,
+            "demotions": self.demotions,
+            "errors": self.errors,
+        }
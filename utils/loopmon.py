@@ -0,0 +1,141 @@
+# utils/loopmon.py
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from contextvars import ContextVar
+from typing import Any, Optional
+
+from utils.metrics import metrics
+
+log = logging.getLogger(__name__)
+
+LOOP_LAG_SECONDS = metrics.histogram(
+    "loop_lag_seconds", "Задержка event loop относительно ожидаемого пробуждения",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+)
+SLOW_CALLBACKS = metrics.counter(
+    "slow_callbacks_total", "Колбэки event loop дольше порога", ("handler",)
+)
+
+# имя текущего хендлера — ставит middlewares.metrics, читаем из контекста колбэка
+current_handler: ContextVar[Optional[str]] = ContextVar("current_handler", default=None)
+
+
+class LoopMonitor:
+    """
+    Сэмплер задержки event loop и детектор медленных колбэков.
+
+    Раз в interval сек засыпаем и смотрим, насколько позже проснулись:
+    это время loop был занят чужим кодом (синхронный вызов, тяжёлая
+    гидрация ORM). Heartbeat сэмплера — основа liveness-проверки.
+
+    Детектор оборачивает asyncio.Handle._run и логирует каждый колбэк дольше
+    slow_callback сек: корутину задачи и хендлер aiogram, в
+    контексте которого она шла. Цена — два perf_counter на колбэк; 0 — выключен.
+    """
+
+    def __init__(self, *, interval: float, warn_lag: float, slow_callback: float):
+        self.interval = interval
+        self.warn_lag = warn_lag
+        self.slow_callback = slow_callback
+        self._task: Optional[asyncio.Task] = None
+        self._orig_run = None
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+        self.heartbeat = time.monotonic()
+        self.slow_callbacks = 0
+
+    # --- сэмплер ---
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._sample(), name="loop-monitor")
+        if self.slow_callback > 0 and self._orig_run is None:
+            self._install_detector()
+
+    async def stop(self) -> None:
+        self._uninstall_detector()
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _sample(self) -> None:
+        while True:
+            start = time.monotonic()
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            lag = max(0.0, now - start - self.interval)
+            self.heartbeat = now
+            self.last_lag = lag
+            self.max_lag = max(self.max_lag, lag)
+            LOOP_LAG_SECONDS.observe(lag)
+            if lag >= self.warn_lag:
+                log.warning("Event loop lag %.3fs", lag)
+
+    def heartbeat_age(self) -> float:
+        return time.monotonic() - self.heartbeat
+
+    # --- медленные колбэки ---
+    def _install_detector(self) -> None:
+        handle_cls = asyncio.events.Handle
+        orig_run = handle_cls._run
+        monitor = self
+
+        def _run(handle: asyncio.Handle) -> None:
+            start = time.perf_counter()
+            orig_run(handle)
+            took = time.perf_counter() - start
+            if took >= monitor.slow_callback:
+                monitor._report(handle, took)
+
+        self._orig_run = orig_run
+        handle_cls._run = _run
+
+    def _uninstall_detector(self) -> None:
+        if self._orig_run is not None:
+            asyncio.events.Handle._run = self._orig_run
+            self._orig_run = None
+
+    def _report(self, handle: asyncio.Handle, took: float) -> None:
+        ctx = getattr(handle, "_context", None)
+        handler = ctx.get(current_handler) if ctx is not None else None
+        self.slow_callbacks += 1
+        SLOW_CALLBACKS.inc(handler=handler or "")
+        log.warning("Slow callback %.3fs (handler=%s): %s", took, handler or "-", _describe(handle))
+
+    def stats(self) -> dict[str, float]:
+        max_lag, self.max_lag = self.max_lag, 0.0   # максимум с прошлого снятия
+        return {
+            "lag_sec": self.last_lag,
+            "max_lag_sec": max_lag,
+            "heartbeat_age_sec": self.heartbeat_age(),
+            "slow_callbacks": self.slow_callbacks,
+        }
+
+
+def _describe(handle: asyncio.Handle) -> str:
+    """Шаг задачи → имя корутины и задачи; прочие колбэки — как есть."""
+    task = getattr(handle._callback, "__self__", None)
+    if isinstance(task, asyncio.Task):
+        coro = task.get_coro()
+        name = getattr(coro, "__qualname__", None) or repr(coro)
+        return f"{name} (task {task.get_name()})"
+    return repr(handle)
+
+
+def threadpool_stats(loop: Optional[asyncio.AbstractEventLoop] = None) -> dict[str, Any]:
+    """Очередь default executor (asyncio.to_thread): задачи ждут свободный поток."""
+    loop = loop or asyncio.get_running_loop()
+    executor = getattr(loop, "_default_executor", None)
+    if executor is None:
+        return {"queued": 0, "threads": 0, "max_workers": 0}
+    return {
+        "queued": executor._work_queue.qsize(),
+        "threads": len(executor._threads),
+        "max_workers": executor._max_workers,
+    }
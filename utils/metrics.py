@@ -0,0 +1,202 @@
+# utils/metrics.py
+from __future__ import annotations
+
+import functools
+import logging
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Any, Awaitable, Callable, Iterator, Optional, TypeVar
+
+from aiohttp import web
+
+log = logging.getLogger(__name__)
+
+NAMESPACE = "beauty_bot"
+
+# секунды: от быстрых запросов к БД до медленных ответов Google
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+F = TypeVar("F", bound=Callable[..., Awaitable[Any]])
+
+
+def _labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _escape(v: str) -> str:
+    return str(v).replace("\\", r"\\").replace("\n", r"\n").replace('"', r"\"")
+
+
+class Counter:
+    def __init__(self, name: str, doc: str, labels: tuple[str, ...] = ()):
+        self.name = name
+        self.doc = doc
+        self.label_names = labels
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = tuple(labels.get(n, "") for n in self.label_names)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.doc}"
+        yield f"# TYPE {self.name} counter"
+        for key, value in self._values.items():
+            yield f"{self.name}{_labels(self.label_names, key)} {value}"
+
+
+class Histogram:
+    """Гистограмма в формате Prometheus: кумулятивные бакеты, _sum и _count на набор меток."""
+
+    def __init__(self, name: str, doc: str, labels: tuple[str, ...] = (),
+                 buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.doc = doc
+        self.label_names = labels
+        self.buckets = tuple(sorted(buckets))
+        # метки -> [счётчики по бакетам (+Inf последним), сумма]
+        self._series: dict[tuple[str, ...], tuple[list[int], list[float]]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = tuple(labels.get(n, "") for n in self.label_names)
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = ([0] * (len(self.buckets) + 1), [0.0])
+        counts, total = series
+        counts[bisect_left(self.buckets, value)] += 1
+        total[0] += value
+
+    @contextmanager
+    def time(self, *, errors: Optional[Counter] = None, **labels: str) -> Iterator[None]:
+        """Замерить блок; при исключении дополнительно увеличить errors с теми же метками."""
+        start = time.perf_counter()
+        try:
+            yield
+        except BaseException:
+            if errors is not None:
+                errors.inc(**labels)
+            raise
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def timed(self, fn: F) -> F:
+        """Декоратор для корутины: метка — имя функции (для гистограмм с одной меткой)."""
+        label = {self.label_names[0]: fn.__name__}
+
+        @functools.wraps(fn)
+        async def wrapper(*args: Any, **kwargs: Any) -> Any:
+            with self.time(**label):
+                return await fn(*args, **kwargs)
+
+        return wrapper  # type: ignore[return-value]
+
+    def render(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.doc}"
+        yield f"# TYPE {self.name} histogram"
+        for key, (counts, total) in self._series.items():
+            acc = 0
+            for bound, n in zip(self.buckets, counts):
+                acc += n
+                le = f'le="{bound}"'
+                yield f"{self.name}_bucket{_labels(self.label_names, key, le)} {acc}"
+            acc += counts[-1]
+            le = 'le="+Inf"'
+            yield f"{self.name}_bucket{_labels(self.label_names, key, le)} {acc}"
+            yield f"{self.name}_sum{_labels(self.label_names, key)} {total[0]}"
+            yield f"{self.name}_count{_labels(self.label_names, key)} {acc}"
+
+
+class Registry:
+    """
+    Метрики процесса. Гистограммы и счётчики пишутся по ходу работы,
+    а stats() модулей (пул БД, кеши, outbox, Google) снимаются как gauge
+    в момент запроса /metrics — их не нужно дублировать счётчиками.
+    """
+
+    def __init__(self):
+        self._metrics: list[Counter | Histogram] = []
+        self._collectors: dict[str, Callable[[], dict[str, Any]]] = {}
+
+    def counter(self, name: str, doc: str, labels: tuple[str, ...] = ()) -> Counter:
+        m = Counter(f"{NAMESPACE}_{name}", doc, labels)
+        self._metrics.append(m)
+        return m
+
+    def histogram(self, name: str, doc: str, labels: tuple[str, ...] = (),
+                  buckets: tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        m = Histogram(f"{NAMESPACE}_{name}", doc, labels, buckets)
+        self._metrics.append(m)
+        return m
+
+    def register_collector(self, prefix: str, stats: Callable[[], dict[str, Any]]) -> None:
+        """stats() -> {имя: число}; выводится как beauty_bot_<prefix>_<имя>."""
+        self._collectors[prefix] = stats
+
+    def render(self) -> str:
+        lines: list[str] = []
+        for m in self._metrics:
+            lines.extend(m.render())
+        for prefix, stats in self._collectors.items():
+            try:
+                values = stats()
+            except Exception as e:
+                log.warning("Metrics collector %s failed: %s", prefix, e)
+                continue
+            for key, value in values.items():
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    continue
+                name = f"{NAMESPACE}_{prefix}_{key}"
+                lines.append(f"# TYPE {name} gauge")
+                lines.append(f"{name} {value}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = Registry()
+
+# --- общие метрики ---
+HANDLER_SECONDS = metrics.histogram(
+    "handler_seconds", "Время обработки апдейта хендлером", ("handler",)
+)
+HANDLER_ERRORS = metrics.counter("handler_errors_total", "Исключения в хендлерах", ("handler",))
+DB_SECONDS = metrics.histogram("db_query_seconds", "Время хелперов database.py", ("query",))
+GOOGLE_SECONDS = metrics.histogram(
+    "google_call_seconds", "Задержка вызовов Google API", ("api", "call")
+)
+GOOGLE_ERRORS = metrics.counter("google_errors_total", "Ошибки вызовов Google API", ("api", "call"))
+REMINDER_TICK_SECONDS = metrics.histogram(
+    "reminder_tick_seconds", "Длительность тика напоминаний", buckets=(0.1, 0.5, 1, 2.5, 5, 10, 30, 60)
+)
+
+db_timed = DB_SECONDS.timed
+
+
+# --- HTTP ---
+async def _handle_metrics(request: web.Request) -> web.Response:
+    return web.Response(text=metrics.render(),
+                        headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"})
+
+
+def setup_routes(app: web.Application) -> None:
+    app.router.add_get("/metrics", _handle_metrics)
+
+
+async def start_metrics_server(
+    host: str, port: int, *extra_routes: Callable[[web.Application], None]
+) -> web.AppRunner:
+    """
+    Отдельный лёгкий HTTP-сервер с /metrics (и служебными маршрутами из
+    extra_routes, например health); остановка — runner.cleanup().
+    """
+    app = web.Application()
+    setup_routes(app)
+    for setup in extra_routes:
+        setup(app)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    log.info("Metrics: http://%s:%s/metrics", host, port)
+    return runner
@@ -0,0 +1,136 @@
+# utils/ratelimit.py
+from __future__ import annotations
+
+import asyncio
+from collections import OrderedDict
+from time import monotonic
+from typing import Hashable, Optional
+
+
+class TokenBucket:
+    """
+    Классический token bucket: rate токенов в секунду, запас до capacity.
+    try_acquire() — неблокирующая проверка, acquire() — дождаться токена.
+    pause() — не выдавать токены до срока (сервер попросил подождать).
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        if rate <= 0:
+            raise ValueError("rate must be > 0")
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else rate)
+        self._tokens = self.capacity
+        self._ts = monotonic()
+        self._paused_until = 0.0
+        self._lock: Optional[asyncio.Lock] = None
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._ts) * self.rate)
+        self._ts = now
+
+    def pause(self, seconds: float) -> None:
+        """Никому не выдавать токены seconds сек (продлевает, но не сокращает паузу)."""
+        self._paused_until = max(self._paused_until, monotonic() + seconds)
+        # после паузы — без накопленного всплеска, запас растёт с нуля
+        self._tokens = 0.0
+        self._ts = self._paused_until
+
+    def try_acquire(self, tokens: float = 1.0, now: Optional[float] = None) -> bool:
+        now = monotonic() if now is None else now
+        if now < self._paused_until:
+            return False
+        self._refill(now)
+        if self._tokens >= tokens:
+            self._tokens -= tokens
+            return True
+        return False
+
+    def wait_time(self, tokens: float = 1.0) -> float:
+        """Через сколько секунд наберётся tokens (0 — уже есть)."""
+        now = monotonic()
+        if now < self._paused_until:
+            return self._paused_until - now
+        self._refill(now)
+        return max(0.0, (tokens - self._tokens) / self.rate)
+
+    async def acquire(self, tokens: float = 1.0) -> float:
+        """Дождаться токена (по очереди, FIFO). Возвращает, сколько ждали."""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        waited = 0.0
+        async with self._lock:
+            while not self.try_acquire(tokens):
+                delay = self.wait_time(tokens)
+                waited += delay
+                await asyncio.sleep(delay)
+        return waited
+
+
+class BucketMap:
+    """
+    Бакеты по ключу (пользователь, область) с ограниченной памятью:
+    LRU на maxsize ключей плюс вытеснение простаивающих дольше idle_ttl.
+    Простоявший capacity/rate сек бакет и так полон — вытеснять его без потерь.
+    """
+
+    def __init__(self, *, maxsize: int = 10_000, idle_ttl: float = 600):
+        self.maxsize = maxsize
+        self.idle_ttl = idle_ttl
+        self._items: OrderedDict[Hashable, TokenBucket] = OrderedDict()
+        self.evictions = 0
+
+    def try_acquire(self, key: Hashable, rate: float, capacity: float) -> bool:
+        now = monotonic()
+        bucket = self._items.get(key)
+        if bucket is None or (bucket.rate, bucket.capacity) != (rate, capacity):
+            bucket = TokenBucket(rate, capacity)
+            self._items[key] = bucket
+        self._items.move_to_end(key)
+        ok = bucket.try_acquire(now=now)
+        self._evict(now)
+        return ok
+
+    def _evict(self, now: float) -> None:
+        items = self._items
+        while items:
+            key, oldest = next(iter(items.items()))
+            if len(items) <= self.maxsize and now - oldest._ts < self.idle_ttl:
+                break
+            del items[key]
+            self.evictions += 1
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+# Token bucket в Redis: состояние — hash {tokens, ts}, время — часы Redis (общие для реплик).
+# Возвращает 1, если токен выдан.
+_REDIS_BUCKET = """
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local ok = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    ok = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / rate * 1000) + 1000)
+return ok
+"""
+
+
+class RedisTokenBucket:
+    """Общий для всех реплик token bucket: одна атомарная Lua-операция на событие."""
+
+    def __init__(self, redis, *, prefix: str):
+        self.prefix = prefix
+        self._script = redis.register_script(_REDIS_BUCKET)
+
+    async def try_acquire(self, key: str, rate: float, capacity: float) -> bool:
+        return bool(await self._script(keys=[f"{self.prefix}:{key}"], args=[rate, capacity]))
@@ -0,0 +1,90 @@
+# utils/webhook.py
+from __future__ import annotations
+
+import asyncio
+from typing import Any
+
+from aiohttp import web
+from aiogram import Bot, Dispatcher
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+from loguru import logger as log
+
+from config import (
+    WEBHOOK_BASE_URL,
+    WEBHOOK_PATH,
+    WEBHOOK_SECRET,
+    WEBHOOK_HOST,
+    WEBHOOK_PORT,
+    WEBHOOK_MAX_CONNECTIONS,
+    WEBHOOK_CONCURRENCY,
+)
+
+
+class BoundedRequestHandler(SimpleRequestHandler):
+    """
+    SimpleRequestHandler с ограничением параллельной обработки.
+
+    Telegram получает 200 сразу после постановки апдейта в работу, но не раньше,
+    чем освободится слот: при перегрузке ответ задерживается, и Telegram сам
+    притормаживает доставку (max_connections), а не копит у нас тысячи задач.
+    """
+
+    def __init__(self, dispatcher: Dispatcher, bot: Bot, *, concurrency: int, **kwargs: Any):
+        super().__init__(dispatcher, bot, handle_in_background=True, **kwargs)
+        self._slots = asyncio.Semaphore(concurrency)
+        self.concurrency = concurrency
+
+    async def _handle_request_background(self, bot: Bot, request: web.Request) -> web.Response:
+        await self._slots.acquire()
+        try:
+            return await super()._handle_request_background(bot, request)
+        except BaseException:
+            # задача не создалась (битый JSON, обрыв) — слот возвращаем сами
+            self._slots.release()
+            raise
+
+    async def _background_feed_update(self, bot: Bot, update: dict[str, Any]) -> None:
+        try:
+            await super()._background_feed_update(bot, update)
+        finally:
+            self._slots.release()
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "in_flight": len(self._background_feed_update_tasks),
+            "concurrency": self.concurrency,
+        }
+
+
+def build_app(dp: Dispatcher, bot: Bot, *, secret: str = WEBHOOK_SECRET, path: str = WEBHOOK_PATH,
+              concurrency: int = WEBHOOK_CONCURRENCY) -> web.Application:
+    """aiohttp-приложение с маршрутом вебхука; startup/shutdown диспетчера привязаны к приложению."""
+    app = web.Application()
+    handler = BoundedRequestHandler(dp, bot, concurrency=concurrency, secret_token=secret)
+    handler.register(app, path=path)
+    app["webhook_handler"] = handler
+    setup_application(app, dp, bot=bot)
+    return app
+
+
+async def run_webhook(dp: Dispatcher, bot: Bot, *, allowed_updates: list[str]) -> None:
+    """Поднять сервер, зарегистрировать вебхук в Telegram и работать до отмены."""
+    app = build_app(dp, bot)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, WEBHOOK_HOST, WEBHOOK_PORT)
+    await site.start()
+
+    url = WEBHOOK_BASE_URL.rstrip("/") + WEBHOOK_PATH
+    await bot.set_webhook(
+        url,
+        secret_token=WEBHOOK_SECRET,
+        allowed_updates=allowed_updates,
+        max_connections=WEBHOOK_MAX_CONNECTIONS,
+    )
+    log.info(f"Webhook: {url} → {WEBHOOK_HOST}:{WEBHOOK_PORT}, updates={allowed_updates}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        # вебхук не снимаем: при рестарте/деплое Telegram подержит апдейты до нового инстанса
+        await runner.cleanup()